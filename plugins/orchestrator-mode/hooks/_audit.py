@@ -0,0 +1,61 @@
+"""Opt-in decision audit log for enforce-orchestrator.py.
+
+Enabled per project by the state-file option `audit=on`. Every decision the
+PreToolUse gate reaches while a mode is active is appended as one compact
+JSON line to `<state dir>/.orchestrator-mode.audit`:
+
+    {"ts":1760000000.123,"session":"...","agent":null,"tool":"Bash",
+     "mode":"on","step":8,"decision":"deny","us":412}
+
+  ts        wall-clock seconds (3 decimals)
+  session   payload session_id (null if absent)
+  agent     payload agent_id (null on the main thread)
+  step      the numbered decision step in enforce-orchestrator.py's docstring
+            that decided the call (8/9/10 = the on/wf/pi mode dispatch)
+  decision  "deny" or "noop" (the hook never emits allow)
+  us        microseconds from main() entry to the decision
+
+Hot-path cost: one O_APPEND open + one write() per call, no fsync. O_APPEND
+makes each line an atomic append, so concurrent hooks never interleave
+records. The file is a two-segment ring: when a write would take it past
+`audit-max-bytes` (default 1m, see _state.parse_size) it is renamed to
+`.orchestrator-mode.audit.1` (replacing the previous one) and a fresh file
+is started, so the log never holds more than about 2x the cap. A rotation
+racing another hook's append can drop that one record; the log is
+observational and never affects a decision.
+
+Read it with scripts/audit-log.py (tail / follow / summarize). Fail-open:
+nothing here ever raises into the hook.
+"""
+import json
+import os
+
+AUDIT_FILE_NAME = ".orchestrator-mode.audit"
+DEFAULT_MAX_BYTES = 1024 * 1024
+
+
+def audit_path(state_dir):
+    return os.path.join(state_dir, AUDIT_FILE_NAME)
+
+
+def encode(record):
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def append(path, line, max_bytes=DEFAULT_MAX_BYTES):
+    """Append one encoded record (see encode()) to `path`, rotating to
+    `path + ".1"` first if it would grow past `max_bytes`. Never raises."""
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            if max_bytes > 0 and os.fstat(fd).st_size + len(line) > max_bytes:
+                os.close(fd)
+                fd = -1
+                os.replace(path, path + ".1")
+                fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            os.write(fd, line)
+        finally:
+            if fd >= 0:
+                os.close(fd)
+    except Exception:
+        pass
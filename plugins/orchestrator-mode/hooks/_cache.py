@@ -0,0 +1,63 @@
+"""Small on-disk caches shared by the orchestrator-mode hooks.
+
+Every hook invocation is a fresh python3 process, so anything worth
+remembering between tool calls has to live on disk. Each cache is one small
+JSON file under cache_dir(); callers own their file's schema and MUST validate
+whatever they load (a cache entry is a hint, never a source of truth).
+
+Location: ORCHESTRATOR_CACHE_DIR if set (the literal value "off" disables all
+caching), else $XDG_CACHE_HOME/orchestrator-mode, else
+~/.cache/orchestrator-mode.
+
+Fail-open everywhere: a missing, corrupt, or unwritable cache just means the
+caller recomputes. Nothing here ever raises.
+"""
+import json
+import os
+
+
+def cache_dir():
+    """Cache directory, or None when caching is disabled."""
+    explicit = os.environ.get("ORCHESTRATOR_CACHE_DIR")
+    if explicit:
+        return None if explicit == "off" else explicit
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "orchestrator-mode")
+
+
+def load(name):
+    """Parsed contents of cache file `name` -> dict; {} when absent, corrupt,
+    or caching is disabled."""
+    d = cache_dir()
+    if not d:
+        return {}
+    try:
+        with open(os.path.join(d, name), "r") as f:
+            obj = json.load(f)
+        return obj if isinstance(obj, dict) else {}
+    except Exception:
+        return {}
+
+
+def store(name, obj):
+    """Atomically replace cache file `name` with `obj` (write-temp + rename,
+    so a concurrent load() sees either the old or the new file, never a torn
+    one)."""
+    d = cache_dir()
+    if not d:
+        return
+    tmp = None
+    try:
+        os.makedirs(d, mode=0o700, exist_ok=True)
+        path = os.path.join(d, name)
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(obj, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except Exception:
+        if tmp:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
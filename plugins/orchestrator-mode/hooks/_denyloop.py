@@ -0,0 +1,96 @@
+"""Per-session counters of repeated identical denials (deny loops).
+
+An agent denied a Bash/Edit/mcp__* call on the main thread often retries the
+same call several times before delegating. Each retry costs a model turn
+and a hook run. enforce-orchestrator.main() counts identical denials here,
+so it can escalate to a shorter, sharper reason (state option
+deny-escalate=N) and report the repeats in the ORCHESTRATOR_STATS tables.
+
+A denial is identified by (session_id, tool, target, mode, reason text),
+where the target is what the call acts on (enforce-orchestrator's
+_deny_target: a path, a command, an input digest). `Bash: make` retried is
+a loop; `Bash: make` then `Bash: ls` is not. The counters live in one
+fixed-size file shared by every hook process:
+
+    <cache dir>/deny-loop.bin     (see _cache.cache_dir())
+
+It holds SLOTS records of 16 bytes (key fingerprint, count, last-seen unix
+seconds), 64 KB in all. A key owns one of PROBE consecutive slots starting
+at its hash. A new key takes an empty slot there, else one idle for over
+WINDOW_S, else the least recently used. A repeat more than WINDOW_S after
+the previous one starts over at 1.
+
+Lock-free: a bump is one pread of the probe window and one 16-byte pwrite.
+Two hooks bumping the same key at the same instant can lose one increment.
+That only delays an escalation by one call. Fail-open: bump() never raises
+and returns 0 when the file can't be used.
+"""
+import os
+import struct
+import time
+import zlib
+
+DENY_LOOP_FILE_NAME = "deny-loop.bin"
+
+SLOTS = 4096
+PROBE = 8
+WINDOW_S = 600
+
+_SLOT = struct.Struct("<QII")  # key fingerprint, count, last-seen unix s
+FILE_SIZE = SLOTS * _SLOT.size
+
+
+def deny_loop_path():
+    """Path of the shared counter file, or None when caching is disabled."""
+    import _cache
+    d = _cache.cache_dir()
+    return os.path.join(d, DENY_LOOP_FILE_NAME) if d else None
+
+
+def key(session, tool, target, mode, reason):
+    """Nonzero 64-bit fingerprint of one kind of denial in one session."""
+    raw = "\0".join((str(session), str(tool), str(target), mode, reason)).encode(
+        "utf-8", "surrogatepass")
+    return (zlib.crc32(raw) << 32 | zlib.adler32(raw)) or 1
+
+
+def bump(path, fingerprint, now=None):
+    """Count one more denial for `fingerprint` -> its count in the current
+    window (1 = first). 0 on any error."""
+    now = int(time.time() if now is None else now)
+    try:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    except FileNotFoundError:
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError:
+            return 0
+    except OSError:
+        return 0
+    try:
+        if os.fstat(fd).st_size != FILE_SIZE:
+            os.ftruncate(fd, FILE_SIZE)  # new file, or a wrong-sized one
+        base = fingerprint % (SLOTS - PROBE + 1) * _SLOT.size
+        window = os.pread(fd, PROBE * _SLOT.size, base)
+        target, count, oldest = None, 1, None
+        for i in range(PROBE):
+            fp, n, seen = _SLOT.unpack_from(window, i * _SLOT.size)
+            if fp == fingerprint:
+                target = i
+                if now - seen <= WINDOW_S:
+                    count = n + 1
+                break
+            if target is None and (fp == 0 or now - seen > WINDOW_S):
+                target = i  # free or idle; keep looking for the key itself
+            if oldest is None or seen < oldest[1]:
+                oldest = (i, seen)
+        if target is None:
+            target = oldest[0]
+        os.pwrite(fd, _SLOT.pack(fingerprint, min(count, 0xFFFFFFFF), now),
+                  base + target * _SLOT.size)
+        return count
+    except Exception:
+        return 0
+    finally:
+        os.close(fd)
@@ -0,0 +1,121 @@
+"""Unix-socket protocol shared by gate-daemon.py and gate-client.py.
+
+The PreToolUse hook is invoked once per tool call, so every call used to pay a
+full python3 cold start plus the imports/regex compiles of
+enforce-orchestrator.py. gate-daemon.py keeps one interpreter alive and runs
+the SAME enforce-orchestrator.main() per request; gate-client.py is the tiny
+shim hooks.json invokes, which forwards the raw hook payload over the socket
+and falls back to in-process evaluation whenever the daemon is absent, stale,
+or misbehaving (fail open to the exact pre-daemon behavior).
+
+This module is imported by the client on EVERY tool call, so it deliberately
+imports only os/struct -- no json, no re. request() talks to the daemon
+through the C-level _socket module, loaded only once a socket owned by this
+user exists: the socket module's own imports (enum, selectors, ...) cost
+~10ms, as much as the rest of the shim, and the no-daemon path needs neither.
+
+Wire format (all integers network byte order):
+  request: "!III" (len cwd, len env, len payload) + cwd + env + payload
+           env is the client's whole environment as NUL-joined b"KEY=VALUE"
+           pairs -- the decision depends on CLAUDE_PROJECT_DIR, HOME,
+           ORCHESTRATOR_DEBUG, ..., so the daemon evaluates each request under
+           the caller's environment and cwd, not its own.
+  reply:   "!BII" (exit code, len stdout, len stderr) + stdout + stderr
+A connection that closes without a full reply means "evaluate it yourself".
+"""
+import os
+import struct
+
+# Generous: the hook timeout is 5s, and a daemon that does not answer within
+# this window is treated as absent (the client falls back in-process).
+REPLY_TIMEOUT = 2.0
+
+_REQUEST_HEADER = struct.Struct("!III")
+_REPLY_HEADER = struct.Struct("!BII")
+
+
+def socket_path():
+    """Daemon socket path. ORCHESTRATOR_GATE_SOCKET overrides; otherwise a
+    per-user socket under XDG_RUNTIME_DIR (or /tmp)."""
+    explicit = os.environ.get("ORCHESTRATOR_GATE_SOCKET")
+    if explicit:
+        return explicit
+    base = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return os.path.join(base, "orchestrator-mode-gate-%d.sock" % os.getuid())
+
+
+def _recv_exact(sock, n):
+    chunks = []
+    while n > 0:
+        chunk = sock.recv(min(n, 1 << 20))
+        if not chunk:
+            raise EOFError("short read")
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_all(sock):
+    chunks = []
+    while True:
+        chunk = sock.recv(1 << 20)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+def encode_request(cwd, environb, payload):
+    env = b"\0".join(k + b"=" + v for k, v in environb.items())
+    return _REQUEST_HEADER.pack(len(cwd), len(env), len(payload)) + cwd + env + payload
+
+
+def decode_request(buf):
+    """-> (cwd bytes, env dict bytes->bytes, payload bytes). Raises on a
+    truncated/garbled request."""
+    n_cwd, n_env, n_payload = _REQUEST_HEADER.unpack_from(buf)
+    pos = _REQUEST_HEADER.size
+    if len(buf) != pos + n_cwd + n_env + n_payload:
+        raise ValueError("request length mismatch")
+    cwd = buf[pos:pos + n_cwd]
+    pos += n_cwd
+    env = {}
+    if n_env:
+        for pair in buf[pos:pos + n_env].split(b"\0"):
+            key, _, value = pair.partition(b"=")
+            env[key] = value
+    pos += n_env
+    return cwd, env, buf[pos:]
+
+
+def encode_reply(rc, out, err):
+    return _REPLY_HEADER.pack(rc & 0xFF, len(out), len(err)) + out + err
+
+
+def request(payload):
+    """Forward one raw hook payload to the daemon. Returns (rc, stdout bytes,
+    stderr bytes), or None when there is no usable daemon -- the caller must
+    then evaluate in-process. Never raises."""
+    sock = None
+    try:
+        path = socket_path()
+        # Refuse a socket someone else planted at our path (e.g. in /tmp):
+        # its answers would decide what this user's agent may do.
+        if os.stat(path).st_uid != os.getuid():
+            return None
+        import _socket
+        sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+        sock.settimeout(REPLY_TIMEOUT)
+        sock.connect(path)
+        sock.sendall(encode_request(os.fsencode(os.getcwd()), os.environb, payload))
+        sock.shutdown(_socket.SHUT_WR)
+        rc, n_out, n_err = _REPLY_HEADER.unpack(_recv_exact(sock, _REPLY_HEADER.size))
+        body = _recv_exact(sock, n_out + n_err)
+        return rc, body[:n_out], body[n_out:]
+    except Exception:
+        return None
+    finally:
+        if sock is not None:
+            try:
+                sock.close()
+            except Exception:
+                pass
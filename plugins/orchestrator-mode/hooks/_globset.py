@@ -0,0 +1,81 @@
+"""Many shell-style globs, matched against one name in O(len(name)).
+
+GlobSet(patterns).match(name) answers exactly what
+any(fnmatch.fnmatchcase(name, p) for p in patterns) would, without looping
+over the patterns. At compile time each pattern goes to the cheapest
+structure that can answer it:
+
+  exact    no wildcard at all          -> one set lookup
+  prefix   a single trailing `*` only  -> a character trie, walked once along
+                                          `name`, stopping at the first node
+                                          that ends a prefix
+  other    any other `*`, `?`, `[...]` -> one combined regex (fnmatch.translate
+                                          of each, joined with `|`)
+
+MCP allow patterns (`allow-mcp=mcp__docs__*,mcp__search__*`) are almost all
+prefixes, so the regex is usually empty. compiled() memoizes GlobSets by
+their pattern tuple, so a long-lived process (gate-daemon.py) compiles each
+state's patterns once. This module is only imported when a state actually
+carries such an option.
+"""
+import fnmatch
+import re
+
+_WILDCARDS = frozenset("*?[")
+
+# Trie node key marking "a prefix pattern ends here". Real keys are 1-char
+# strings, so None can never collide with one.
+_END = None
+
+MAX_COMPILED = 32
+_compiled = {}
+
+
+class GlobSet:
+    def __init__(self, patterns):
+        self.patterns = tuple(patterns)
+        self._exact = set()
+        self._trie = {}
+        other = []
+        for p in self.patterns:
+            body = p[:-1] if p.endswith("*") else None
+            if not _WILDCARDS.intersection(p):
+                self._exact.add(p)
+            elif body is not None and not _WILDCARDS.intersection(body):
+                node = self._trie
+                for ch in body:
+                    node = node.setdefault(ch, {})
+                node[_END] = True
+            else:
+                other.append(fnmatch.translate(p))
+        self._regex = re.compile("|".join(other)).match if other else None
+
+    def match(self, name):
+        if name in self._exact:
+            return True
+        node = self._trie
+        if node:
+            for ch in name:
+                if _END in node:
+                    return True
+                node = node.get(ch)
+                if node is None:
+                    break
+            else:
+                if _END in node:
+                    return True
+        return self._regex is not None and self._regex(name) is not None
+
+    def __len__(self):
+        return len(self.patterns)
+
+
+def compiled(patterns):
+    """Shared GlobSet for `patterns` (any iterable of glob strings)."""
+    key = tuple(patterns)
+    globs = _compiled.get(key)
+    if globs is None:
+        if len(_compiled) >= MAX_COMPILED:
+            _compiled.clear()
+        globs = _compiled[key] = GlobSet(key)
+    return globs
@@ -0,0 +1,86 @@
+"""Model-allowlist family matching (D3) in one pass over the model id.
+
+ModelMatcher(entries).allowed(model) answers exactly what
+any(entry in model.strip().lower() for entry in entries) would, with an
+Aho-Corasick automaton over the allowlist entries instead of one substring
+search per entry. The cost is O(len(model)) however long the allowlist is, so
+the Workflow lint's model values (one per `model:` in the script) are matched
+in a single linear pass over all of them.
+
+Aliases (state option `model-aliases=fast=haiku,smart=opus`) name a model
+family for scripts and Task calls: a requested model that is exactly an alias
+(case-insensitive, trimmed) is replaced by its target before matching. So
+`model: "fast"` passes `allowed-models=haiku`. Anything else, including a
+model that merely contains an alias, is matched as is.
+
+compiled() memoizes matchers by (entries, aliases), so a long-lived process
+(gate-daemon.py) builds each state's automaton once. This module is only
+imported when a state actually carries an allowlist.
+"""
+
+MAX_COMPILED = 32
+_compiled = {}
+
+
+class ModelMatcher:
+    def __init__(self, entries, aliases=()):
+        self.entries = tuple(entries)
+        self.aliases = {}
+        for pair in aliases:
+            alias, _, target = pair.partition("=")
+            if alias and target:
+                self.aliases[alias] = target
+        # goto[s]: char -> state; fail[s]: longest proper suffix state;
+        # hit[s]: some entry ends at s or at a state on its fail chain.
+        goto, fail, hit = [{}], [0], [False]
+        for entry in self.entries:
+            s = 0
+            for ch in entry:
+                nxt = goto[s].get(ch)
+                if nxt is None:
+                    nxt = goto[s][ch] = len(goto)
+                    goto.append({})
+                    fail.append(0)
+                    hit.append(False)
+                s = nxt
+            hit[s] = True
+        queue = list(goto[0].values())
+        for s in queue:  # breadth first: a state's fail target is shallower
+            for ch, nxt in goto[s].items():
+                f = fail[s]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                hit[nxt] = hit[nxt] or hit[fail[nxt]]
+                queue.append(nxt)
+        self._goto, self._fail, self._hit = goto, fail, hit
+
+    def allowed(self, model):
+        m = str(model).strip().lower()
+        m = self.aliases.get(m, m)
+        goto, fail, hit = self._goto, self._fail, self._hit
+        if hit[0]:
+            return True  # an empty entry is a substring of everything
+        s = 0
+        for ch in m:
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            if hit[s]:
+                return True
+        return False
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def compiled(entries, aliases=None):
+    """Shared ModelMatcher for `entries` (lowercase allowlist) and `aliases`
+    (the parsed model-aliases option, "alias=target" strings)."""
+    key = (tuple(entries), tuple(aliases or ()))
+    matcher = _compiled.get(key)
+    if matcher is None:
+        if len(_compiled) >= MAX_COMPILED:
+            _compiled.clear()
+        matcher = _compiled[key] = ModelMatcher(*key)
+    return matcher
@@ -0,0 +1,67 @@
+"""Pre-serialized stdout lines for the hooks.
+
+Both hook outputs have a fixed envelope around one string:
+
+  inject-reminder.py  {"hookSpecificOutput": {"hookEventName": "UserPromptSubmit",
+                       "additionalContext": <reminder>}}
+  enforce deny        {"hookSpecificOutput": {"hookEventName": "PreToolUse",
+                       "permissionDecision": "deny",
+                       "permissionDecisionReason": <reason>}}
+
+The envelope text is spliced around json.dumps(<string>) instead of
+serializing a nested dict. The output is byte-identical to
+print(json.dumps(out)) (tests/test_output.sh checks this). Each finished line,
+newline included, is memoized by its string. The reminder is a pure function
+of (mode, allowed-models) and a deny reason of (mode, tool, options), so a
+long-lived process (gate-daemon.py, bench-hooks.py in-process runs) encodes
+each distinct line once. The memo is capped at MAX_ENTRIES and cleared when
+full.
+
+write() sends a line to stdout in one write. Under a redirected text stdout
+(the daemon's StringIO), it writes the decoded line instead.
+"""
+import json
+import sys
+
+MAX_ENTRIES = 256
+
+_REMINDER_HEAD = ('{"hookSpecificOutput": {"hookEventName": "UserPromptSubmit", '
+                  '"additionalContext": ')
+_DENY_HEAD = ('{"hookSpecificOutput": {"hookEventName": "PreToolUse", '
+              '"permissionDecision": "deny", "permissionDecisionReason": ')
+_TAIL = "}}\n"
+
+# (head, string) -> encoded line
+_memo = {}
+
+
+def _line(head, text):
+    key = (head, text)
+    line = _memo.get(key)
+    if line is None:
+        if len(_memo) >= MAX_ENTRIES:
+            _memo.clear()
+        line = _memo[key] = (head + json.dumps(text) + _TAIL).encode()
+    return line
+
+
+def reminder_line(reminder):
+    """inject-reminder.py's stdout bytes for `reminder` (newline included)."""
+    return _line(_REMINDER_HEAD, reminder)
+
+
+def deny_line(reason):
+    """enforce-orchestrator.py's stdout bytes for a deny (newline included)."""
+    return _line(_DENY_HEAD, reason)
+
+
+def write(line):
+    """Write one encoded line to stdout in a single call."""
+    out = sys.stdout
+    buf = getattr(out, "buffer", None)
+    if buf is None:
+        out.write(line.decode())
+        return
+    out.flush()
+    buf.write(line)
+    buf.flush()
@@ -0,0 +1,172 @@
+"""Memoized path resolution for enforce-orchestrator.py.
+
+A Write/Edit decision used to resolve the same few paths up to four times. It
+resolved the target path and the state-file path for the subagent toggle
+check (step 4), both again for the D1 toggle (step 6), and the target plus
+both safe reflection dirs for ADR-004 (step 7). Each os.path.realpath() is an
+lstat per path component, which adds up on network filesystems.
+
+realpath() here returns exactly what os.path.realpath() does (non-strict),
+but remembers each answer process-wide, with the directories whose entries
+the resolution looked up. An answer is reused:
+
+  - freely within one decision (between begin_decision() calls), so every
+    path is resolved at most once per decision;
+  - in later decisions of the same process (gate-daemon.py, decide() loops)
+    only after re-validating the inode + mtime of each of those directories.
+    Creating, removing, renaming, or re-pointing any component (a symlink
+    swap included) changes its parent directory's mtime, so a stale answer
+    is never served. This is the same check _state.py's discovery cache uses.
+
+A one-shot hook process starts with an empty memo, so it pays nothing extra
+beyond the deduplication. The memo is capped at MAX_ENTRIES and cleared when
+full.
+
+DirSet holds a fixed set of directories (ADR-004's safe dirs plus the
+safe-dirs option), each resolved once. covers(path) walks a trie of path
+components, so it costs O(depth of the path) however many directories the
+set holds. valid() applies the same re-validation rule as realpath(): free
+within a decision, then one stat per distinct directory the resolutions
+looked in.
+"""
+import os
+import stat
+
+MAX_ENTRIES = 1024
+
+# abspath -> [resolved, deps, generation last validated]; deps is a tuple of
+# (dir, (st_ino, st_mtime_ns) or None) for every directory an lstat ran in.
+_memo = {}
+_generation = 0
+
+
+def begin_decision():
+    """Start a new decision: memo entries get re-validated on next use."""
+    global _generation
+    _generation += 1
+
+
+def _dir_sig(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns
+
+
+def _resolve(path, rest, seen, looked_in):
+    """posixpath._joinrealpath (non-strict), also collecting every directory
+    in which it lstat()ed an entry into `looked_in`."""
+    if os.path.isabs(rest):
+        rest = rest[1:]
+        path = os.sep
+    while rest:
+        name, _, rest = rest.partition(os.sep)
+        if not name or name == os.curdir:
+            continue
+        if name == os.pardir:
+            if path:
+                path, name = os.path.split(path)
+                if name == os.pardir:
+                    path = os.path.join(path, os.pardir, os.pardir)
+            else:
+                path = os.pardir
+            continue
+        newpath = os.path.join(path, name)
+        looked_in.add(path)
+        try:
+            is_link = stat.S_ISLNK(os.lstat(newpath).st_mode)
+        except OSError:
+            is_link = False
+        if not is_link:
+            path = newpath
+            continue
+        if newpath in seen:
+            path = seen[newpath]
+            if path is not None:
+                continue
+            return os.path.join(newpath, rest), False   # symlink loop
+        seen[newpath] = None
+        path, ok = _resolve(path, os.readlink(newpath), seen, looked_in)
+        if not ok:
+            return os.path.join(path, rest), False
+        seen[newpath] = path
+    return path, True
+
+
+def realpath(path):
+    """os.path.realpath(path) for an absolute `path`, memoized (see module
+    docstring). Raises what os.path.realpath would. A relative `path`
+    depends on the cwd, so it is resolved without the memo."""
+    if not os.path.isabs(path):
+        return os.path.realpath(path)
+    entry = _memo.get(path)
+    if entry is not None:
+        if entry[2] == _generation:
+            return entry[0]
+        if all(_dir_sig(d) == sig for d, sig in entry[1]):
+            entry[2] = _generation
+            return entry[0]
+    looked_in = set()
+    resolved, _ = _resolve("", path, {}, looked_in)
+    resolved = os.path.abspath(resolved)
+    if len(_memo) >= MAX_ENTRIES:
+        _memo.clear()
+    _memo[path] = [resolved,
+                   tuple((d, _dir_sig(d)) for d in looked_in),
+                   _generation]
+    return resolved
+
+
+def clear():
+    _memo.clear()
+
+
+# Trie node key marking "a directory of the set ends here". Real keys are
+# non-empty path components, so None never collides with one.
+_END = None
+
+
+def _components(path):
+    return [part for part in path.split(os.sep) if part]
+
+
+class DirSet:
+    def __init__(self, paths):
+        self._trie = {}
+        self._deps = {}
+        for path in paths:
+            looked_in = set()
+            if not os.path.isabs(path):
+                path = os.path.join(os.getcwd(), path)  # keep ".." for _resolve
+            resolved, _ = _resolve("", path, {}, looked_in)
+            for d in looked_in:
+                self._deps[d] = _dir_sig(d)
+            node = self._trie
+            for part in _components(os.path.abspath(resolved)):
+                node = node.setdefault(part, {})
+            node[_END] = True
+        self._generation = _generation
+
+    def valid(self):
+        """Whether every resolution still holds (see module docstring)."""
+        if self._generation == _generation:
+            return True
+        if all(_dir_sig(d) == sig for d, sig in self._deps.items()):
+            self._generation = _generation
+            return True
+        return False
+
+    def covers(self, path):
+        """Whether resolved absolute `path` is one of the directories or
+        lies under one."""
+        node = self._trie
+        if _END in node:
+            return True  # "/" itself
+        for part in _components(path):
+            node = node.get(part)
+            if node is None:
+                return False
+            if _END in node:
+                return True
+        return False
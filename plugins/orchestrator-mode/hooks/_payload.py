@@ -0,0 +1,311 @@
+"""Selective, streaming parse of a hook's stdin payload.
+
+The hooks read a handful of fields (KEEP_KEYS: tool_name, agent_id, cwd,
+tool_input.file_path / command / model / script, ...), but a Write of a
+generated 30 MB file, a MultiEdit with huge hunks, or a long pasted prompt
+used to be decoded in full by json.load() just to be ignored.
+
+load(stream, needle) returns what json.load() would, except that a string
+value longer than SKIP_MIN raw bytes whose key is not in KEEP_KEYS comes back
+as a Skipped placeholder instead of a str. A skipped string is still read and
+validated exactly as json.loads would, in bounded pieces (json's own C string
+scanner does the work), and it records:
+
+  length   its decoded length in characters
+  first    the index of the first occurrence of `needle` in the decoded
+           string, or -1
+
+That is all enforce-orchestrator.py's D2 scan (the state-file token search
+over mcp__* inputs) needs to give the same answer, char caps included, as it
+gives on the fully decoded string.
+
+Payloads up to SMALL_PAYLOAD bytes, the overwhelming majority, go straight to
+json.loads(), so nothing changes for them. Larger ones are read in CHUNK-sized
+pieces and parsed by json.loads() too, minus their long string literals. One
+C regex scan copies everything else into a compact buffer, stopping only at
+a string of more than about SKIP_MIN bytes. That string is copied whole when
+it is a key or a KEEP_KEYS value. Otherwise it is skimmed piece by piece and
+replaced by a placeholder, which becomes the Skipped once the buffer is
+parsed. The structure (objects, arrays, numbers, short strings) is never
+tokenized in Python, so a payload of a million small values parses about
+as fast as with json.loads. Memory stays bounded by the compact buffer plus
+CHUNK + SMALL_PAYLOAD, whatever the size of the skipped content. Malformed
+input raises ValueError, like json.loads.
+"""
+import json
+import os
+import re
+from json.decoder import scanstring as _scanstring
+
+CHUNK = 1 << 16
+SMALL_PAYLOAD = 1 << 20
+SKIP_MIN = 1 << 16
+
+# Values the hooks read, never skipped however long (matched on the value's
+# own key, at any depth).
+KEEP_KEYS = frozenset((
+    "tool_name", "agent_id", "session_id", "cwd",
+    "file_path", "notebook_path", "command", "model", "subagent_type",
+    "script", "scriptPath"))
+
+
+class Skipped:
+    """Placeholder for a long string value that was not materialized."""
+    __slots__ = ("length", "first")
+
+    def __init__(self, length, first):
+        self.length = length
+        self.first = first
+
+    def __repr__(self):
+        return "Skipped(length=%d, first=%d)" % (self.length, self.first)
+
+
+def load(stream, needle=None):
+    """Parse one JSON document from `stream` (binary, or text with a
+    .buffer; a plain text stream is parsed whole). See module docstring."""
+    raw = getattr(stream, "buffer", stream)
+    head = raw.read(SMALL_PAYLOAD + 1)
+    if isinstance(head, str):
+        return json.loads(head + raw.read())
+    if (len(head) <= SMALL_PAYLOAD or head.startswith(b"\xef\xbb\xbf")
+            or b"\x00" in head[:4]):
+        # small, or not plain UTF-8 (BOM, UTF-16/32): json.loads decides
+        return json.loads(head + raw.read())
+    return _Compactor(raw, head, needle).document()
+
+
+_WS_BYTES = b" \t\n\r"
+_HIGH_SURROGATE = re.compile(rb"\\u[dD][89abAB][0-9a-fA-F]{2}")
+# String content: unescaped runs and complete two-byte escapes (\uXXXX's hex
+# digits are plain bytes), stopping at the closing quote or the search end.
+_STRING_BODY = re.compile(rb'[^"\\]*+(?:\\.[^"\\]*+)*+', re.S)
+_ANY_STRING = re.compile(rb'"[^"\\]*+(?:\\.[^"\\]*+)*+"', re.S)
+_NOT_BRACKET = bytes(b for b in range(256) if b not in b"[]{}")
+
+
+def _scanner(limit):
+    """Regex that, from a position outside any string, consumes non-string
+    bytes and string literals of at most `limit` bytes. It stops at the
+    opening quote of a longer string, or of one cut by the buffer end."""
+    # Plain strings: one bounded run. Others must close within limit // 16
+    # pieces (runs of up to 16 bytes, or escapes): at most `limit` bytes,
+    # matched far faster than byte by byte. A densely escaped string just
+    # under the limit may count as long; that only means it is skimmed.
+    return re.compile(
+        rb'(?:[^"]++|"[^"\\]{0,%d}+"|"(?:[^"\\]{1,16}+|\\.){0,%d}+")*+'
+        % (limit, limit // 16), re.S)
+
+
+def _escape_start(raw, i):
+    """Whether the backslash (or quote) at raw[i] is unescaped: an even
+    number of backslashes precede it."""
+    j = i
+    while j > 0 and raw[j - 1] == 0x5c:
+        j -= 1
+    return (i - j) % 2 == 0
+
+
+def _safe_cut(raw):
+    """Largest prefix length of raw string content that decodes on its own:
+    no escape, surrogate-pair escape, or UTF-8 sequence cut in two."""
+    k = len(raw)
+    b = raw.rfind(b"\\", max(0, k - 6))
+    if b >= 0:
+        while b > 0 and raw[b - 1] == 0x5c:
+            b -= 1  # start of the backslash run: always an escape start
+        k = b
+        if (k >= 6 and _HIGH_SURROGATE.match(raw, k - 6)
+                and _escape_start(raw, k - 6)):
+            k -= 6
+        return k
+    while k > 0 and raw[k - 1] & 0xC0 == 0x80:
+        k -= 1
+    if k > 0 and raw[k - 1] >= 0xC0:
+        k -= 1
+    return k
+
+
+class _Skim:
+    """Keeps only the length and first needle position of a skipped string
+    fed to it in decoded pieces."""
+
+    def __init__(self, needle):
+        self.needle = needle
+        self.length = 0
+        self.first = -1
+        self.tail = ""
+
+    def feed(self, text):
+        if self.needle and self.first < 0:
+            window = self.tail + text
+            at = window.find(self.needle)
+            if at >= 0:
+                self.first = self.length - len(self.tail) + at
+            else:
+                self.tail = window[max(0, len(window) - len(self.needle) + 1):]
+        self.length += len(text)
+
+
+class _Compactor:
+    def __init__(self, stream, head, needle):
+        self.stream = stream
+        self.buf = head
+        self.pos = 0
+        self.needle = needle
+        self.out = bytearray()
+        # open brackets enclosing out[:self.mark]; brought up to date only
+        # when a long string follows a ',' (key or array element?)
+        self.stack = bytearray()
+        self.mark = 0
+        self.tag = os.urandom(6).hex()
+        self.skipped = {}
+
+    def _more(self):
+        """Append the next CHUNK, dropping the consumed prefix (positions
+        shift: self.pos becomes 0). False at EOF."""
+        chunk = self.stream.read(CHUNK)
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def document(self):
+        scan = _scanner(SKIP_MIN)
+        enough = SKIP_MIN + 2  # bytes after a quote that decide its length
+        eof = False
+        while True:
+            end = scan.match(self.buf, self.pos).end()
+            self.out += self.buf[self.pos:end]
+            self.pos = end
+            if end == len(self.buf):
+                if not self._more():
+                    break
+            elif len(self.buf) - end <= enough and not eof:
+                eof = not self._more()  # maybe a short string cut in two
+            elif self._keep():
+                self._copy_string()
+            else:
+                self._skim_string()
+        doc = json.loads(self.out)
+        return _restore(doc, self.skipped) if self.skipped else doc
+
+    def _keep(self):
+        """Whether the long string about to be read is a key or a KEEP_KEYS
+        value, from the last significant byte before it."""
+        out = self.out
+        i = len(out)
+        while i and out[i - 1] in _WS_BYTES:
+            i -= 1
+        c = out[i - 1] if i else -1
+        if c == 0x3a:  # ':'
+            return self._key_before(i - 1) in KEEP_KEYS
+        if c == 0x2c:  # ',': a key inside an object, an element in an array
+            self._update_stack()
+            return self.stack[-1:] == b"{"
+        return c == 0x7b  # '{'
+
+    def _key_before(self, colon):
+        out = self.out
+        k = colon
+        while k and out[k - 1] in _WS_BYTES:
+            k -= 1
+        if not k or out[k - 1] != 0x22:
+            return None
+        start = k - 1
+        while True:
+            start = out.rfind(b'"', 0, start)
+            if start < 0:
+                return None
+            if _escape_start(out, start):
+                break
+        try:
+            return json.loads(out[start:k])
+        except ValueError:
+            return None
+
+    def _update_stack(self):
+        seg = _ANY_STRING.sub(b"", self.out[self.mark:])
+        seg = bytes(seg).translate(None, _NOT_BRACKET)
+        for _ in range(8):  # drop matched pairs in C first
+            shorter = seg.replace(b"[]", b"").replace(b"{}", b"")
+            if len(shorter) == len(seg):
+                break
+            seg = shorter
+        stack = self.stack
+        for c in seg:
+            if c == 0x5b or c == 0x7b:
+                stack.append(c)
+            elif stack:
+                stack.pop()
+        self.mark = len(self.out)
+
+    def _copy_string(self):
+        """Copy the string at self.pos into out as is (json.loads decodes and
+        validates it with the rest)."""
+        self.out += b'"'
+        self.pos += 1
+        while True:
+            end = _STRING_BODY.match(self.buf, self.pos).end()
+            self.out += self.buf[self.pos:end]
+            self.pos = end
+            if end < len(self.buf) and self.buf[end] == 0x22:
+                self.out += b'"'
+                self.pos += 1
+                return
+            if not self._more():
+                self.out += self.buf[self.pos:]  # unterminated: json.loads raises
+                self.pos = len(self.buf)
+                return
+
+    def _skim_string(self):
+        """Decode the string at self.pos in safe-cut pieces with the C
+        scanner, keeping only a _Skim of it, and put a placeholder in out. A
+        sentinel quote ends each piece; stopping before it means the real
+        closing quote was found."""
+        self.pos += 1
+        skim = _Skim(self.needle)
+        eof = False
+        while True:
+            raw = self.buf[self.pos:]
+            cut = len(raw) if eof else _safe_cut(raw)
+            if cut:
+                text = raw[:cut].decode("utf-8", "surrogatepass") + '"'
+                value, end = _scanstring(text, 0, True)
+                skim.feed(value)
+                if end < len(text):
+                    self.pos += len(text[:end - 1].encode(
+                        "utf-8", "surrogatepass")) + 1
+                    break
+                self.pos += cut
+            if eof:
+                raise ValueError("Unterminated string")
+            eof = not self._more()
+        placeholder = "\x00%s:%d" % (self.tag, len(self.skipped))
+        self.skipped[placeholder] = Skipped(skim.length, skim.first)
+        self.out += b'"\\u0000%s:%d"' % (self.tag.encode(), len(self.skipped) - 1)
+
+
+_LEAVES = frozenset((int, float, bool, type(None)))
+
+
+def _restore(doc, skipped):
+    """Put the Skipped objects back in place of their placeholders."""
+    if type(doc) is str:
+        return skipped.get(doc, doc)
+    left = len(skipped)
+    stack = [doc]
+    while stack and left:
+        obj = stack.pop()
+        if type(obj) is list and _LEAVES.issuperset(map(type, obj)):
+            continue  # numbers, literals: nothing to restore or descend into
+        for k, v in (obj.items() if type(obj) is dict else enumerate(obj)):
+            t = type(v)
+            if t is str:
+                if v in skipped:
+                    obj[k] = skipped[v]
+                    left -= 1
+            elif t is dict or t is list:
+                stack.append(v)
+    return doc
@@ -12,17 +12,69 @@ token optionally followed by whitespace-separated `key=value` options, e.g.:
 
 The MODE is the FIRST whitespace-separated token (trimmed, lowercased) --
 options never affect mode detection. Valid modes: "on", "pi", "wf". Anything
-else -- missing file, empty, "off", garbage, unreadable -- is OFF.
+else -- missing file, empty, "off", garbage, unreadable -- is OFF. Options
+after an explicit "off" are parsed like any others (the hooks ignore all but
+shadow= there); a line with an unrecognized mode token has none.
 
 Recognized options (parsed by get_state()):
   - allowed-models: comma-separated list of model names, normalized to
     lowercase. Empty value or absent key means NO restriction.
+  - allow-mcp: comma-separated list of MCP tool-name globs, case kept.
+    Empty value or absent key means no extra MCP tools are allowed.
+  - model-aliases: comma-separated alias=model pairs (`fast=haiku`), kept as
+    a list of lowercase "alias=model" strings; pairs missing either side are
+    dropped. Resolved by _models.py before allowlist matching.
+  - safe-dirs: comma-separated extra ADR-004 safe-write directories, case
+    kept, relative to the project dir (see enforce-orchestrator.py).
+  - shadow: a candidate policy, `<mode>[,key=value,...]`, kept as a string
+    with its case (enforce-orchestrator.py parses and evaluates it; also
+    shadow-sample, shadow-max-bytes).
+Every other key=value is kept as a lowercased string and interpreted by its
+consumer: max-script-bytes, oversize-script, scan-max-depth, scan-max-chars,
+audit, audit-max-bytes, deny-escalate (enforce-orchestrator.py); reminder,
+reminder-every (inject-reminder.py). Sizes go through parse_size().
 
 Unparseable options fail open (they are ignored, never raised on). Fail-open
 everywhere: parsing never raises.
+
+Concurrent writes: write_state() (scripts/set-mode.py) replaces the file
+atomically with a versioned line, `<mode> gen=<n> crc=<crc32> <options>`.
+The gen/crc tokens are never options. Every reader goes through
+read_state_file(), which retries a read that looks like it caught an in-place
+rewrite (the /orchestrator-mode:mode Write tool) half way. Under load, a
+toggle therefore never shows up as a transient OFF.
+
+Discovery cache: when CLAUDE_PROJECT_DIR is unset, the walk-up from cwd (see
+state_file_path()) is cached on disk (see _cache.py), keyed by the starting
+cwd: the resolved chain of directories visited and the one holding the state
+file. Only the location is cached, never the parsed state -- the state file
+itself is always read. Any process can write the cache file, so a loaded
+entry is a hint that must prove itself: its directories must be cwd and its
+real (symlink-free) ancestors, and each is probed again for a state file. A
+hit costs an lstat plus a probe per ancestor, and saves the realpath. Entries
+this process walked itself (gate-daemon.py's in-process memo) are trusted
+while the inode + mtime of every directory on the chain are unchanged:
+creating, deleting, or renaming a state file anywhere on the path bumps that
+directory's mtime.
+
+Watching: a long-lived consumer (gate-daemon.py, an editor integration, a
+status bar) can hold a StateWatcher on a project dir instead of re-reading
+the file. The watcher keeps the parsed (mode, options) in memory and pushes
+changes to subscribers. It uses inotify via ctypes on Linux and falls back
+to mtime polling elsewhere. Once watch() has registered a dir, get_state()
+for that CLAUDE_PROJECT_DIR is answered by the watcher. That costs one
+non-blocking inotify read, or one stat() when polling, and no open/parse.
 """
 import os
+import stat
 import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import _cache  # noqa: E402
+
+STATE_FILE_NAME = ".orchestrator-mode.state"
 
 
 def project_dir(data):
@@ -31,19 +83,155 @@ def project_dir(data):
     return os.environ.get("CLAUDE_PROJECT_DIR") or data.get("cwd") or os.getcwd()
 
 
+_SIZE_SUFFIXES = {"k": 1024, "m": 1024 * 1024, "g": 1024 * 1024 * 1024}
+
+
+def parse_size(raw, default):
+    """Option value like "4096", "64k", "8m" -> bytes; absent or
+    unparseable -> `default` (fail open to the documented default)."""
+    if not raw:
+        return default
+    try:
+        scale = _SIZE_SUFFIXES.get(raw[-1], 1)
+        return int(raw[:-1] if scale > 1 else raw) * scale
+    except ValueError:
+        return default
+
+
+def option_enabled(options, key):
+    """Boolean option: on/true/yes/1 -> True, anything else -> False."""
+    return options.get(key) in ("on", "true", "yes", "1")
+
+
+_DISCOVERY_CACHE = "state-discovery.json"
+_DISCOVERY_CACHE_MAX_ENTRIES = 256
+
+# In-process copy of discovery entries this process walked or verified, so a
+# long-lived consumer (gate-daemon.py) doesn't re-load the cache file on every
+# call. Entries are still re-validated (_entry_valid) on every use.
+_discovery_memo = {}
+
+
+def _sig(st):
+    return [st.st_ino, st.st_mtime_ns]
+
+
+def _walk_state_dir(start):
+    """Uncached walk up from `start`. Returns (dir containing the state file
+    or None, chain) where chain lists [dir, inode, mtime_ns] for every
+    directory visited, nearest first. Each directory is stat'ed BEFORE it is
+    probed, so a state file created after the probe always invalidates the
+    recorded mtime. Raises on any filesystem error."""
+    chain = []
+    cur = os.path.realpath(start)
+    while True:
+        chain.append([cur] + _sig(os.stat(cur)))
+        if os.path.isfile(os.path.join(cur, STATE_FILE_NAME)):
+            return cur, chain
+        parent = os.path.dirname(cur)
+        if parent == cur:
+            return None, chain
+        cur = parent
+
+
+def _entry_valid(start, entry):
+    """A walk this process made is still the right answer iff no directory
+    it visited changed. The first directory is stat'ed through `start`
+    itself (which follows symlinks), so retargeting a symlink in cwd also
+    misses."""
+    try:
+        chain = entry["dirs"]
+        if _sig(os.stat(start)) != chain[0][1:]:
+            return False
+        for d, ino, mtime_ns in chain[1:]:
+            if _sig(os.stat(d)) != [ino, mtime_ns]:
+                return False
+        return True
+    except Exception:
+        return False
+
+
+def _verified_entry(start, entry):
+    """A discovery entry loaded from disk, re-checked against the
+    filesystem -> the entry with fresh directory signatures, or None.
+
+    The cache file is writable by anything that runs as the user, so nothing
+    in it is taken on trust: the directories must chain from `start` (same
+    directory) through real parents, none of them a symlink, and end at the
+    root or at `found`; every directory before `found` must still have no
+    state file and `found` must have one. Each directory is lstat'ed before
+    it is probed, as in _walk_state_dir."""
+    try:
+        dirs = [d[0] for d in entry["dirs"]]
+        found = entry["found"]
+        if not dirs or not all(isinstance(d, str) for d in dirs):
+            return None
+        for child, parent in zip(dirs, dirs[1:]):
+            if os.path.dirname(child) != parent or parent == child:
+                return None
+        last = dirs[-1]
+        if found is None:
+            if os.path.dirname(last) != last:
+                return None
+        elif found != last:
+            return None
+        chain = []
+        for d in dirs:
+            st = os.lstat(d)
+            if not stat.S_ISDIR(st.st_mode):
+                return None  # a symlink (or gone): not the real path
+            if not chain and not os.path.samestat(st, os.stat(start)):
+                return None
+            chain.append([d] + _sig(st))
+            if os.path.isfile(os.path.join(d, STATE_FILE_NAME)) != (d == found):
+                return None
+        return {"dirs": chain, "found": found}
+    except Exception:
+        return None
+
+
+def _discovery_entry(start):
+    """-> (entry, fresh) for `start`, or None if the walk itself failed.
+    `fresh` means the entry was just walked and is not yet persisted."""
+    entry = _discovery_memo.get(start)
+    if entry is not None and _entry_valid(start, entry):
+        return entry, False
+    entry = _cache.load(_DISCOVERY_CACHE).get(start)
+    if entry is not None:
+        entry = _verified_entry(start, entry)
+        if entry is not None:
+            _discovery_memo[start] = entry
+            return entry, False
+    try:
+        found, chain = _walk_state_dir(start)
+    except Exception:
+        return None
+    return {"dirs": chain, "found": found}, True
+
+
+def _save_entry(start, entry):
+    _discovery_memo[start] = entry
+    cache = _cache.load(_DISCOVERY_CACHE)
+    cache.pop(start, None)
+    cache[start] = entry
+    while len(cache) > _DISCOVERY_CACHE_MAX_ENTRIES:
+        del cache[next(iter(cache))]
+    _cache.store(_DISCOVERY_CACHE, cache)
+
+
 def _discover_state_dir(start):
     """Walk up from `start` looking for a directory containing
-    .orchestrator-mode.state. Stops at filesystem root; falls back to `start`
-    if never found. Never raises."""
+    .orchestrator-mode.state (served from the discovery cache when still
+    valid). Stops at filesystem root; falls back to `start` if never found.
+    Never raises."""
     try:
-        cur = os.path.realpath(start)
-        while True:
-            if os.path.isfile(os.path.join(cur, ".orchestrator-mode.state")):
-                return cur
-            parent = os.path.dirname(cur)
-            if parent == cur:
-                return start
-            cur = parent
+        result = _discovery_entry(start)
+        if result is None:
+            return start
+        entry, fresh = result
+        if fresh:
+            _save_entry(start, entry)
+        return entry["found"] or start
     except Exception:
         return start
 
@@ -61,13 +249,15 @@ def state_file_path(data):
     state file may resolve at an ancestor root while relative tool-input paths
     still resolve against cwd."""
     if os.environ.get("CLAUDE_PROJECT_DIR"):
-        return os.path.join(project_dir(data), ".orchestrator-mode.state")
+        return os.path.join(project_dir(data), STATE_FILE_NAME)
     base = data.get("cwd") or os.getcwd()
-    return os.path.join(_discover_state_dir(base), ".orchestrator-mode.state")
+    return os.path.join(_discover_state_dir(base), STATE_FILE_NAME)
 
 
-def _parse(raw):
-    """Parse raw state-file text -> (mode, options_dict). Never raises.
+def _parse_collect(raw):
+    """Parse raw state-file text -> (mode, options_dict, warnings). Never
+    raises. `warnings` are the stderr lines _parse() would print; they are
+    returned rather than written so a cached parse can replay them.
 
     Mode is the first whitespace-separated token, lowercased; unrecognized ->
     "off" (with a stderr warning, unless the file was empty or literally
@@ -85,16 +275,15 @@ def _parse(raw):
     try:
         tokens = raw.strip().split()
         if not tokens:
-            return "off", {}
+            return "off", {}, []
         mode = tokens[0].lower()
         if mode not in ("on", "pi", "wf", "off"):
-            sys.stderr.write(
+            return "off", {}, [
                 "[orchestrator-mode] warning: unrecognized state-file mode "
                 "token %r -> treating as OFF (state file exists but its "
-                "first token is not on/pi/wf/off)\n" % tokens[0])
-            return "off", {}
-        if mode == "off":
-            return "off", {}
+                "first token is not on/pi/wf/off)\n" % tokens[0]]
+        # options are kept under "off" too: the hooks ignore them there, but
+        # a shadow= candidate ("off shadow=on") is still evaluated
         options = {}
         saw_allowed_models = False
         malformed_allowed_models = False
@@ -107,6 +296,36 @@ def _parse(raw):
             key = key.strip().lower()
             if not key:
                 continue
+            if key in ("gen", "crc"):
+                continue  # write_state() header, not an option
+            if key == "allow-mcp":
+                # MCP tool names are case-sensitive: keep the patterns as is.
+                patterns = [p.strip() for p in value.split(",")]
+                patterns = [p for p in patterns if p]
+                if patterns:
+                    options[key] = patterns
+                continue
+            if key == "safe-dirs":
+                # paths are case-sensitive: keep them as is
+                dirs = [d.strip() for d in value.split(",")]
+                dirs = [d for d in dirs if d]
+                if dirs:
+                    options[key] = dirs
+                continue
+            if key == "shadow":
+                # candidate policy; may carry case-sensitive allow-mcp globs
+                options[key] = value.strip()
+                continue
+            if key == "model-aliases":
+                # alias=target pairs: value "fast=haiku,smart=opus"
+                pairs = []
+                for pair in value.lower().split(","):
+                    alias, _, target = pair.partition("=")
+                    if alias.strip() and target.strip():
+                        pairs.append("%s=%s" % (alias.strip(), target.strip()))
+                if pairs:
+                    options[key] = pairs
+                continue
             if key == "allowed-models":
                 saw_allowed_models = True
                 models = [m.strip().lower() for m in value.split(",")]
@@ -116,15 +335,139 @@ def _parse(raw):
                 # empty value -> no restriction -> leave key absent
             else:
                 options[key] = value.strip().lower()
+        warnings = []
         if malformed_allowed_models and "allowed-models" in options:
-            sys.stderr.write(
+            warnings.append(
                 "[orchestrator-mode] warning: malformed allowed-models option "
                 "(stray token after mode line) -> discarding entire "
                 "allowed-models restriction, fail-open\n")
             del options["allowed-models"]
-        return mode, options
+        return mode, options, warnings
     except Exception:
-        return "off", {}
+        return "off", {}, []
+
+
+def _parse(raw):
+    """Parse raw state-file text -> (mode, options_dict), printing any
+    warnings (see _parse_collect) to stderr. Never raises."""
+    mode, options, warnings = _parse_collect(raw)
+    for w in warnings:
+        sys.stderr.write(w)
+    return mode, options
+
+
+# ---------------------------------------------------------------------------
+# Reading and writing the file under concurrent access.
+# ---------------------------------------------------------------------------
+
+# A file modified this recently may still be mid-write (see read_state_file).
+TORN_WINDOW_NS = 2 * 10**9
+_TORN_RETRY_DELAYS = (0.001, 0.002, 0.004, 0.008, 0.016, 0.032, 0.064)
+# Strict prefixes of a mode token: what a reader sees of "on"/"off"/"pi"/"wf"
+# when it catches a truncate-then-write half way.
+_MODE_PREFIXES = frozenset(("o", "of", "p", "w"))
+
+
+def _line_crc(tokens):
+    """crc32 of a versioned line's other tokens, single-space joined."""
+    return "%08x" % zlib.crc32(" ".join(tokens).encode("utf-8"))
+
+
+def _header_ok(tokens):
+    """None for an unversioned line; else whether its crc= matches the mode,
+    gen= and option tokens."""
+    if len(tokens) < 2 or not tokens[1].lower().startswith("gen="):
+        return None
+    if len(tokens) < 3 or not tokens[2].lower().startswith("crc="):
+        return False
+    return tokens[2][4:].lower() == _line_crc(tokens[:2] + tokens[3:])
+
+
+def _looks_torn(raw, st):
+    """Whether `raw` may be a partial read of a file being rewritten: it was
+    modified within TORN_WINDOW_NS and is empty, a bare mode-token prefix, or
+    a versioned line whose crc does not match."""
+    if time.time_ns() - st.st_mtime_ns > TORN_WINDOW_NS:
+        return False
+    tokens = raw.split()
+    if not tokens:
+        return True
+    if len(tokens) == 1 and tokens[0].lower() in _MODE_PREFIXES:
+        return True
+    return _header_ok(tokens) is False
+
+
+def read_state_file(path):
+    """Contents of the state file at `path` -> (raw text, os.stat_result of
+    the file that was read). Raises OSError like open().
+
+    The /orchestrator-mode:mode toggle writes the file in place with the
+    Write tool (truncate, then write), so a concurrent reader can catch it
+    empty or half-written, which parses as OFF. A read that looks torn (see
+    _looks_torn) is retried a few times over ~125ms. If it still looks torn,
+    it is returned as-is and parsed like any other content (fail open)."""
+    for delay in _TORN_RETRY_DELAYS + (None,):
+        with open(path, "r") as f:
+            raw = f.read()
+            st = os.fstat(f.fileno())
+        if delay is None or not _looks_torn(raw, st):
+            return raw, st
+        time.sleep(delay)
+
+
+def _format_options(options):
+    return ["%s=%s" % (k, ",".join(v) if isinstance(v, list) else v)
+            for k, v in options.items()]
+
+
+def write_state(directory, mode, options=None):
+    """Atomically replace `<directory>/.orchestrator-mode.state` with `mode`
+    and `options` (a dict shaped like get_state()'s) -> the new generation.
+
+    The line is versioned: `<mode> gen=<n> crc=<crc32> <options...>`. n is
+    the previous file's generation + 1, and the crc covers every other
+    token. Readers see the old file or the new one, never a mix: the line is
+    written to a temp file in the same directory, fsynced, and renamed over
+    the old one. Concurrent writers are serialized with flock() on the
+    directory so generations never repeat. Raises OSError (and ValueError
+    for an unknown mode)."""
+    mode = mode.lower()
+    if mode not in ("on", "pi", "wf", "off"):
+        raise ValueError("unknown orchestrator-mode mode %r" % mode)
+    path = os.path.join(directory, STATE_FILE_NAME)
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        try:
+            import fcntl
+            fcntl.flock(dir_fd, fcntl.LOCK_EX)
+        except (ImportError, OSError):
+            pass  # no locking: a racing writer may reuse a generation
+        generation = 1
+        try:
+            with open(path, "r") as f:
+                tokens = f.read().split()
+            if _header_ok(tokens):
+                generation = int(tokens[1][4:]) + 1
+        except (OSError, ValueError):
+            pass
+        body = [mode, "gen=%d" % generation] + _format_options(options or {})
+        tokens = body[:2] + ["crc=" + _line_crc(body)] + body[2:]
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        try:
+            with open(tmp, "w") as f:
+                f.write(" ".join(tokens) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        return generation
+    finally:
+        os.close(dir_fd)  # also drops the flock
 
 
 def get_state(data):
@@ -135,9 +478,272 @@ def get_state(data):
     Missing/unreadable/unrecognized -> ("off", {}) (fail open -- a broken or
     corrupted state file must never brick a session by denying tools; it just
     falls back to normal behavior)."""
+    explicit = os.environ.get("CLAUDE_PROJECT_DIR")
+    if not explicit:
+        cached = _cached_state(data.get("cwd") or os.getcwd())
+        if cached is not None:
+            return cached
+    elif _watchers:
+        watcher = _watchers.get(explicit)
+        if watcher is not None:
+            return watcher.current()
     try:
-        with open(state_file_path(data), "r") as f:
-            raw = f.read()
+        raw, _ = read_state_file(state_file_path(data))
     except Exception:
         return "off", {}
     return _parse(raw)
+
+
+def _cached_state(start):
+    """get_state() for the walk-up case, with the state file located through
+    the discovery cache; the file itself is always read and parsed. Returns
+    None when the cache can't answer (caller falls back to the uncached
+    read)."""
+    try:
+        result = _discovery_entry(start)
+        if result is None:
+            return None
+        entry, fresh = result
+        if fresh:
+            _save_entry(start, entry)
+        if entry["found"] is None:
+            return "off", {}
+        raw, _ = read_state_file(os.path.join(entry["found"], STATE_FILE_NAME))
+        return _parse(raw)
+    except Exception:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# StateWatcher: event-driven state for long-lived consumers.
+# ---------------------------------------------------------------------------
+
+DEFAULT_POLL_INTERVAL = 0.25
+
+# inotify(7) constants (linux/inotify.h)
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM
+               | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF
+               | _IN_MOVE_SELF | _IN_ONLYDIR)
+# Events meaning the watched dir itself is gone -> fall back to polling.
+_DIR_GONE = _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_IGNORED
+_STATE_FILE_NAME_B = STATE_FILE_NAME.encode()
+
+# Registry consulted by get_state(): project dir -> StateWatcher (watch()).
+_watchers = {}
+MAX_WATCHERS = 64
+
+
+def _inotify_fd(directory):
+    """Non-blocking inotify fd watching `directory`, or None when inotify is
+    unavailable (non-Linux, no libc, watch limit reached, ...)."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6",
+                           use_errno=True)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(directory), _WATCH_MASK) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except Exception:
+        return None
+
+
+class StateWatcher:
+    """Current parsed state of `<project_dir>/.orchestrator-mode.state`.
+
+    `state` is the last parsed (mode, options) snapshot. Reading it never
+    touches the filesystem. current() first applies any change already
+    signalled, so it is never stale with respect to a completed write (the
+    kernel queues the inotify event before the writer's syscall returns).
+    subscribe(cb) starts a background thread that calls cb(mode, options)
+    within milliseconds (inotify) or one poll interval of every change.
+
+    `backend` is "inotify" or "poll". The watcher drops to polling if the
+    project dir is removed or renamed. Polling compares the file's inode,
+    mtime, ctime and size, so (like the discovery cache) a same-size rewrite
+    within one filesystem timestamp tick is only seen at the next change. Like get_state(), it fails open:
+    missing or unreadable -> ("off", {}).
+    """
+
+    def __init__(self, project_dir, poll_interval=DEFAULT_POLL_INTERVAL,
+                 use_inotify=True):
+        import threading
+        self.project_dir = project_dir
+        self.path = os.path.join(project_dir, STATE_FILE_NAME)
+        self.poll_interval = poll_interval
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._subscribers = []
+        self._thread = None
+        self._fd = _inotify_fd(project_dir) if use_inotify else None
+        self._file_sig = None
+        self._snapshot = ("off", {}, [])
+        self._reload()
+
+    @property
+    def backend(self):
+        return "poll" if self._fd is None else "inotify"
+
+    @property
+    def state(self):
+        mode, options, _ = self._snapshot
+        return mode, options
+
+    def current(self):
+        """The state as of now: apply pending change signals, then return
+        the snapshot, replaying parse warnings to stderr like get_state()."""
+        if self._refresh():
+            self._notify()
+        mode, options, warnings = self._snapshot
+        for w in warnings:
+            sys.stderr.write(w)
+        return mode, options
+
+    def subscribe(self, callback):
+        """Call callback(mode, options) on every change. Callbacks run on a
+        background thread started on the first subscription, or on the
+        thread whose current() call noticed the change first. Returns
+        callback."""
+        import threading
+        with self._lock:
+            self._subscribers.append(callback)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="orchestrator-state-watcher",
+                    daemon=True)
+                self._thread.start()
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2 * self.poll_interval + 1)
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _reload(self, force=False):
+        """Re-parse (when `force`d by an inotify event, or when the file's
+        stat signature changed) -> whether the parsed (mode, options) did.
+        Caller holds the lock."""
+        try:
+            st = os.stat(self.path)
+            sig = (st.st_ino, st.st_mtime_ns, st.st_ctime_ns, st.st_size)
+        except OSError:
+            sig = None
+        if not force and sig == self._file_sig and sig is not None:
+            return False
+        self._file_sig = sig
+        try:
+            snapshot = _parse_collect(read_state_file(self.path)[0])
+        except Exception:
+            snapshot = ("off", {}, [])
+        changed = snapshot[:2] != self._snapshot[:2]
+        self._snapshot = snapshot
+        return changed
+
+    def _drain(self):
+        """Consume pending inotify events -> whether any concerned the state
+        file (or the watch itself). Caller holds the lock."""
+        import struct
+        relevant = False
+        while True:
+            try:
+                buf = os.read(self._fd, 65536)
+            except BlockingIOError:
+                return relevant
+            except OSError:
+                return True
+            offset = 0
+            while offset + 16 <= len(buf):
+                _, mask, _, length = struct.unpack_from("iIII", buf, offset)
+                name = buf[offset + 16:offset + 16 + length].rstrip(b"\0")
+                offset += 16 + length
+                if mask & _DIR_GONE:
+                    os.close(self._fd)
+                    self._fd = None
+                    return True
+                if mask & _IN_Q_OVERFLOW or name == _STATE_FILE_NAME_B:
+                    relevant = True
+
+    def _refresh(self):
+        """Apply pending changes -> whether the parsed state changed."""
+        with self._lock:
+            if self._fd is None:
+                return self._reload()
+            return self._drain() and self._reload(force=True)
+
+    def _run(self):
+        import select
+        while not self._stop.is_set():
+            fd = self._fd
+            if fd is None:
+                self._stop.wait(self.poll_interval)
+            else:
+                try:
+                    select.select([fd], [], [], self.poll_interval)
+                except (OSError, ValueError):
+                    pass  # closed by a concurrent _drain(): poll from now on
+            if not self._stop.is_set() and self._refresh():
+                self._notify()
+
+    def _notify(self):
+        mode, options = self.state
+        for callback in list(self._subscribers):
+            try:
+                callback(mode, options)
+            except Exception:
+                pass
+
+
+def watch(project_dir, poll_interval=DEFAULT_POLL_INTERVAL):
+    """Shared StateWatcher for `project_dir`, registered so that get_state()
+    with CLAUDE_PROJECT_DIR == project_dir is answered from it. Returns None
+    (get_state() keeps reading the file) once MAX_WATCHERS are registered."""
+    watcher = _watchers.get(project_dir)
+    if watcher is None:
+        if len(_watchers) >= MAX_WATCHERS:
+            return None
+        watcher = _watchers[project_dir] = StateWatcher(
+            project_dir, poll_interval)
+    return watcher
+
+
+def unwatch(project_dir=None):
+    """Close and unregister the watcher for `project_dir` (all when None)."""
+    for d in list(_watchers) if project_dir is None else [project_dir]:
+        watcher = _watchers.pop(d, None)
+        if watcher is not None:
+            watcher.close()
@@ -0,0 +1,219 @@
+"""Index of every .orchestrator-mode.state file under one tree (monorepos).
+
+_state.state_file_path() answers "which state file governs this cwd?" for
+one cwd at a time, by walking up and caching that walk. A monorepo with
+dozens of sub-projects, each with its own state file, wants the whole map
+at once. StateIndex scans the tree once and then answers from memory:
+
+  resolve(path)  nearest state file at or above `path` -> (dir, mode,
+                 options), found with one dict lookup per path component;
+                 no filesystem access
+  entries()      every state file in the tree, sorted by dir, with its
+                 parsed mode/options/warnings (under(prefix) for a subtree)
+  refresh()      incremental re-sync: one stat per indexed directory and
+                 state file. Only directories whose mtime changed are
+                 re-listed (adding, removing, or renaming an entry bumps it),
+                 and only state files whose inode/mtime/size changed are
+                 re-parsed.
+
+Directories in SKIP_DIRS are not descended into, and symlinked directories
+are not followed, so the index sees the tree the way `find -P` would.
+save()/load() keep it in the cache dir (see _cache.py), so a later process
+starts from the previous scan and only pays for refresh().
+
+The index answers exactly like the walk-up for trees it has been refreshed
+against. Use scripts/state-index.py to list or audit modes across a tree.
+"""
+import bisect
+import hashlib
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import _cache  # noqa: E402
+from _state import (  # noqa: E402
+    STATE_FILE_NAME, _parse_collect, read_state_file)
+
+SKIP_DIRS = frozenset((".git", ".hg", ".svn", "node_modules", "__pycache__",
+                       ".venv", ".tox"))
+
+INDEX_VERSION = 2  # 2: options kept under "off" (_state._parse_collect)
+
+
+def _file_sig(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_ino, st.st_mtime_ns, st.st_size]
+
+
+class StateIndex:
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+        self._dir_mtimes = {}   # every scanned dir -> st_mtime_ns
+        self._states = {}       # dir holding a state file -> entry dict
+        self._sorted = []       # sorted keys of _states (prefix table)
+
+    # -- queries -------------------------------------------------------------
+
+    def resolve(self, path):
+        """Nearest indexed state file at or above `path` (an absolute,
+        symlink-free path inside root) -> (dir, mode, options), or None."""
+        cur = os.path.normpath(path)
+        if cur != self.root and not cur.startswith(self.root + os.sep):
+            return None
+        states = self._states
+        while True:
+            entry = states.get(cur)
+            if entry is not None:
+                return cur, entry["mode"], entry["options"]
+            if cur == self.root:
+                return None
+            cur = os.path.dirname(cur)
+
+    def entries(self):
+        """[(dir, entry)] for every state file, sorted by dir. An entry holds
+        mode, options, and the parse warnings."""
+        return [(d, self._states[d]) for d in self._sorted]
+
+    def under(self, prefix):
+        """entries() restricted to `prefix` and its subdirectories."""
+        prefix = os.path.normpath(prefix)
+        lo = bisect.bisect_left(self._sorted, prefix)
+        out = []
+        for d in self._sorted[lo:]:
+            if d != prefix and not d.startswith(prefix + os.sep):
+                if d > prefix + os.sep:
+                    break
+                continue
+            out.append((d, self._states[d]))
+        return out
+
+    def __len__(self):
+        return len(self._states)
+
+    # -- building ------------------------------------------------------------
+
+    def build(self):
+        """Full scan of the tree (replaces whatever was indexed)."""
+        self._dir_mtimes.clear()
+        self._states.clear()
+        self._scan(self.root)
+        self._sorted = sorted(self._states)
+        return self
+
+    def _scan(self, top):
+        stack = [top]
+        while stack:
+            d = stack.pop()
+            try:
+                mtime = os.stat(d).st_mtime_ns
+                it = os.scandir(d)
+            except OSError:
+                continue
+            self._dir_mtimes[d] = mtime
+            with it:
+                for e in it:
+                    try:
+                        if e.name == STATE_FILE_NAME:
+                            if e.is_file():
+                                self._load_state(d)
+                        elif e.name not in SKIP_DIRS and e.is_dir(
+                                follow_symlinks=False):
+                            stack.append(e.path)
+                    except OSError:
+                        continue
+
+    def _load_state(self, d):
+        path = os.path.join(d, STATE_FILE_NAME)
+        sig = _file_sig(path)
+        try:
+            mode, options, warnings = _parse_collect(read_state_file(path)[0])
+        except Exception:
+            mode, options, warnings = "off", {}, []
+        self._states[d] = {"sig": sig, "mode": mode, "options": options,
+                           "warnings": warnings}
+
+    def _drop_subtree(self, d):
+        for key in [k for k in self._dir_mtimes
+                    if k == d or k.startswith(d + os.sep)]:
+            del self._dir_mtimes[key]
+            self._states.pop(key, None)
+
+    def _relist(self, d, mtime):
+        """Re-sync one directory whose entries changed: its own state file,
+        new subdirectories (scanned), and vanished ones (dropped)."""
+        try:
+            with os.scandir(d) as it:
+                names = {e.name: e for e in it}
+        except OSError:
+            self._drop_subtree(d)
+            return
+        self._dir_mtimes[d] = mtime
+        state = names.get(STATE_FILE_NAME)
+        if state is not None and state.is_file():
+            self._load_state(d)
+        else:
+            self._states.pop(d, None)
+        for key in [k for k in self._dir_mtimes if os.path.dirname(k) == d
+                    and k != d]:
+            e = names.get(os.path.basename(key))
+            if e is None or not e.is_dir(follow_symlinks=False):
+                self._drop_subtree(key)
+        for name, e in names.items():
+            if (name not in SKIP_DIRS and e.path not in self._dir_mtimes
+                    and e.is_dir(follow_symlinks=False)):
+                self._scan(e.path)
+
+    def refresh(self):
+        """Bring the index up to date -> sorted dirs whose parsed state was
+        added, removed, or changed."""
+        before = {d: (e["mode"], e["options"]) for d, e in self._states.items()}
+        for d in sorted(self._dir_mtimes):
+            if d not in self._dir_mtimes:
+                continue  # dropped with an ancestor earlier in this pass
+            try:
+                mtime = os.stat(d).st_mtime_ns
+            except OSError:
+                self._drop_subtree(d)
+                continue
+            if mtime != self._dir_mtimes[d]:
+                self._relist(d, mtime)
+                continue
+            entry = self._states.get(d)
+            if entry is not None and _file_sig(
+                    os.path.join(d, STATE_FILE_NAME)) != entry["sig"]:
+                self._load_state(d)
+        self._sorted = sorted(self._states)
+        after = {d: (e["mode"], e["options"]) for d, e in self._states.items()}
+        return sorted(d for d in set(before) | set(after)
+                      if before.get(d) != after.get(d))
+
+    # -- persistence -----------------------------------------------------------
+
+    @staticmethod
+    def cache_name(root):
+        digest = hashlib.sha1(os.fsencode(os.path.realpath(root))).hexdigest()
+        return "state-index-%s.json" % digest[:16]
+
+    def save(self):
+        _cache.store(self.cache_name(self.root), {
+            "version": INDEX_VERSION, "root": self.root,
+            "dirs": self._dir_mtimes, "states": self._states})
+
+    @classmethod
+    def load(cls, root):
+        """Index of `root` from the cache, refreshed; a full build when there
+        is no usable cached copy."""
+        index = cls(root)
+        cached = _cache.load(cls.cache_name(index.root))
+        if (cached.get("version") != INDEX_VERSION
+                or cached.get("root") != index.root
+                or not isinstance(cached.get("dirs"), dict)
+                or not isinstance(cached.get("states"), dict)):
+            return index.build()
+        index._dir_mtimes = cached["dirs"]
+        index._states = cached["states"]
+        index.refresh()
+        return index
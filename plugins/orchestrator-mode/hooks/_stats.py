@@ -0,0 +1,283 @@
+"""Per-step latency histograms for enforce-orchestrator.py.
+
+Enabled by the environment variable ORCHESTRATOR_STATS=1 (or on/true), so it
+also covers the OFF fast path, which has no state-file options. Each
+enforce-orchestrator.main() call then charges the time between its step
+checkpoints to the numbered decision steps of its docstring. Step 1 is the
+stdin parse. Step 2 is the state lookup and OFF check. Step 3 is the D2
+scan, 4/6/7 are the path checks, and 8-10 are the mode dispatch including
+the Workflow lint. Each call adds those durations plus its whole-call
+latency and its tool name to one shared file:
+
+    <cache dir>/hook-stats.bin     (see _cache.cache_dir())
+
+The file has a fixed size (about 26 KB) however many calls it has seen:
+
+  header     magic, layout version
+  histograms steps 1-10 plus "total"; each holds count, sum, max and
+             HISTOGRAM_BUCKETS uint32 buckets in HDR-style log-linear layout
+             (values below 32 us are exact; above that, 16 sub-buckets per
+             power of two, so a reported percentile is within ~6% of the
+             true value)
+  tools      TOOL_SLOTS open-addressed (crc32) slots of name, calls, denies,
+             sum us, repeat denies and escalated denies (deny loops, see
+             _denyloop.py); names that find no free slot are counted under
+             "(other)"
+
+Every update takes flock(LOCK_EX) on the file and changes a few words of an
+mmap in place, so concurrent hooks never lose each other's counts and nothing
+is re-serialized. A file with the wrong size or magic (older layout,
+truncation) is reset to empty. Timing starts at main() entry, so the python3
+startup and import cost of a spawned hook is not included; that is what
+scripts/bench-hooks.py measures.
+
+Read it with `python3 hooks/enforce-orchestrator.py --stats` (see main()).
+Fail-open: record() never raises into the hook.
+"""
+import os
+import struct
+import zlib
+
+STATS_FILE_NAME = "hook-stats.bin"
+
+MAGIC = b"OMST"
+LAYOUT_VERSION = 2
+
+STEPS = tuple(range(1, 11))
+TOTAL = "total"
+
+# Log-linear buckets: values < 2**SUB_BITS are their own bucket; above that
+# each power of two is split into 2**(SUB_BITS-1) linear sub-buckets.
+SUB_BITS = 5
+_SUB_COUNT = 1 << SUB_BITS
+_HALF = _SUB_COUNT >> 1
+MAX_VALUE_BITS = 32                   # values are clamped to < 2**32 us
+HISTOGRAM_BUCKETS = _SUB_COUNT + (MAX_VALUE_BITS - SUB_BITS) * _HALF
+
+TOOL_SLOTS = 64
+TOOL_NAME_BYTES = 56
+OTHER_TOOL = "(other)"
+
+_HEADER = struct.Struct("<4sI")
+_HIST_HEAD = struct.Struct("<QQQ")          # count, sum us, max us
+_BUCKET = struct.Struct("<I")
+_HIST_SIZE = _HIST_HEAD.size + HISTOGRAM_BUCKETS * _BUCKET.size
+# name, calls, denies, sum us, repeated denies, escalated denies
+_TOOL = struct.Struct("<%dsQQQQQ" % TOOL_NAME_BYTES)
+
+_HIST_NAMES = STEPS + (TOTAL,)
+_HIST_OFFSET = {name: _HEADER.size + i * _HIST_SIZE
+                for i, name in enumerate(_HIST_NAMES)}
+_TOOLS_OFFSET = _HEADER.size + len(_HIST_NAMES) * _HIST_SIZE
+FILE_SIZE = _TOOLS_OFFSET + TOOL_SLOTS * _TOOL.size
+
+
+def stats_path():
+    """Path of the shared stats file, or None when caching is disabled."""
+    import _cache
+    d = _cache.cache_dir()
+    return os.path.join(d, STATS_FILE_NAME) if d else None
+
+
+def bucket_index(us):
+    if us < _SUB_COUNT:
+        return max(us, 0)
+    us = min(us, (1 << MAX_VALUE_BITS) - 1)
+    shift = us.bit_length() - SUB_BITS
+    return _SUB_COUNT + (shift - 1) * _HALF + ((us >> shift) - _HALF)
+
+
+def bucket_range(index):
+    """Inclusive (low, high) microsecond range of bucket `index`."""
+    if index < _SUB_COUNT:
+        return index, index
+    shift, sub = divmod(index - _SUB_COUNT, _HALF)
+    shift += 1
+    low = (sub + _HALF) << shift
+    return low, low + (1 << shift) - 1
+
+
+def _tool_slot(buf, name):
+    """Offset of `name`'s tool slot, claiming a free one if needed."""
+    raw = name.encode("utf-8", "replace")[:TOOL_NAME_BYTES]
+    start = zlib.crc32(raw) % (TOOL_SLOTS - 1)
+    for i in range(TOOL_SLOTS - 1):
+        off = _TOOLS_OFFSET + ((start + i) % (TOOL_SLOTS - 1)) * _TOOL.size
+        stored = _TOOL.unpack_from(buf, off)[0].rstrip(b"\0")
+        if stored == raw:
+            return off
+        if not stored:
+            _TOOL.pack_into(buf, off, raw, 0, 0, 0, 0, 0)
+            return off
+    off = _TOOLS_OFFSET + (TOOL_SLOTS - 1) * _TOOL.size
+    _TOOL.pack_into(buf, off, OTHER_TOOL.encode(), *_TOOL.unpack_from(buf, off)[1:])
+    return off
+
+
+def _add(buf, name, us):
+    off = _HIST_OFFSET[name]
+    count, total, peak = _HIST_HEAD.unpack_from(buf, off)
+    _HIST_HEAD.pack_into(buf, off, count + 1, total + us, max(peak, us))
+    b = off + _HIST_HEAD.size + bucket_index(us) * _BUCKET.size
+    _BUCKET.pack_into(buf, b, min(_BUCKET.unpack_from(buf, b)[0] + 1, 0xFFFFFFFF))
+
+
+def _open(path, create):
+    """(fd, mmap) of a valid stats file, locked exclusively; resets a file of
+    the wrong size/layout. Caller closes both."""
+    import fcntl
+    import mmap
+    if create:
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    else:
+        fd = os.open(path, os.O_RDWR)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        if os.fstat(fd).st_size != FILE_SIZE:
+            os.ftruncate(fd, 0)
+            os.ftruncate(fd, FILE_SIZE)
+        buf = mmap.mmap(fd, FILE_SIZE)
+        if _HEADER.unpack_from(buf, 0) != (MAGIC, LAYOUT_VERSION):
+            buf[:] = bytes(FILE_SIZE)
+            _HEADER.pack_into(buf, 0, MAGIC, LAYOUT_VERSION)
+        return fd, buf
+    except BaseException:
+        os.close(fd)
+        raise
+
+
+def record(path, steps, total_us, tool, denied, repeated=False,
+           escalated=False):
+    """Add one main() call: `steps` maps step number -> microseconds spent
+    in it. `repeated`: the deny repeats an identical earlier one in the same
+    session; `escalated`: its reason was escalated (see _denyloop.py). Never
+    raises."""
+    try:
+        fd, buf = _open(path, create=True)
+    except Exception:
+        return
+    try:
+        for step, us in steps.items():
+            _add(buf, step, us)
+        _add(buf, TOTAL, total_us)
+        off = _tool_slot(buf, tool or "")
+        name, calls, denies, total, repeats, escalations = \
+            _TOOL.unpack_from(buf, off)
+        _TOOL.pack_into(buf, off, name, calls + 1, denies + bool(denied),
+                        total + total_us, repeats + bool(repeated),
+                        escalations + bool(escalated))
+    except Exception:
+        pass
+    finally:
+        buf.close()
+        os.close(fd)
+
+
+def _percentiles(buckets, count, pcts):
+    """Upper bound of the bucket holding each requested percentile (the
+    caller clamps it to the recorded max)."""
+    out, seen, want = [], 0, [max(1, -(-count * p // 100)) for p in pcts]
+    for index, n in enumerate(buckets):
+        seen += n
+        while want and seen >= want[0]:
+            out.append(bucket_range(index)[1])
+            want.pop(0)
+        if not want:
+            break
+    return out + [0] * len(want)
+
+
+def snapshot(path):
+    """Decoded stats file -> {"steps": {name: {...}}, "tools": {...}};
+    None when the file does not exist."""
+    try:
+        fd, buf = _open(path, create=False)
+    except FileNotFoundError:
+        return None
+    try:
+        data = bytes(buf)
+    finally:
+        buf.close()
+        os.close(fd)
+    steps = {}
+    for name in _HIST_NAMES:
+        off = _HIST_OFFSET[name]
+        count, total, peak = _HIST_HEAD.unpack_from(data, off)
+        if not count:
+            continue
+        buckets = struct.unpack_from("<%dI" % HISTOGRAM_BUCKETS, data,
+                                     off + _HIST_HEAD.size)
+        p50, p95, p99 = (min(p, peak) for p in
+                         _percentiles(buckets, count, (50, 95, 99)))
+        steps[str(name)] = {"count": count, "mean_us": total // count,
+                            "p50_us": p50, "p95_us": p95, "p99_us": p99,
+                            "max_us": peak}
+    tools = {}
+    for i in range(TOOL_SLOTS):
+        name, calls, denies, total, repeats, escalations = _TOOL.unpack_from(
+            data, _TOOLS_OFFSET + i * _TOOL.size)
+        name = name.rstrip(b"\0").decode("utf-8", "replace")
+        if calls:
+            tools[name or "(none)"] = {"calls": calls, "denies": denies,
+                                       "repeat_denies": repeats,
+                                       "escalated": escalations,
+                                       "mean_us": total // calls}
+    return {"steps": steps, "tools": tools}
+
+
+def reset(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def format_report(snap):
+    lines = ["%-6s %9s %8s %8s %8s %8s %9s" % (
+        "step", "calls", "mean us", "p50 us", "p95 us", "p99 us", "max us")]
+    for name, s in snap["steps"].items():
+        lines.append("%-6s %9d %8d %8d %8d %8d %9d" % (
+            name, s["count"], s["mean_us"], s["p50_us"], s["p95_us"],
+            s["p99_us"], s["max_us"]))
+    lines.append("")
+    lines.append("%-40s %9s %9s %9s %9s %8s" % (
+        "tool", "calls", "denies", "repeats", "escalated", "mean us"))
+    for name, t in sorted(snap["tools"].items(),
+                          key=lambda kv: (-kv[1]["calls"], kv[0])):
+        lines.append("%-40s %9d %9d %9d %9d %8d" % (
+            name[:40], t["calls"], t["denies"], t["repeat_denies"],
+            t["escalated"], t["mean_us"]))
+    return "\n".join(lines) + "\n"
+
+
+def main(argv):
+    """`enforce-orchestrator.py --stats [--json] [--reset]`."""
+    import argparse
+    import json
+    import sys
+    parser = argparse.ArgumentParser(
+        prog="enforce-orchestrator.py --stats",
+        description="Per-step latency of the PreToolUse gate "
+                    "(recorded with ORCHESTRATOR_STATS=1).")
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--reset", action="store_true",
+                        help="delete the recorded stats")
+    args = parser.parse_args(argv)
+    path = stats_path()
+    if path is None:
+        sys.stderr.write("stats disabled: ORCHESTRATOR_CACHE_DIR=off\n")
+        return 1
+    if args.reset:
+        reset(path)
+        return 0
+    snap = snapshot(path)
+    if snap is None:
+        sys.stderr.write("no stats at %s (run the hooks with "
+                         "ORCHESTRATOR_STATS=1)\n" % path)
+        return 1
+    if args.json:
+        sys.stdout.write(json.dumps(snap, indent=2) + "\n")
+    else:
+        sys.stdout.write("%s\n\n%s" % (path, format_report(snap)))
+    return 0
@@ -0,0 +1,466 @@
+"""Single-pass JS/TS tokenizer for the Workflow model-allowlist lint (D4b).
+
+lint(script) walks the script ONCE, left to right, skipping comments, string
+and template literals, and regex literals, and tracks bracket nesting so every
+`agent(` call is paired with its own argument list. For each call it records
+whether a `model:` key was declared -- directly in the call's parentheses
+(`agent('a', model: "x")`, the shorthand form the hook has always accepted)
+or as a top-level key of an object-literal argument (`agent('a', {model:
+"x"})`) -- and, separately, every quoted `model: "..."` value declared as an
+object key anywhere in the code, with line numbers for both.
+
+Still a lint, not a JS parser (cooperative-guardrail security model, see
+README): a model that cannot be known statically fails OPEN --
+  - `model: someVar` / `model: pick()` / a template with `${}` -> declared,
+    value unknown (never an off-list DENY);
+  - an option argument that is not a literal (`agent(p, opts)`,
+    `agent(p, {...defaults})`, `agent(p, make())`) -> treated as declaring a
+    model.
+An empty model (`model: ""`) is treated as missing.
+
+Linear time: one compiled master regex consumes whitespace and comments
+inside the regex engine, so the Python loop runs once per significant token.
+A string or regex literal that fails to close scans to the end of its line;
+lint() records that line end per opener (quote character / regex `/`) and
+does not retry the same opener before it, so no tail is scanned twice. For
+strings that skips only attempts that must fail too; a later `/` that could
+still open a regex literal on that line only follows an unterminated one,
+which is a syntax error anyway, and is taken as a plain `/`.
+The regexes are compiled on first use -- this module is only imported when a
+Workflow call is linted under an active allowlist.
+
+Orchestrators re-submit the same script many times per session, so
+verdict()/verdict_for_path() memoize the lint outcome in process (the
+long-lived gate-daemon.py is where repeats land) keyed by (sha256 of the
+script, normalized allowlist and model-aliases, LINTER_VERSION), with LRU
+eviction. A `scriptPath` file whose inode/mtime/size are unchanged maps
+straight to its last content hash, so a repeat costs one stat and one memo
+lookup -- no read, no hash, no scan. Nothing is kept on disk: a verdict file
+any process could write would let a forged "clean" entry skip the lint.
+"""
+import hashlib
+import os
+import re
+import time
+
+# Bump whenever lint() or verdict() semantics change: cached verdicts from an
+# older linter are then never served.
+LINTER_VERSION = 3
+
+_LINT_CACHE_MAX_ENTRIES = 256
+_MAX_STORED_LINES = 10
+_MAX_STORED_VALUES = 20
+
+# Verdicts by _verdict_key(), and realpath -> [ino, mtime_ns, size, digest]
+# for scriptPath files; both in process only, LRU-bounded.
+_verdict_memo = {}
+_path_memo = {}
+
+# The tokenizer works on bytes (UTF-8): a `scriptPath` file is scanned straight
+# out of an mmap with no decode/copy of the whole script (see
+# verdict_for_path), and an inline script is encoded once, shared with the
+# content hash.
+
+# Tokens after which a `model` word or string can be an object key (`(` for
+# the bare `agent('a', model: "x")` shorthand).
+_KEY_PREV = frozenset((b"{", b",", b"("))
+
+_CLOSERS = {b"(": b")", b"[": b"]", b"{": b"}"}
+_CLOSERS_SET = frozenset(_CLOSERS.values())
+
+# Keywords after which a `/` starts a regex literal rather than a division.
+_REGEX_AFTER_WORDS = frozenset((
+    b"return", b"typeof", b"instanceof", b"in", b"of", b"new", b"delete",
+    b"void", b"throw", b"case", b"do", b"else", b"yield", b"await",
+))
+
+# Token kinds tracked as "previous significant token".
+_K_WORD, _K_VALUE, _K_PUNCT = 0, 1, 2
+
+_TOKEN_PATTERN = rb"""
+    (?:\s+|//[^\n]*|/\*.*?(?:\*/|\Z))*      # skipped: whitespace, comments
+    (?:
+        (?P<word>[A-Za-z_$\x80-\xff][\w$\x80-\xff]*)
+      | (?P<num>\.?\d[\w.]*)
+      | (?P<quote>["'])
+      | (?P<tpl>`)
+      | (?P<spread>\.\.\.)
+      | (?P<punct>[(){}\[\],:;/])
+      | (?P<other>.)
+      | (?P<end>\Z)
+    )
+"""
+_STRING_PATTERN = rb""""(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*'"""
+_REGEX_LITERAL_PATTERN = rb"/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*"
+_TEMPLATE_CHUNK_PATTERN = rb"(?:[^`\\$]|\\.|\$(?!\{))*(`|\$\{|\Z)"
+
+_RES = None
+
+
+def _regexes():
+    global _RES
+    if _RES is None:
+        _RES = (re.compile(_TOKEN_PATTERN, re.S | re.X),
+                re.compile(_STRING_PATTERN, re.S),
+                re.compile(_REGEX_LITERAL_PATTERN, re.S),
+                re.compile(_TEMPLATE_CHUNK_PATTERN, re.S))
+    return _RES
+
+
+class AgentCall:
+    """One `agent(` call site. `model` is None (no model key), "" (empty
+    string -- counts as missing), the lowercased literal value, or
+    DYNAMIC (declared but not statically known)."""
+    __slots__ = ("line", "model", "opaque", "arg_index", "at_arg_start")
+
+    def __init__(self, line):
+        self.line = line
+        self.model = None
+        self.opaque = False
+        self.arg_index = 0
+        self.at_arg_start = True
+
+    @property
+    def declares_model(self):
+        return self.opaque or bool(self.model)
+
+
+DYNAMIC = object()
+
+
+class LintResult:
+    """calls: every AgentCall in source order; values: (line, value) for
+    every quoted `model:` key value anywhere in the code, lowercased and
+    stripped."""
+    __slots__ = ("calls", "values")
+
+    def __init__(self, calls, values):
+        self.calls = calls
+        self.values = values
+
+    def missing_model_lines(self):
+        return [c.line for c in self.calls if not c.declares_model]
+
+
+def _text(raw):
+    return raw.decode("utf-8", "replace").strip().lower()
+
+
+def _unquote(token):
+    """Body of a string literal token (bytes), decoded, with the common
+    escapes resolved well enough for a model name comparison."""
+    body = token[1:-1]
+    if b"\\" in body:
+        body = re.sub(rb"\\(.)", rb"\1", body, flags=re.S)
+    return _text(body)
+
+
+def _newlines(buf, start, end):
+    """Newlines in buf[start:end] (mmap has no .count(); copy just that
+    span)."""
+    try:
+        return buf.count(b"\n", start, end)
+    except AttributeError:
+        return memoryview(buf)[start:end].tobytes().count(b"\n")
+
+
+def _line_end(buf, pos):
+    """Offset of the first newline at or after pos, else len(buf)."""
+    try:
+        end = buf.find(b"\n", pos)
+    except AttributeError:
+        end = memoryview(buf)[pos:].tobytes().find(b"\n")
+        if end != -1:
+            end += pos
+    return len(buf) if end == -1 else end
+
+
+class _Overrun(Exception):
+    """lint() passed its deadline; verdict() turns it into ScriptTooLarge."""
+
+
+def lint(script, deadline=None):
+    """Tokenize `script` (str, bytes, or any bytes-like buffer such as an
+    mmap) once; -> LintResult. Never raises on odd input -- unterminated
+    strings/comments/templates just end the scan. With a `deadline`
+    (time.monotonic() value), checked every 1024 tokens, raises _Overrun once
+    it has passed."""
+    if isinstance(script, str):
+        script = script.encode("utf-8", "surrogatepass")
+    token_re, str_re, regex_re, tpl_re = _regexes()
+    calls = []
+    values = []
+    # Bracket stack entries: [closer, call, is_call_paren, is_substitution].
+    # `call` is the AgentCall owning this frame (its argument parens, or an
+    # object literal passed directly as one of its arguments), else None.
+    stack = []
+    outer = [None, None, False, False]
+    prev_kind, prev_text = _K_PUNCT, b";"
+    pending_call = None        # line of an `agent` word awaiting its `(`
+    key_frame = None           # frame holding a `model` key candidate
+    value_frame = None         # frame whose `model:` awaits its value
+    line, line_pos = 1, 0
+    pos = 0
+    # Opener (b'"', b"'", b"/") -> end of the line on which a literal it
+    # opened last failed to close; no retry before that offset.
+    unclosed = {}
+    ticks = 0
+
+    while True:
+        if deadline is not None:
+            ticks += 1
+            if not ticks & 1023 and time.monotonic() > deadline:
+                raise _Overrun()
+        m = token_re.match(script, pos)
+        kind = m.lastgroup
+        if kind == "end":
+            break
+        start = m.start(kind)
+        text = m.group(kind)
+        pos = m.end()
+        if kind == "quote":
+            literal = None
+            if start >= unclosed.get(text, 0):
+                literal = str_re.match(script, start)
+                if literal is None:
+                    unclosed[text] = _line_end(script, start)
+            if literal is not None:
+                kind, text, pos = "str", literal.group(), literal.end()
+            else:
+                kind = "other"
+        top = stack[-1] if stack else outer
+        call = top[1]
+
+        if value_frame is not None:
+            # Value of a `model:` key.
+            frame, value_frame = value_frame, None
+            value = DYNAMIC
+            if kind == "str":
+                value = _unquote(text)
+            elif kind == "tpl":
+                body = tpl_re.match(script, pos)
+                if body.group(1) == b"`":
+                    value = _text(script[pos:body.end() - 1])
+            if value is not DYNAMIC:
+                line += _newlines(script, line_pos, start)
+                line_pos = start
+                values.append((line, value))
+            if frame[1] is not None and frame[1].model is None:
+                frame[1].model = value
+
+        elif key_frame is not None:
+            # A `model` word/string is a key only when `:` follows.
+            frame, key_frame = key_frame, None
+            if kind == "punct" and text == b":":
+                value_frame = frame
+                prev_kind, prev_text = _K_PUNCT, b":"
+                continue
+            owner = frame[1]
+            if owner is not None and owner.model is None:
+                if not frame[2] and kind == "punct" and text in b",}":
+                    owner.model = DYNAMIC   # shorthand `{ model }`
+                elif frame[2] and owner.arg_index > 0:
+                    owner.opaque = True     # `agent(p, model)`: a variable
+
+        elif pending_call is not None:
+            call_line, pending_call = pending_call, None
+            if kind == "punct" and text == b"(":
+                call = AgentCall(call_line)
+                calls.append(call)
+                stack.append([b")", call, True, False])
+                prev_kind, prev_text = _K_PUNCT, b"("
+                continue
+
+        if call is not None:
+            if top[2] and call.at_arg_start:
+                # First token of one of the call's arguments.
+                call.at_arg_start = False
+                if kind == "spread" or (call.arg_index > 0 and (
+                        (kind in ("word", "other") and text != b"model")
+                        or text == b"(" or text == b"[")):
+                    call.opaque = True
+            elif not top[2] and kind == "spread" and prev_text in (b"{", b","):
+                call.opaque = True  # `{...defaults}` in an option object
+
+        if kind == "word":
+            if text == b"model" and prev_kind == _K_PUNCT and prev_text in _KEY_PREV:
+                key_frame = top
+            elif text == b"agent" and prev_text != b"function":
+                line += _newlines(script, line_pos, start)
+                line_pos = start
+                pending_call = line
+            prev_kind, prev_text = _K_WORD, text
+        elif kind == "str":
+            if (text[1:-1] == b"model" and prev_kind == _K_PUNCT
+                    and prev_text in _KEY_PREV):
+                key_frame = top
+            prev_kind, prev_text = _K_VALUE, text
+        elif kind == "num":
+            prev_kind, prev_text = _K_VALUE, text
+        elif kind == "tpl":
+            body = tpl_re.match(script, pos)
+            pos = body.end()
+            if body.group(1) == b"${":
+                stack.append([b"}", None, False, True])
+                prev_kind, prev_text = _K_PUNCT, b"{"
+            else:
+                prev_kind, prev_text = _K_VALUE, b"`"
+        elif kind == "punct":
+            if text == b"(" or text == b"[" or text == b"{":
+                owner = call if (text == b"{" and top[2]) else None
+                stack.append([_CLOSERS[text], owner, False, False])
+            elif text == b")" or text == b"]" or text == b"}":
+                frame = None
+                while stack:  # pop to the matching opener; tolerate imbalance
+                    frame = stack.pop()
+                    if frame[0] == text:
+                        break
+                if frame is not None and frame[3]:
+                    # End of a `${...}` substitution: back into the template.
+                    body = tpl_re.match(script, pos)
+                    pos = body.end()
+                    if body.group(1) == b"${":
+                        stack.append([b"}", None, False, True])
+                        prev_kind, prev_text = _K_PUNCT, b"{"
+                    else:
+                        prev_kind, prev_text = _K_VALUE, b"`"
+                    continue
+            elif text == b",":
+                if call is not None and top[2]:
+                    call.arg_index += 1
+                    call.at_arg_start = True
+            elif text == b"/" and not (
+                    prev_kind == _K_VALUE or prev_text in _CLOSERS_SET or (
+                        prev_kind == _K_WORD
+                        and prev_text not in _REGEX_AFTER_WORDS)):
+                literal = None
+                if start >= unclosed.get(b"/", 0):
+                    literal = regex_re.match(script, start)
+                    if literal is None:
+                        unclosed[b"/"] = _line_end(script, start)
+                if literal is not None:
+                    pos = literal.end()
+                    prev_kind, prev_text = _K_VALUE, b"/"
+                    continue
+            prev_kind, prev_text = _K_PUNCT, text
+        else:
+            prev_kind, prev_text = _K_PUNCT, text
+    return LintResult(calls, values)
+
+
+def _verdict(result, allowed_models, model_allowed, aliases=None):
+    """Reduce a LintResult to the facts a deny reason needs (JSON-safe):
+    {"calls": n, "missing": n, "missing_lines": [...], "offending":
+    [[value, line], ...]} -- both lists empty means no objection."""
+    missing = result.missing_model_lines()
+    offending = []
+    seen = set()
+    extra = (aliases,) if aliases else ()
+    for line, value in result.values:
+        if (value and value not in seen
+                and not model_allowed(value, allowed_models, *extra)):
+            seen.add(value)
+            offending.append([value, line])
+    return {"calls": len(result.calls), "missing": len(missing),
+            "missing_lines": missing[:_MAX_STORED_LINES],
+            "offending": offending[:_MAX_STORED_VALUES]}
+
+
+def _verdict_key(digest, allowed_models, aliases=None):
+    # Order/duplicates in the allowlist don't change the verdict (family
+    # match against a set), so they don't split the memo either. Aliases
+    # change which values match, so they are part of the key when set.
+    key = "v:%s:%d:%s" % (digest, LINTER_VERSION,
+                          ",".join(sorted(set(allowed_models))))
+    if aliases:
+        key += ";" + ",".join(sorted(set(aliases)))
+    return key
+
+
+def _remember(memo, key, value):
+    memo.pop(key, None)
+    memo[key] = value
+    while len(memo) > _LINT_CACHE_MAX_ENTRIES:
+        del memo[next(iter(memo))]
+
+
+class ScriptTooLarge(Exception):
+    """The script exceeds the configured max-script-bytes limit, or (when
+    `seconds` is set) its lint ran past that time budget; the caller applies
+    the oversize-script policy (see enforce-orchestrator.py)."""
+
+    def __init__(self, size, limit, seconds=None):
+        Exception.__init__(self, size, limit, seconds)
+        self.size = size
+        self.limit = limit
+        self.seconds = seconds
+
+
+def verdict(script, allowed_models, model_allowed, digest=None,
+            max_bytes=None, aliases=None, max_seconds=None):
+    """Lint `script` (str or bytes-like) against `allowed_models`
+    (model_allowed(value, allowed[, aliases]) decides family matches; the
+    model-aliases list is passed only when set) -> verdict dict
+    (see _verdict), memoized by content hash. Raises ScriptTooLarge when
+    `script` exceeds `max_bytes`, or when the lint itself takes longer than
+    `max_seconds` (nothing is memoized then)."""
+    if isinstance(script, str):
+        if max_bytes is not None and len(script) > max_bytes:
+            raise ScriptTooLarge(len(script), max_bytes)  # bytes >= chars
+        script = script.encode("utf-8", "surrogatepass")
+    if max_bytes is not None and len(script) > max_bytes:
+        raise ScriptTooLarge(len(script), max_bytes)
+    if digest is None:
+        digest = hashlib.sha256(script).hexdigest()
+    key = _verdict_key(digest, allowed_models, aliases)
+    hit = _verdict_memo.get(key)
+    if hit is None:
+        deadline = None
+        if max_seconds is not None:
+            deadline = time.monotonic() + max_seconds
+        try:
+            result = lint(script, deadline)
+        except _Overrun:
+            raise ScriptTooLarge(len(script), max_bytes, max_seconds)
+        hit = _verdict(result, allowed_models, model_allowed, aliases)
+    _remember(_verdict_memo, key, hit)
+    return hit
+
+
+def verdict_for_path(path, allowed_models, model_allowed, max_bytes=None,
+                     aliases=None, max_seconds=None):
+    """verdict() for the script file at `path`. An unchanged file (same
+    inode/mtime/size as when last hashed) is not re-read at all; otherwise
+    the file is mmap'd and hashed/linted in place, never copied into a
+    Python string. Raises ScriptTooLarge past `max_bytes` (checked from
+    stat(), before any read) or `max_seconds` (see verdict), and OSError when the file can't be read -- the
+    caller fails open."""
+    st = os.stat(path)
+    if max_bytes is not None and st.st_size > max_bytes:
+        raise ScriptTooLarge(st.st_size, max_bytes)
+    sig = [st.st_ino, st.st_mtime_ns, st.st_size]
+    path_key = os.path.realpath(path)
+    seen = _path_memo.get(path_key)
+    if seen is not None and seen[:3] == sig:
+        key = _verdict_key(seen[3], allowed_models, aliases)
+        hit = _verdict_memo.get(key)
+        if hit is not None:
+            _remember(_verdict_memo, key, hit)
+            return hit
+    import mmap
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if max_bytes is not None and size > max_bytes:
+            raise ScriptTooLarge(size, max_bytes)  # grew since the stat
+        if size == 0:
+            buf = b""
+        else:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            digest = hashlib.sha256(buf).hexdigest()
+            _remember(_path_memo, path_key, sig + [digest])
+            return verdict(buf, allowed_models, model_allowed, digest,
+                           aliases=aliases, max_seconds=max_seconds)
+        finally:
+            if size:
+                buf.close()
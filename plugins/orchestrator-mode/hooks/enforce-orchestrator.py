@@ -16,7 +16,7 @@ options after the mode token (e.g. "wf allowed-models=opus,sonnet,haiku").
 - PI: like ON, but there is no general delegation escape hatch -- Task/Agent
   is denied outright (ADR-003: the pi-delegate subagent no longer exists).
   Code changes go through the pi-delegate MCP tools directly (allowlisted by
-  tool-name prefix, see handle_pi_mode). Workflow is NOT allowlisted under PI
+  tool-name prefix, see PI_DELEGATE_MCP_PREFIXES). Workflow is NOT allowlisted under PI
   either (it can spawn arbitrary subagents). Everything else that would be
   denied under ON is denied under PI too, with a pi-specific reason.
 - WF: like ON, but the general Task/Agent delegation escape hatch is closed
@@ -55,10 +55,10 @@ nothing / let normal flow proceed"):
                                       (regardless of agent_id or mode). Runs
                                       BEFORE the subagent bypass so it applies
                                       to main thread AND subagents alike.
-                                      Best-effort substring lint (same standard
-                                      as MODEL_OPTION_RE) -- can be evaded by
-                                      obfuscating the path string, but raises
-                                      the bar.
+                                      Best-effort substring lint (same
+                                      standard as the Workflow model lint) --
+                                      can be evaded by obfuscating the path
+                                      string, but raises the bar.
   4. subagent Write/Edit/MultiEdit/NotebookEdit
      targeting the state file      -> DENY (subagents may not toggle the mode;
                                       a blocked delegated agent once silently
@@ -80,8 +80,15 @@ nothing / let normal flow proceed"):
                                       repo/product code -- they hold session
                                       memory and plan artifacts only. Subagents
                                       are unaffected (already full-access via
-                                      step 5). Non-matching paths fall through
-                                      to the normal mode dispatch.
+                                      step 5). The state option
+                                      safe-dirs=<dir,...> adds more such dirs
+                                      for the project. Non-matching paths
+                                      fall through to the normal mode
+                                      dispatch.
+  8-10. one DECISION_TABLE lookup on (mode, tool class), compiled at import
+     from the rules below (any pair missing from the table -> deny).
+     Steps 4/6/7 only run for PATH_MUTATION_TOOLS and step 3 only for
+     STATE_SCAN_CLASSES, so every other tool skips the path work entirely.
   8. mode == "on"  -> tool in MAIN_ALLOWLIST -> silent no-op; else deny.
   9. mode == "wf"  -> Task/Agent -> allow ONLY subagent_type ==
                        WF_EXPLORE_SUBAGENT_TYPE, else DENY (fail-CLOSED, same
@@ -93,11 +100,35 @@ nothing / let normal flow proceed"):
                     -> mcp__pi-delegate__* / mcp__plugin_pi-delegate_* ->
                        silent no-op.
                     -> tool in PI_MODE_ALLOWLIST -> silent no-op; else deny.
+  8-10 also: an mcp__* tool the mode would deny, matching one of the
+     state's `allow-mcp=<glob,...>` patterns -> silent no-op (per-project MCP
+     opt-in; step 3's state-file scan still ran first).
+
+The steps live in decide(), which returns a Decision (noop()/deny() end it
+by raising) instead of exiting, so it can be called in a loop; main() is the
+hook wrapper that parses stdin, records, prints the deny envelope and exits 0.
+`python3 enforce-orchestrator.py --batch` runs decide() over newline-delimited
+payloads on stdin and writes one JSON decision per line.
+
+Every noop()/deny() call passes the number of the step that decided it;
+with the `audit=on` state option that number, the decision, and the latency
+are appended to the project's audit log (see _audit.py). With
+ORCHESTRATOR_STATS=1 in the environment, main() also times each step it runs
+(see _lap()) into shared per-step histograms (_stats.py); print them with
+`python3 enforce-orchestrator.py --stats`. Identical denies repeated within
+one session are counted (_denyloop.py, see _count_deny()); with the
+`deny-escalate=N` state option, a mode deny repeated more than N times gets a
+short escalated reason instead. A `shadow=<mode>[,key=value,...]` option
+makes main() also run steps 3-10 under that candidate state and log where
+it disagrees with the live decision (see _run_shadow()); only the live
+decision is emitted.
 
 MODEL ALLOWLIST (composes with steps 8/9/10): when the active mode carries an
 `allowed-models=<m1,m2,...>` option, matching is case-insensitive substring/
 family match (D3: allowlist entry "sonnet" permits any requested model id
-containing "sonnet", e.g. "claude-sonnet-5" -- see _model_allowed()), and an
+containing "sonnet", e.g. "claude-sonnet-5" -- see _model_allowed()). An
+optional `model-aliases=<alias=model,...>` option lets a call name a family by
+alias (`model: "fast"` with `fast=haiku`). An
 extra check runs on delegation calls that the mode gating would otherwise
 ALLOW:
   - Task/Agent (any subagent_type under `on`; Explore under `wf`; pi-delegate
@@ -106,15 +137,14 @@ ALLOW:
     declare a model from the list. An explicit model not matching any
     allowlist entry -> DENY.
   - Workflow (under `on` and `wf`; denied outright under `pi` anyway): (D4)
-    if the script contains any `agent(` calls, the number of `model:` option
-    occurrences must be >= the number of `agent(` calls, else DENY (best-
-    effort presence lint -- comments containing "model:" can cause false
-    negatives, never false positives on scripts with zero `agent(` calls).
-    The script text (`tool_input.script`, or the file at
-    `tool_input.scriptPath`, unreadable -> fail open) is then also
-    regex-linted for quoted `model: "..."` option values; any value NOT
-    matching the allowlist (family match) -> DENY. Best-effort lint,
-    consistent with the cooperative-guardrail security model.
+    the script text (`tool_input.script`, or the file at
+    `tool_input.scriptPath`, unreadable -> fail open) is tokenized once
+    (hooks/_workflow_lint.py: comments/strings/regex literals skipped) and
+    every `agent(` call paired with its arguments; a call declaring no
+    `model:` -> DENY naming its line. Any quoted `model: "..."` value NOT
+    matching the allowlist (family match) -> DENY. Statically unknowable
+    models fail open. Best-effort lint, consistent with the
+    cooperative-guardrail security model.
 A malformed `allowed-models` option in the state file (e.g. a stray bare
 token from "opus, haiku" with a space) discards the ENTIRE option (no
 restriction applies) and prints a stderr warning -- see _state.py's _parse().
@@ -144,14 +174,19 @@ below) -- the belt to step 3's suspenders.
 
 Debug: set ORCHESTRATOR_DEBUG=true for stderr tracing.
 """
+import collections
 import json
 import os
-import re
 import sys
-from typing import NoReturn
+import time
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from _state import get_state, project_dir, state_file_path  # noqa: E402
+import _output  # noqa: E402
+import _paths  # noqa: E402
+import _payload  # noqa: E402
+from _state import (  # noqa: E402
+    _parse_collect, get_state, option_enabled, parse_size, project_dir,
+    state_file_path)
 
 
 # Appended to EVERY mode-branch deny reason. Background: a blocked delegated
@@ -202,9 +237,9 @@ MAIN_ALLOWLIST = {
 
 # ADR-003: the pi-delegate subagent no longer exists -- Task/Agent has no
 # allowed target under mode == "pi" and is denied outright (see
-# handle_pi_mode below). The coupling to pi-delegate is now the
-# mcp__pi-delegate__ / mcp__plugin_pi-delegate_ tool-name prefix, checked
-# directly in handle_pi_mode -- no subagent_type constant needed here.
+# the decision table below). The coupling to pi-delegate is now the
+# mcp__pi-delegate__ / mcp__plugin_pi-delegate_ tool-name prefix
+# (PI_DELEGATE_MCP_PREFIXES) -- no subagent_type constant needed here.
 
 # The ONLY subagent_type Task/Agent may target while mode == "wf". This is the
 # built-in, read-only "scout" agent type shipped with Claude Code itself (not
@@ -260,8 +295,9 @@ PI_MODE_ALLOWLIST = {
 # MAIN_ALLOWLIST in 0.2.3 (pure delegation, same category as Task/Agent) but
 # deliberately NOT added to PI_MODE_ALLOWLIST. Workflow can itself spawn
 # arbitrary subagents (potentially bypassing the pi-delegate-only
-# restriction), so under mode == "pi" it still falls through to the final
-# `else: deny` branch below -- denied by default, not specially allowed.
+# restriction), so under mode == "pi" it has no decision-table entry and
+# falls through to the generic deny -- denied by default, not specially
+# allowed.
 
 # Tools allowed on the main thread while mode == "wf": today's MAIN_ALLOWLIST
 # minus Task/Agent (handled separately below, restricted to the built-in
@@ -297,74 +333,379 @@ def log_debug(msg):
         sys.stderr.write("[orchestrator-mode] %s\n" % msg)
 
 
-def noop(reason="") -> "NoReturn":
+# A gate decision. `decision` is "noop" (no stdout: the normal permission
+# flow proceeds) or "deny"; `reason` is the deny reason shown to the model,
+# or the no-op's debug note; `step` is the numbered decision step (see the
+# module docstring) that decided the call.
+Decision = collections.namedtuple("Decision", "decision reason step")
+
+
+class _Decided(Exception):
+    """Raised by noop()/deny() to unwind decide() with its Decision."""
+
+    def __init__(self, decision):
+        super().__init__(decision)
+        self.decision = decision
+
+
+def noop(reason="", step=None):
     """True no-op: no stdout, so the normal permission flow proceeds untouched.
-    Used for OFF / subagent / allowlisted / parse-failure -- never auto-approve."""
+    Used for OFF / subagent / allowlisted / parse-failure -- never auto-approve.
+    Ends the decision: decide() returns it, main() exits silently."""
     log_debug("no-op: %s" % reason)
-    sys.exit(0)
+    raise _Decided(Decision("noop", reason, step))
+
+
+def deny(reason, step=None):
+    """Ends the decision with a deny; main() writes deny_output(reason)."""
+    raise _Decided(Decision("deny", reason, step))
+
+
+def deny_output(reason):
+    """The hook's stdout line for a deny, without the newline (main() writes
+    the memoized _output.deny_line() bytes)."""
+    return _output.deny_line(reason)[:-1].decode()
+
+
+# perf_counter_ns() at main() entry, for the audit/stats latencies.
+_main_t0 = 0
+
+# Step checkpoints [(step, perf_counter_ns)] for the ORCHESTRATOR_STATS
+# histograms (see _stats.py); None -> not recording. Reset on every main()
+# call so the daemon never carries one call's checkpoints into the next.
+_laps = None
+
+
+def _lap(step):
+    """Charge the time since the previous checkpoint to `step`."""
+    if _laps is not None:
+        _laps.append((step, time.perf_counter_ns()))
+
+
+def _write_stats(tool, result, repeats=0):
+    """Record the laps main() took up to the live decision (_stats.py)."""
+    steps, prev = {}, _main_t0
+    for s, t in _laps:
+        steps[s] = steps.get(s, 0) + (t - prev) // 1000
+        prev = t
+    import _stats
+    path = _stats.stats_path()
+    if path:
+        _stats.record(path, steps, (prev - _main_t0) // 1000,
+                      tool, result.decision == "deny", repeats > 1,
+                      result.reason.startswith(ESCALATED_PREFIX))
+
+
+# Deny loops: the same blocked call retried instead of delegated. With the
+# state option deny-escalate=N, a mode deny (steps 8-10's DENY_REASONS)
+# repeated more than N times in one session gets ESCALATED_DENY_REASON instead
+# of the full text. Other denies (D2, model allowlist, wf Task) keep their
+# reason, which says how to fix the call. Counted in _denyloop.py.
+ESCALATED_PREFIX = "orchestrator-mode: STOP retrying"
+ESCALATED_DENY_REASON = (
+    ESCALATED_PREFIX + " '%s': denied %d times this session; it stays "
+    "blocked while orchestrator-mode is %s. %s" + DELEGATE_GUIDANCE)
+ESCALATED_NEXT_STEP = {
+    "on": "Delegate the work to a subagent via the Agent/Task tool now.",
+    "wf": "Put the work in a Workflow script now.",
+    "pi": "Send it to mcp__pi-delegate__pi_task (or /pi-delegate:delegate) "
+          "now.",
+}
 
 
-def deny(reason) -> "NoReturn":
-    out = {"hookSpecificOutput": {
-        "hookEventName": "PreToolUse",
-        "permissionDecision": "deny",
-        "permissionDecisionReason": reason}}
-    print(json.dumps(out))
-    sys.exit(0)
+def _deny_escalate(options):
+    """deny-escalate=N -> N (>= 1), or None when absent/off/unparseable."""
+    try:
+        n = int(options.get("deny-escalate") or "")
+    except ValueError:
+        return None
+    return n if n >= 1 else None
+
+
+def _deny_target(tool, tool_input, data):
+    """What a deny is about, so that only retries of the same call count as
+    one loop: the resolved path for file tools, the whitespace-collapsed
+    command for Bash, and a digest of the whole input for anything else
+    (including a file tool whose path is not a string). Always a str."""
+    if not isinstance(tool_input, dict):
+        return ""
+    if tool in ("Write", "Edit", "MultiEdit", "NotebookEdit"):
+        path_key = "notebook_path" if tool == "NotebookEdit" else "file_path"
+        path = tool_input.get(path_key, "")
+        if isinstance(path, str):
+            return norm(path, project_dir(data))
+    if tool == "Bash":
+        return " ".join(str(tool_input.get("command", "")).split())
+    return _payload_digest(tool_input)
+
+
+def _count_deny(data, mode, options, result):
+    """Deny-loop bookkeeping for main() -> (result, count of this identical
+    deny in the session so far, 0 when not counted). Identical means same
+    tool, target (_deny_target), mode and reason. Counts only when the
+    payload has a session_id and deny-escalate or ORCHESTRATOR_STATS wants
+    it; escalates per the comment above."""
+    session = data.get("session_id")
+    limit = _deny_escalate(options)
+    if not session or (limit is None and _laps is None):
+        return result, 0
+    import _denyloop
+    path = _denyloop.deny_loop_path()
+    if not path:
+        return result, 0
+    tool = data.get("tool_name", "")
+    target = _deny_target(tool, data.get("tool_input"), data)
+    count = _denyloop.bump(
+        path, _denyloop.key(session, tool, target, mode, result.reason))
+    if (limit is not None and count > limit
+            and result.reason == DENY_REASONS[mode] % tool):
+        log_debug("deny loop: %s denied %d times -> escalated" % (tool, count))
+        result = result._replace(reason=ESCALATED_DENY_REASON % (
+            tool, count, mode, ESCALATED_NEXT_STEP[mode]))
+    return result, count
+
+
+def _write_audit(data, mode, options, result, us):
+    """Append `result`, decided in `us` microseconds, to the project's audit
+    log (audit=on, see _audit.py)."""
+    import _audit as audit
+    record = {"ts": round(time.time(), 3), "session": data.get("session_id"),
+              "agent": data.get("agent_id"), "tool": data.get("tool_name", ""),
+              "mode": mode, "step": result.step, "decision": result.decision,
+              "us": us}
+    audit.append(
+        audit.audit_path(os.path.dirname(state_file_path(data))),
+        audit.encode(record),
+        parse_size(options.get("audit-max-bytes"), audit.DEFAULT_MAX_BYTES))
+
+
+# Shadow policy: `shadow=<mode>[,key=value,...]` names a candidate state that
+# main() evaluates on every call next to the live one. When their decisions
+# differ, a record goes to SHADOW_FILE_NAME next to the state file (same
+# format and rotation as the audit log, cap shadow-max-bytes). One
+# disagreement in shadow-sample (default DEFAULT_SHADOW_SAMPLE) also carries a
+# digest of tool_input, so recurring payloads can be told apart without
+# logging them. Only the live decision is ever emitted.
+SHADOW_FILE_NAME = ".orchestrator-mode.shadow"
+DEFAULT_SHADOW_SAMPLE = 10
+
+# shadow option value -> its parsed (mode, options) overrides
+_shadow_memo = {}
+
+
+def _shadow_state(raw, options):
+    """The candidate (mode, options) for shadow=`raw`: the live `options`
+    with the shadow's own key=value pairs on top. Commas separate the pairs;
+    a piece without "=" continues the previous pair's list
+    (shadow=wf,allowed-models=opus,sonnet). Parsed by _state like a state
+    line, so a bad mode is "off"."""
+    parsed = _shadow_memo.get(raw)
+    if parsed is None:
+        head, _, rest = raw.partition(",")
+        tokens = [head]
+        for piece in rest.split(",") if rest else ():
+            if "=" in piece or len(tokens) == 1:
+                tokens.append(piece)
+            else:
+                tokens[-1] += "," + piece
+        mode, overrides, _ = _parse_collect(" ".join(tokens))
+        if len(_shadow_memo) >= 64:
+            _shadow_memo.clear()
+        parsed = _shadow_memo[raw] = (mode, overrides)
+    mode, overrides = parsed
+    merged = {k: v for k, v in options.items() if not k.startswith("shadow")}
+    merged.update(overrides)
+    return mode, merged
+
+
+def _payload_digest(tool_input):
+    import hashlib
+    text = json.dumps(tool_input, sort_keys=True, default=repr)
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()[:16]
+
+
+def _run_shadow(data, mode, options, live):
+    """Evaluate the shadow= candidate on the already-parsed payload and log
+    it if it disagrees with `live`. Steps 3-10 only: the state is given, and
+    paths resolved by the live decision are still memoized (no new
+    _paths.begin_decision()). Never raises; never changes `live`."""
+    global _laps
+    t0 = time.perf_counter_ns()
+    laps, _laps = _laps, None  # the shadow run is not charged to the steps
+    try:
+        shadow_mode, shadow_options = _shadow_state(options["shadow"], options)
+        try:
+            _decide(data, (shadow_mode, shadow_options))
+            shadow = Decision("noop", "", None)
+        except _Decided as e:
+            shadow = e.decision
+        except Exception as e:
+            shadow = Decision("error", type(e).__name__, None)
+    except Exception:
+        return
+    finally:
+        _laps = laps
+    if shadow.decision == live.decision:
+        return
+    try:
+        record = {"ts": round(time.time(), 3), "session": data.get("session_id"),
+                  "agent": data.get("agent_id"), "tool": data.get("tool_name", ""),
+                  "mode": mode, "step": live.step, "decision": live.decision,
+                  "shadow_mode": shadow_mode, "shadow_step": shadow.step,
+                  "shadow_decision": shadow.decision,
+                  "us": (time.perf_counter_ns() - t0) // 1000}
+        try:
+            sample = int(options.get("shadow-sample") or DEFAULT_SHADOW_SAMPLE)
+        except ValueError:
+            sample = DEFAULT_SHADOW_SAMPLE
+        if sample > 0 and int.from_bytes(os.urandom(4), "little") % sample == 0:
+            record["digest"] = _payload_digest(data.get("tool_input"))
+        import _audit as audit
+        audit.append(
+            os.path.join(os.path.dirname(state_file_path(data)),
+                         SHADOW_FILE_NAME),
+            audit.encode(record),
+            parse_size(options.get("shadow-max-bytes"), audit.DEFAULT_MAX_BYTES))
+    except Exception:
+        pass
 
 
 def norm(path, base):
     """Resolve `path` to an absolute, symlink-free path. Relative paths are
-    resolved against `base` (the project dir)."""
+    resolved against `base` (the project dir). Memoized per decision (and
+    re-validated across decisions) by _paths.realpath()."""
     try:
         if not os.path.isabs(path):
             path = os.path.join(base, path)
-        return os.path.realpath(path)
+        return _paths.realpath(path)
     except Exception:
         return path
 
 
-# Matches quoted model option values in Workflow script text, e.g.
-# `model: "opus"` / `model:'sonnet'` / `"model": "haiku"`. Best-effort by
-# design: this is a text lint, not a parser -- a computed/obfuscated model
-# value (string concat, variable, etc.) will slip through. That is consistent
-# with the plugin's cooperative-guardrail security model (see README): the
-# goal is to catch a well-behaved agent's accidental off-list model choice,
-# not to contain an adversarial one.
-MODEL_OPTION_RE = re.compile(r"""\bmodel\b['"]?\s*:\s*(?:"([^"]*)"|'([^']*)')""")
-
-# Presence-only check for D4b: does a `model:` option appear at all (not
-# necessarily quoted) -- used to count agent() calls that declare SOME model
-# vs. omit it entirely. Best-effort, unquoted-tolerant; comments containing
-# "model:" can cause false negatives (under-denial), never false positives on
-# scripts with zero agent( calls (guarded separately).
-MODEL_PRESENT_RE = re.compile(r"""\bmodel\b['"]?\s*:""")
-
 # Token identifying the orchestrator-mode state file, used by D2's Bash/mcp__*
 # scan below.
 STATE_FILE_TOKEN = ".orchestrator-mode.state"
 
+# Floors for the scan-max-depth / scan-max-chars caps. Lower values would let
+# a state line switch D2 off for mcp__* tools (depth 0 inspects nothing), so
+# they are raised to these: tool_input plus one level of nesting, and enough
+# characters for any realistic path-bearing argument.
+MIN_SCAN_DEPTH = 2
+MIN_SCAN_CHARS = 4096
+
 
-def _model_allowed(model, allowed_models):
+def _model_allowed(model, allowed_models, aliases=None):
     """Case-insensitive substring/family match (D3): allowlist entry 'sonnet'
     permits any requested model id containing 'sonnet'. Asymmetric by design
     (allowlist entry 'claude-sonnet-5' would NOT match a request of
-    'sonnet')."""
-    m = str(model).strip().lower()
-    return any(entry in m for entry in allowed_models)
-
-
-def _tool_input_mentions_state_file(tool_input):
-    """Best-effort substring lint (D2): does the serialized tool_input mention
-    the state-file token anywhere? Used for mcp__* tools where the path may
-    live under any key."""
+    'sonnet'). A model named exactly like a model-aliases entry is matched as
+    its target. One Aho-Corasick pass over the id (_models.py), compiled once
+    per allowlist."""
+    import _models  # only loaded when a state carries an allowlist
+    return _models.compiled(allowed_models, aliases).allowed(model)
+
+
+def _tool_input_mentions_state_file(tool_input, max_depth=None, max_chars=None):
+    """Best-effort substring lint (D2): does the tool_input mention the
+    state-file token anywhere? Used for mcp__* tools where the path may live
+    under any key.
+
+    Walks the decoded structure in place -- keys and string leaves, first hit
+    wins -- instead of serializing the whole (possibly multi-megabyte) payload.
+    Same decision as `STATE_FILE_TOKEN in json.dumps(tool_input,
+    default=str)` for every JSON-decoded input: the token contains no
+    character json.dumps escapes and none of its structural characters, so it
+    occurs in the serialization iff it occurs inside a single key or string.
+    Optional caps (state options scan-max-depth / scan-max-chars, see
+    _scan_limits): containers more than `max_depth` levels deep (tool_input
+    itself is level 1) are skipped, and the scan stops once `max_chars`
+    characters of keys/strings have been inspected -- whatever a cap leaves
+    uninspected fails OPEN (counts as no mention). A _payload.Skipped leaf
+    (a long string main() never decoded) answers from its recorded length
+    and first token position, with the same result."""
     try:
-        return STATE_FILE_TOKEN in json.dumps(tool_input, default=str)
+        token = STATE_FILE_TOKEN
+        budget = max_chars
+        stack = [(tool_input, 0)]
+        while stack:
+            obj, depth = stack.pop()
+            if isinstance(obj, str):
+                strings = (obj,)
+            elif isinstance(obj, dict):
+                if max_depth is not None and depth >= max_depth:
+                    log_debug("D2 scan: depth cap %d, subtree skipped" % max_depth)
+                    continue
+                strings = obj
+                stack.extend((v, depth + 1) for v in obj.values()
+                             if not isinstance(v, (int, float, type(None))))
+            elif isinstance(obj, (list, tuple)):
+                if max_depth is not None and depth >= max_depth:
+                    log_debug("D2 scan: depth cap %d, subtree skipped" % max_depth)
+                    continue
+                stack.extend((v, depth + 1) for v in obj
+                             if not isinstance(v, (int, float, type(None))))
+                continue
+            elif isinstance(obj, (int, float, type(None))):
+                continue
+            elif isinstance(obj, _payload.Skipped):
+                # a long string main() did not decode; _payload recorded
+                # where the token first occurs in it
+                if budget is None:
+                    if obj.first >= 0:
+                        return True
+                    continue
+                if 0 <= obj.first and obj.first + len(token) <= budget:
+                    return True
+                budget -= obj.length
+                if budget <= 0:
+                    log_debug("D2 scan: char cap %d reached" % max_chars)
+                    return False
+                continue
+            else:
+                strings = (str(obj),)  # json.dumps(default=str) equivalent
+            for text in strings:
+                if not isinstance(text, str):
+                    continue  # non-str dict keys serialize as numbers/literals
+                if budget is None:
+                    if token in text:
+                        return True
+                    continue
+                if text.find(token, 0, budget) != -1:
+                    return True
+                budget -= len(text)
+                if budget <= 0:
+                    log_debug("D2 scan: char cap %d reached" % max_chars)
+                    return False
+        return False
     except Exception:
         return False
 
 
-def check_task_model(tool_input, allowed_models):
+def _scan_limits(options):
+    """(max_depth, max_chars) for the D2 mcp__* scan from the state options
+    scan-max-depth=<n> / scan-max-chars=<n>; absent, negative or unparseable
+    -> None (unlimited, the default). Values below MIN_SCAN_DEPTH /
+    MIN_SCAN_CHARS are raised to them, so a cap can bound the scan but never
+    turn it off."""
+    limits = []
+    for key, floor in (("scan-max-depth", MIN_SCAN_DEPTH),
+                       ("scan-max-chars", MIN_SCAN_CHARS)):
+        try:
+            value = int(options.get(key) or "")
+        except ValueError:
+            limits.append(None)
+            continue
+        if value < 0:
+            limits.append(None)
+        elif value < floor:
+            log_debug("D2 scan: %s=%d raised to %d" % (key, value, floor))
+            limits.append(floor)
+        else:
+            limits.append(value)
+    return tuple(limits)
+
+
+def check_task_model(tool_input, allowed_models, step=None, aliases=None):
     """Model-allowlist check for a Task/Agent call the mode gating would
     otherwise allow. (D4) When an allowlist is active, an OMITTED model is now
     DENIED, not allowed -- every delegated call must declare a model from the
@@ -379,228 +720,377 @@ def check_task_model(tool_input, allowed_models):
             "active. Declare model: one of %s -- omitting the model field is "
             "not allowed while an allowlist is set."
             % (", ".join(allowed_models), ", ".join(allowed_models))
-            + DELEGATE_GUIDANCE)
-    if not _model_allowed(model, allowed_models):
+            + DELEGATE_GUIDANCE, step=step)
+    if not _model_allowed(model, allowed_models, aliases):
         deny(
             "orchestrator-mode: model %r is not in this project's model "
             "allowlist (%s). Pick a model from the allowlist."
-            % (model, ", ".join(allowed_models)) + DELEGATE_GUIDANCE)
+            % (model, ", ".join(allowed_models)) + DELEGATE_GUIDANCE, step=step)
+
+
+# Workflow script size limit. Past DEFAULT_MAX_SCRIPT_BYTES the tokenizer lint
+# could approach the hook's 5s timeout, so it is not attempted; what happens
+# instead is the OVERSIZE_SCRIPT policy. Both are state-file options:
+#   max-script-bytes=<n>[k|m]   limit (0 = no limit)
+#   oversize-script=open|closed open (default): skip the lint, silent no-op --
+#                               the plugin's usual fail-open stance; closed:
+#                               DENY the Workflow call, naming size and limit.
+# Token-dense scripts lint at about 0.8 MB/s, so a script at the 1 MiB default
+# takes ~1.3s, well under the timeout. LINT_BUDGET_SECONDS backs it up on slow machines
+# and under raised limits: a lint that runs longer stops and is treated as
+# oversize, under the same policy, instead of running into the timeout.
+DEFAULT_MAX_SCRIPT_BYTES = 1024 * 1024
+LINT_BUDGET_SECONDS = 2.0
+
 
+def _script_limit(options):
+    """-> (max bytes or None for no limit, fail_closed). An unparseable
+    max-script-bytes keeps the default; any oversize-script value other than
+    "closed" is "open"."""
+    limit = parse_size(options.get("max-script-bytes"), DEFAULT_MAX_SCRIPT_BYTES)
+    return (limit if limit > 0 else None,
+            options.get("oversize-script") == "closed")
 
-def check_workflow_models(tool_input, allowed_models, data):
+
+def _format_lines(lines, total):
+    """'3, 7, 12' -- the stored line numbers, then '...' if there were more."""
+    shown = ", ".join(str(n) for n in lines)
+    return shown + (", ..." if total > len(lines) else "")
+
+
+def check_workflow_models(tool_input, allowed_models, data, options=None,
+                          step=None):
     """Model-allowlist lint for a Workflow call the mode gating would
-    otherwise allow. (D4b) First, a presence-counting pass: if the script
-    contains any `agent(` calls, the count of `model:` option occurrences must
-    be >= the count of `agent(` calls, else DENY (an agent() call omitted its
-    model while an allowlist is active). Zero agent( calls -> never denied
-    here. Then scans the script text (inline `script`, or the file at
-    `scriptPath` -- unreadable file fails open silently) for quoted model
-    option values; any value outside the allowlist (family match, D3) ->
-    DENY. Best-effort, see MODEL_OPTION_RE/MODEL_PRESENT_RE above."""
+    otherwise allow. (D4b) The script text (inline `script`, or the file at
+    `scriptPath` -- unreadable file fails open silently) is tokenized once by
+    _workflow_lint.lint(), which pairs every `agent(` call with its own
+    arguments (comments, strings and regex literals skipped). Any call that
+    declares no model (or an empty one) -> DENY, naming its line(s); zero
+    agent( calls -> never denied here. Then any quoted `model:` value in the
+    code outside the allowlist (family match, D3) -> DENY, naming value and
+    line. A model that can't be known statically (variable, computed, opaque
+    options argument) fails open -- see _workflow_lint's docstring. Verdicts
+    are memoized by content hash (_workflow_lint.verdict). A script over
+    max-script-bytes is not linted, and a lint past LINT_BUDGET_SECONDS is
+    abandoned: see _script_limit() for the policy."""
     if not allowed_models:
         return
+    max_bytes, fail_closed = _script_limit(options or {})
+    aliases = (options or {}).get("model-aliases")
     script = (tool_input or {}).get("script")
-    if not script:
-        script_path = (tool_input or {}).get("scriptPath")
-        if not script_path:
-            return
-        try:
+    try:
+        import _workflow_lint
+    except Exception:
+        return
+    try:
+        if script:
+            result = _workflow_lint.verdict(
+                str(script), allowed_models, _model_allowed,
+                max_bytes=max_bytes, aliases=aliases,
+                max_seconds=LINT_BUDGET_SECONDS)
+        else:
+            script_path = (tool_input or {}).get("scriptPath")
+            if not script_path:
+                return
             if not os.path.isabs(script_path):
                 script_path = os.path.join(project_dir(data), script_path)
-            with open(script_path, "r") as f:
-                script = f.read()
-        except Exception:
-            return  # unreadable scriptPath -> fail open silently
-    try:
-        agent_count = str(script).count("agent(")
-        if agent_count > 0:
-            model_present_count = len(MODEL_PRESENT_RE.findall(str(script)))
-            if model_present_count < agent_count:
-                deny(
-                    "orchestrator-mode: this project has a model allowlist "
-                    "(%s) active. This workflow script has %d agent() call(s) "
-                    "but only %d declare a model: option -- declare model: "
-                    "one of %s on every agent() call while an allowlist is "
-                    "set (best-effort script lint; comments containing "
-                    "'model:' can cause false negatives)."
-                    % (", ".join(allowed_models), agent_count,
-                       model_present_count, ", ".join(allowed_models))
-                    + DELEGATE_GUIDANCE)
-        matches = MODEL_OPTION_RE.finditer(str(script))
+            result = _workflow_lint.verdict_for_path(
+                script_path, allowed_models, _model_allowed,
+                max_bytes=max_bytes, aliases=aliases,
+                max_seconds=LINT_BUDGET_SECONDS)
+    except _workflow_lint.ScriptTooLarge as e:
+        if e.seconds is not None:
+            over = ("could not be linted within %gs (%d bytes)"
+                    % (e.seconds, e.size))
+        else:
+            over = ("is %d bytes, over this project's max-script-bytes limit "
+                    "(%d)" % (e.size, e.limit))
+        if fail_closed:
+            deny(
+                "orchestrator-mode: this Workflow script %s, and "
+                "oversize-script=closed is set, so it can't be checked "
+                "against the model allowlist (%s). Split the workflow into "
+                "smaller scripts." % (over, ", ".join(allowed_models))
+                + DELEGATE_GUIDANCE, step=step)
+        log_debug("Workflow script %s -> lint skipped (oversize-script=open)"
+                  % over)
+        return
     except Exception:
-        return  # never let the lint itself brick a session
-    offending = []
-    for m in matches:
-        value = (m.group(1) if m.group(1) is not None else m.group(2))
-        value = value.strip().lower()
-        if value and not _model_allowed(value, allowed_models) and value not in offending:
-            offending.append(value)
-    if offending:
+        # Unreadable scriptPath, or the lint itself failed -> fail open
+        # silently; never let the lint brick a session.
+        return
+    if result["missing"]:
+        deny(
+            "orchestrator-mode: this project has a model allowlist (%s) "
+            "active. This workflow script has %d agent() call(s), %d of which "
+            "declare no model: option (line %s) -- declare model: one of %s "
+            "on every agent() call while an allowlist is set."
+            % (", ".join(allowed_models), result["calls"], result["missing"],
+               _format_lines(result["missing_lines"], result["missing"]),
+               ", ".join(allowed_models))
+            + DELEGATE_GUIDANCE, step=step)
+    if result["offending"]:
         deny(
             "orchestrator-mode: this Workflow script requests model(s) not in "
             "this project's model allowlist: %s. Allowed models: %s. Change "
             "the script to use allowed models."
-            % (", ".join(repr(v) for v in offending),
-               ", ".join(allowed_models)) + DELEGATE_GUIDANCE)
+            % (", ".join("%r (line %d)" % (v, line)
+                         for v, line in result["offending"]),
+               ", ".join(allowed_models)) + DELEGATE_GUIDANCE, step=step)
 
 
 # ADR-004: safe reflection directories -- these dirs never execute code and
 # never touch repo/product files. They are where session memory and plan
 # artifacts live, so Write/Edit/MultiEdit/NotebookEdit to them stays allowed
-# on the main thread regardless of orchestrator-mode state.
-def _safe_reflection_dirs(data):
-    """Return a list of the two safe reflection directories, each resolved
-    through norm() so symlinks/relative paths are canonicalized."""
+# on the main thread regardless of orchestrator-mode state. The state option
+# safe-dirs=<dir,...> adds project-specific ones (relative to the project
+# dir; ~ expanded).
+# (project dir, $HOME, safe-dirs) -> _paths.DirSet of all of them, so each
+# dir is resolved once and a check is one trie walk over the target's
+# components.
+_safe_dir_memo = {}
+
+
+def _safe_dirs(data, options):
+    """The _paths.DirSet of safe directories for this project: the two
+    ADR-004 dirs plus any safe-dirs entries, each resolved like norm()."""
     base = project_dir(data)
-    return [
-        norm(os.path.join(base, ".remember"), base),
-        norm(
+    extra = tuple(options.get("safe-dirs") or ())
+    key = (base, os.environ.get("HOME"), extra)
+    dirs = _safe_dir_memo.get(key)
+    if dirs is None or not dirs.valid():
+        if len(_safe_dir_memo) >= 64:
+            _safe_dir_memo.clear()
+        paths = [
+            os.path.join(base, ".remember"),
             os.path.join(
                 os.path.expanduser("~/.claude/projects"),
-                project_dir(data).replace(os.sep, "-"),
+                base.replace(os.sep, "-"),
                 "memory",
             ),
-            base,
-        ),
-    ]
+        ]
+        paths.extend(os.path.join(base, os.path.expanduser(d)) for d in extra)
+        dirs = _safe_dir_memo[key] = _paths.DirSet(paths)
+    return dirs
 
 
-def _is_safe_reflection_write(tool, tool_input, data):
+def _is_safe_reflection_write(tool, tool_input, data, options=None):
     """Check whether this Write/Edit/MultiEdit/NotebookEdit targets a safe
-    reflection directory (ADR-004). Returns False immediately if the tool is
-    not one of those four. Otherwise resolves the target path and checks
-    whether it equals or falls under one of the safe dirs. Fail-closed: any
-    exception returns False."""
+    reflection directory (ADR-004) or a safe-dirs entry. Returns False
+    immediately if the tool is not one of those four. Otherwise resolves the
+    target path and checks whether it equals or falls under one of the safe
+    dirs. The state file never counts, even under a safe-dirs entry such as
+    ".": its main-thread Write is step 6's, and nothing else may edit it.
+    Fail-closed: any exception returns False."""
     if tool not in ("Write", "Edit", "MultiEdit", "NotebookEdit"):
         return False
     try:
         path_key = "notebook_path" if tool == "NotebookEdit" else "file_path"
         base = project_dir(data)
         target = norm(tool_input.get(path_key, ""), base)
-        if not target:
+        if not target or target == norm(state_file_path(data), base):
             return False
-        safe_dirs = _safe_reflection_dirs(data)
-        for sd in safe_dirs:
-            if target == sd or target.startswith(sd + os.sep):
-                return True
-        return False
+        return _safe_dirs(data, options or {}).covers(target)
     except Exception:
         return False
 
 
-def handle_on_mode(tool, tool_input, allowed_models, data):
-    if tool in MAIN_ALLOWLIST:
-        # Model allowlist composes with the mode gating: these delegation
-        # calls are otherwise allowed under ON, so run the model check first.
-        if tool in ("Task", "Agent"):
-            check_task_model(tool_input, allowed_models)
-        elif tool == "Workflow":
-            check_workflow_models(tool_input, allowed_models, data)
-        noop("allowlisted tool %s -> silent no-op (mode=on)" % tool)
-    reason = (
+# ---------------------------------------------------------------------------
+# Precompiled decision table (steps 8/9/10).
+#
+# Instead of walking a per-mode handler for every call, each tool name is
+# mapped ONCE to a tool class, and (mode, tool class) is looked up in a flat
+# table compiled at import time from the allowlists above. Named tools are
+# their own class; the pattern-matched names get a synthetic class (the
+# angle brackets keep them from ever colliding with a real tool name). Any
+# (mode, class) pair missing from the table is a DENY -- deny-by-default is a
+# property of the lookup, not of a trailing `else`.
+# tests/test_decision_table.sh proves the table decides exactly like the
+# per-mode handlers it replaced, over an exhaustive mode x tool x agent_id
+# matrix.
+# ---------------------------------------------------------------------------
+
+# D5-D (pi-delegate ADR-002) / ADR-003: the pi-delegate MCP server's tools ARE
+# the sanctioned "changes go through pi" path, so they are allowlisted by
+# prefix under PI mode. Claude Code exposes plugin-bundled MCP servers under
+# "mcp__plugin_<plugin>_<server>__<tool>" at runtime (observed live:
+# mcp__plugin_pi-delegate_pi-delegate__pi_task); the bare "mcp__pi-delegate__"
+# form is kept for direct (non-plugin) .mcp.json registrations of the same
+# server. This prefix is the ONLY coupling between orchestrator-mode and
+# pi-delegate.
+PI_DELEGATE_MCP_PREFIXES = ("mcp__pi-delegate__", "mcp__plugin_pi-delegate_")
+
+CLS_MCP_PI_DELEGATE = "<mcp:pi-delegate>"
+CLS_MCP = "<mcp>"
+CLS_OTHER = "<other>"
+
+# MCP classes a project's `allow-mcp=<glob,...>` state option can open up in
+# any mode (step 8/9/10, after the table lookup denies). Globs are
+# fnmatch-style against the full tool name and compiled once into a
+# _globset.GlobSet, so matching cost does not grow with the pattern count.
+MCP_CLASSES = frozenset((CLS_MCP, CLS_MCP_PI_DELEGATE))
+
+# Path-addressable mutation tools: the only classes that reach the
+# path-sensitive checks (steps 4, 6, 7). Every other class skips norm()/
+# realpath entirely.
+PATH_MUTATION_TOOLS = frozenset(("Write", "Edit", "MultiEdit", "NotebookEdit"))
+
+# Classes subject to D2's state-file content scan (step 3). pi-delegate MCP
+# tools are still mcp__* tools, so a pi_task whose input mentions the state
+# file is denied there before PI mode's prefix allow is ever consulted.
+STATE_SCAN_CLASSES = frozenset(("Bash", CLS_MCP, CLS_MCP_PI_DELEGATE))
+
+_NAMED_TOOLS = frozenset(
+    MAIN_ALLOWLIST | WF_MODE_ALLOWLIST | PI_MODE_ALLOWLIST
+    | PATH_MUTATION_TOOLS | {"Bash"})
+
+ACTION_ALLOW = "allow"                # silent no-op
+ACTION_DENY = "deny"                  # the mode's generic deny
+ACTION_TASK_MODEL = "task-model"      # check_task_model, then no-op
+ACTION_WORKFLOW_LINT = "workflow"     # check_workflow_models, then no-op
+ACTION_WF_EXPLORE = "wf-explore"      # Explore scout only, else wf Task deny
+
+
+def tool_class(tool):
+    """Map a tool name to its decision-table class."""
+    if tool in _NAMED_TOOLS:
+        return tool
+    if tool.startswith(PI_DELEGATE_MCP_PREFIXES):
+        return CLS_MCP_PI_DELEGATE
+    if tool.startswith("mcp__"):
+        return CLS_MCP
+    return CLS_OTHER
+
+
+def _compile_decision_table():
+    table = {}
+    for mode, allowlist in (("on", MAIN_ALLOWLIST),
+                            ("wf", WF_MODE_ALLOWLIST),
+                            ("pi", PI_MODE_ALLOWLIST)):
+        for tool in allowlist:
+            table[(mode, tool)] = ACTION_ALLOW
+    # on: Task/Agent/Workflow are allowlisted, but the model allowlist (when
+    # set) composes with the mode gating on these delegation calls.
+    table[("on", "Task")] = table[("on", "Agent")] = ACTION_TASK_MODEL
+    table[("on", "Workflow")] = ACTION_WORKFLOW_LINT
+    # wf: Task/Agent allowed ONLY for the built-in read-only Explore scout.
+    # Deliberately FAIL-CLOSED (missing/empty/wrong subagent_type is DENIED,
+    # not passed through) -- do not "fix" this back to permissive: fail-open
+    # here would reopen the general delegation escape hatch that mode=wf
+    # exists to close in favor of the Workflow tool.
+    table[("wf", "Task")] = table[("wf", "Agent")] = ACTION_WF_EXPLORE
+    table[("wf", "Workflow")] = ACTION_WORKFLOW_LINT
+    # pi: the pi-delegate MCP tools by prefix. Task/Agent has no entry
+    # (ADR-003: the pi-delegate subagent no longer exists, so there is no
+    # valid target left) and neither does Workflow (see the RESOLVED note
+    # above) -- both fall through to the generic pi deny.
+    table[("pi", CLS_MCP_PI_DELEGATE)] = ACTION_ALLOW
+    return table
+
+
+DECISION_TABLE = _compile_decision_table()
+
+DENY_REASONS = {
+    "on": (
         "orchestrator-mode is ON for this project: the main agent is read-only "
         "(allowlist of read/meta/delegation tools only). '%s' is blocked on the "
         "main thread. Delegate this work to a subagent via the Agent/Task tool "
         "(subagents have full write/execute access). To exit this mode, run "
-        "/orchestrator-mode:mode off." % tool) + DELEGATE_GUIDANCE
-    log_debug("main thread, mode=on, not allowlisted -> DENY %s" % tool)
-    deny(reason)
-
-
-def handle_wf_mode(tool, tool_input, allowed_models, data):
-    # Task/Agent: allow ONLY the built-in read-only Explore scout. Same
-    # deliberate FAIL-CLOSED exception to the fail-open policy elsewhere in
-    # this file as handle_pi_mode below -- missing/empty/wrong subagent_type
-    # is DENIED, not passed through. Do not "fix" this back to permissive:
-    # fail-open here would reopen the general delegation escape hatch that
-    # mode=wf exists to close in favor of the Workflow tool.
-    if tool in ("Task", "Agent"):
-        subagent_type = (tool_input or {}).get("subagent_type")
-        if subagent_type == WF_EXPLORE_SUBAGENT_TYPE:
-            # Otherwise allowed -> compose the model-allowlist check.
-            check_task_model(tool_input, allowed_models)
-            noop("mode=wf: %s -> Explore scout -> silent no-op" % tool)
-        reason = (
-            "orchestrator-mode is set to WF for this project: all substantive "
-            "delegation must go through the Workflow tool (dynamic multi-agent "
-            "workflows). '%s' with subagent_type=%r is blocked; only the "
-            "read-only 'Explore' scout may be spawned directly. Use the "
-            "Workflow tool to orchestrate work, or /orchestrator-mode:mode off "
-            "to exit. (Setting this mode is the user's standing opt-in to the "
-            "Workflow tool.)" % (tool, subagent_type)) + DELEGATE_GUIDANCE
-        log_debug(
-            "mode=wf: %s subagent_type=%r not Explore -> DENY (fail-closed)"
-            % (tool, subagent_type))
-        deny(reason)
-
-    if tool in WF_MODE_ALLOWLIST:
-        if tool == "Workflow":
-            # Otherwise allowed -> compose the model-allowlist script lint.
-            check_workflow_models(tool_input, allowed_models, data)
-        noop("allowlisted tool %s -> silent no-op (mode=wf)" % tool)
-
-    reason = (
+        "/orchestrator-mode:mode off." + DELEGATE_GUIDANCE),
+    "wf": (
         "orchestrator-mode is set to WF for this project: the main agent is "
         "read-only and must orchestrate via the Workflow tool ('%s' is "
         "blocked). Only the read-only 'Explore' scout may be spawned directly "
         "via Task/Agent; all other delegation must go through the Workflow "
         "tool (dynamic multi-agent workflows) -- setting this mode is the "
         "user's standing opt-in to it. To exit this mode, run "
-        "/orchestrator-mode:mode off." % tool) + DELEGATE_GUIDANCE
-    log_debug("mode=wf, not allowlisted -> DENY %s" % tool)
-    deny(reason)
-
-
-def handle_pi_mode(tool, tool_input, allowed_models):
-    # D5-D (pi-delegate ADR-002) / ADR-003: the pi-delegate MCP server's
-    # tools ARE the sanctioned "changes go through pi" path, so they are
-    # allowlisted by prefix under PI mode. D2's state-file scan (step 3 in
-    # main()) already ran before any mode branch, so a pi-delegate MCP call
-    # whose input mentions the state file is still denied there.
-    # Claude Code exposes plugin-bundled MCP servers under
-    # "mcp__plugin_<plugin>_<server>__<tool>" at runtime (observed live:
-    # mcp__plugin_pi-delegate_pi-delegate__pi_task); the bare
-    # "mcp__pi-delegate__" form is kept for direct (non-plugin) .mcp.json
-    # registrations of the same server.
-    if tool.startswith("mcp__pi-delegate__") or tool.startswith("mcp__plugin_pi-delegate_"):
-        noop("mode=pi: pi-delegate MCP tool %s -> silent no-op" % tool)
-
-    if tool in PI_MODE_ALLOWLIST:
-        noop("allowlisted tool %s -> silent no-op (mode=pi)" % tool)
-
-    # ADR-003: the pi-delegate subagent no longer exists. Task/Agent has no
-    # valid target left under mode=pi and falls straight through to this
-    # generic deny -- same fail-closed boundary as before, simpler code.
-    reason = (
+        "/orchestrator-mode:mode off." + DELEGATE_GUIDANCE),
+    "pi": (
         "orchestrator-mode is set to PI for this project: the main agent "
         "cannot write, edit, or execute commands directly, and cannot "
         "delegate to any subagent. '%s' is blocked. Code changes go through "
         "the pi-delegate MCP tools (mcp__pi-delegate__pi_task, "
         "pi_conversation_send/steer/interrupt/read/status/end) directly, or "
         "via /pi-delegate:delegate <task> for task decomposition. To exit "
-        "this mode, run /orchestrator-mode:mode off." % tool) + DELEGATE_GUIDANCE
-    log_debug("mode=pi, not allowlisted -> DENY %s" % tool)
-    deny(reason)
-
+        "this mode, run /orchestrator-mode:mode off." + DELEGATE_GUIDANCE),
+}
 
-def main():
-    # 1. parse -- fail OPEN
+# Decision step number (module docstring) of each mode's dispatch.
+MODE_STEPS = {"on": 8, "wf": 9, "pi": 10}
+
+WF_TASK_DENY_REASON = (
+    "orchestrator-mode is set to WF for this project: all substantive "
+    "delegation must go through the Workflow tool (dynamic multi-agent "
+    "workflows). '%s' with subagent_type=%r is blocked; only the "
+    "read-only 'Explore' scout may be spawned directly. Use the "
+    "Workflow tool to orchestrate work, or /orchestrator-mode:mode off "
+    "to exit. (Setting this mode is the user's standing opt-in to the "
+    "Workflow tool.)" + DELEGATE_GUIDANCE)
+
+
+def dispatch(mode, tool, cls, tool_input, allowed_models, data, options=None):
+    """Steps 8/9/10: one table lookup, then the action's own checks."""
+    action = DECISION_TABLE.get((mode, cls), ACTION_DENY)
+    step = MODE_STEPS[mode]
+    if action == ACTION_ALLOW:
+        noop("allowlisted tool %s -> silent no-op (mode=%s)" % (tool, mode),
+             step=step)
+    aliases = options.get("model-aliases") if options else None
+    if action == ACTION_TASK_MODEL:
+        check_task_model(tool_input, allowed_models, step, aliases)
+        noop("allowlisted tool %s -> silent no-op (mode=%s)" % (tool, mode),
+             step=step)
+    if action == ACTION_WORKFLOW_LINT:
+        check_workflow_models(tool_input, allowed_models, data, options, step)
+        noop("allowlisted tool %s -> silent no-op (mode=%s)" % (tool, mode),
+             step=step)
+    if action == ACTION_WF_EXPLORE:
+        subagent_type = (tool_input or {}).get("subagent_type")
+        if subagent_type == WF_EXPLORE_SUBAGENT_TYPE:
+            check_task_model(tool_input, allowed_models, step, aliases)
+            noop("mode=wf: %s -> Explore scout -> silent no-op" % tool,
+                 step=step)
+        log_debug(
+            "mode=wf: %s subagent_type=%r not Explore -> DENY (fail-closed)"
+            % (tool, subagent_type))
+        deny(WF_TASK_DENY_REASON % (tool, subagent_type), step=step)
+    if cls in MCP_CLASSES and options and "allow-mcp" in options:
+        import _globset  # only loaded when a state carries allow-mcp
+        if _globset.compiled(options["allow-mcp"]).match(tool):
+            noop("%s matches allow-mcp -> silent no-op (mode=%s)" % (tool, mode),
+                 step=step)
+    log_debug("main thread, mode=%s, not allowlisted -> DENY %s" % (mode, tool))
+    deny(DENY_REASONS[mode] % tool, step=step)
+
+
+def decide(data, state=None):
+    """Steps 2-10 for one parsed payload -> Decision.
+
+    No stdout, no exit, and no audit/stats record (main() does those), so
+    offline policy checks can call it in a loop (see batch()). `state` is
+    get_state(data)'s (mode, options) when the caller already has it."""
+    _paths.begin_decision()
     try:
-        data = json.load(sys.stdin)
-    except Exception:
-        noop("could not parse stdin -> fail-open (silent)")
+        _decide(data, state or get_state(data))
+    except _Decided as e:
+        return e.decision
+
 
+def _decide(data, state):
     tool = data.get("tool_name", "")
     tool_input = data.get("tool_input", {})
     agent_id = data.get("agent_id")
     log_debug("tool=%s agent_id=%s" % (tool, agent_id))
 
-    mode, options = get_state(data)
+    mode, options = state
     allowed_models = options.get("allowed-models")
 
     # 2. state OFF / missing -> true no-op (normal permission flow proceeds)
     if mode == "off":
-        noop("mode OFF -> silent no-op")
+        noop("mode OFF -> silent no-op", step=2)
+    _lap(2)
+
+    cls = tool_class(tool)
 
     # 3. [D2] state-file scan: ANY Bash command, or ANY mcp__* tool, whose
     #    (command / serialized tool_input) contains the state-file token ->
@@ -609,19 +1099,20 @@ def main():
     #    main thread AND subagents alike. Best-effort substring lint; a
     #    subagent doing a read-only `cat .orchestrator-mode.state` is also
     #    denied here -- accepted per spec (ANY Bash call mentioning the path).
-    if tool == "Bash":
-        command = (tool_input or {}).get("command", "")
-        if STATE_FILE_TOKEN in str(command):
-            log_debug("Bash command mentions state file -> DENY (D2)")
-            deny(
-                "orchestrator-mode: state-file changes go through "
-                "/orchestrator-mode:mode." + DELEGATE_GUIDANCE)
-    elif tool.startswith("mcp__"):
-        if _tool_input_mentions_state_file(tool_input):
+    if cls in STATE_SCAN_CLASSES:
+        if cls == "Bash":
+            command = (tool_input or {}).get("command", "")
+            if STATE_FILE_TOKEN in str(command):
+                log_debug("Bash command mentions state file -> DENY (D2)")
+                deny(
+                    "orchestrator-mode: state-file changes go through "
+                    "/orchestrator-mode:mode." + DELEGATE_GUIDANCE, step=3)
+        elif _tool_input_mentions_state_file(tool_input, *_scan_limits(options)):
             log_debug("mcp__* tool_input mentions state file -> DENY (D2)")
             deny(
                 "orchestrator-mode: state-file changes go through "
-                "/orchestrator-mode:mode." + DELEGATE_GUIDANCE)
+                "/orchestrator-mode:mode." + DELEGATE_GUIDANCE, step=3)
+        _lap(3)
 
     # 4. subagents may NOT toggle the state file. Checked BEFORE the general
     #    subagent bypass in step 5 so a stamped subagent can never reach the
@@ -629,7 +1120,7 @@ def main():
     #    silently flipped the state to "off" that way. Covers every
     #    path-addressable mutation tool (Write/Edit/MultiEdit/NotebookEdit).
     #    The main thread (no agent_id) keeps its Write-only fallthrough below.
-    if tool in ("Write", "Edit", "MultiEdit", "NotebookEdit") and agent_id:
+    if cls in PATH_MUTATION_TOOLS and agent_id:
         base = project_dir(data)
         path_key = "notebook_path" if tool == "NotebookEdit" else "file_path"
         target = norm(tool_input.get(path_key, ""), base)
@@ -640,38 +1131,115 @@ def main():
             deny(
                 "orchestrator-mode: subagents may not toggle "
                 ".orchestrator-mode.state. Report the blocker to the main "
-                "thread instead.")
+                "thread instead.", step=4)
+        _lap(4)
 
     # 5. subagent -> proceeds normally (silent no-op; do NOT auto-approve)
     if agent_id:
-        noop("subagent %s -> silent no-op (full access)" % agent_id)
+        noop("subagent %s -> silent no-op (full access)" % agent_id, step=5)
+
+    if cls in PATH_MUTATION_TOOLS:
+        # 6. [D1] toggle: let a Write to the project's own state file fall
+        #    through to the NORMAL permission prompt (silent no-op), instead
+        #    of auto-approving. Main-thread-only -- subagents were already
+        #    denied in step 4. The user approves the toggle like any other
+        #    Write.
+        if tool == "Write":
+            base = project_dir(data)
+            target = norm(tool_input.get("file_path", ""), base)
+            if target and target == norm(state_file_path(data), base):
+                noop("Write to state file -> fall through to normal prompt (toggle, D1)",
+                     step=6)
+            _lap(6)
+
+        # 7. [ADR-004] Write/Edit/MultiEdit/NotebookEdit to safe reflection
+        # dirs (.remember + ~/.claude/projects/<slug>/memory, plus any
+        # safe-dirs entries) on the main thread -- these dirs never touch
+        # repo/product code, so they stay writable regardless of mode.
+        # Non-matching paths fall through to the mode dispatch.
+        if _is_safe_reflection_write(tool, tool_input, data, options):
+            noop("reflection path write -> silent no-op (ADR-004: memory/.remember dirs stay writable)",
+                 step=7)
+        _lap(7)
+
+    # 8/9/10. one decision-table lookup on (mode, tool class); the model
+    # allowlist, when set, composes inside the delegation actions the mode
+    # gating would otherwise allow.
+    dispatch(mode, tool, cls, tool_input, allowed_models, data, options)
 
-    # 6. [D1] toggle: let a Write to the project's own state file fall
-    #    through to the NORMAL permission prompt (silent no-op), instead of
-    #    auto-approving. Main-thread-only -- subagents were already denied in
-    #    step 4. The user approves the toggle like any other Write.
-    if tool == "Write":
-        base = project_dir(data)
-        target = norm(tool_input.get("file_path", ""), base)
-        if target and target == norm(state_file_path(data), base):
-            noop("Write to state file -> fall through to normal prompt (toggle, D1)")
 
-    # 7. [ADR-004] Write/Edit/MultiEdit/NotebookEdit to safe reflection dirs
-    # (.remember + ~/.claude/projects/<slug>/memory) on the main thread --
-    # these dirs never touch repo/product code, so they stay writable
-    # regardless of mode. Non-matching paths fall through to the mode dispatch.
-    if _is_safe_reflection_write(tool, tool_input, data):
-        noop("reflection path write -> silent no-op (ADR-004: memory/.remember dirs stay writable)")
+def main():
+    """The hook: parse stdin, decide(), record, print a deny, exit 0."""
+    global _main_t0, _laps
+    _main_t0 = time.perf_counter_ns()
+    _laps = ([] if os.environ.get("ORCHESTRATOR_STATS", "").lower()
+             in ("1", "on", "true") else None)
+
+    data, state = None, None
+    try:
+        # 1. parse -- fail OPEN
+        try:
+            data = _payload.load(sys.stdin, STATE_FILE_TOKEN)
+        except Exception:
+            noop("could not parse stdin -> fail-open (silent)", step=1)
+        _lap(1)
+        state = get_state(data)
+        result = decide(data, state)
+    except _Decided as e:
+        result = e.decision
+    # The live decision ends here: the shadow run and the bookkeeping below
+    # are not charged to it (audit `us`, stats laps).
+    _lap(result.step)
+    live_us = (time.perf_counter_ns() - _main_t0) // 1000
+
+    repeats = 0
+    if state is not None:
+        mode, options = state
+        if "shadow" in options and data is not None:
+            _run_shadow(data, mode, options, result)
+        if result.decision == "deny":
+            try:
+                result, repeats = _count_deny(data, mode, options, result)
+            except Exception as e:
+                # bookkeeping never costs the deny itself
+                log_debug("deny-loop count failed: %s" % e)
+        if mode != "off" and option_enabled(options, "audit"):
+            _write_audit(data, mode, options, result, live_us)
+    if _laps is not None:
+        _write_stats(data.get("tool_name", "") if data is not None else "",
+                     result, repeats)
+    if result.decision == "deny":
+        _output.write(_output.deny_line(result.reason))
+    sys.exit(0)
+
 
-    # 8/9/10. branch on mode (the model allowlist, when set, composes inside
-    # each handler on delegation calls the mode gating would otherwise allow)
-    if mode == "on":
-        handle_on_mode(tool, tool_input, allowed_models, data)
-    elif mode == "wf":
-        handle_wf_mode(tool, tool_input, allowed_models, data)
-    else:  # mode == "pi"
-        handle_pi_mode(tool, tool_input, allowed_models)
+def batch(lines, out):
+    """`--batch`: one JSON payload per input line -> one JSON Decision per
+    output line, in order ({"decision", "reason", "step"}). An unparseable
+    line is the hook's step-1 no-op; a payload the hook would crash on is
+    {"decision": "error"}. Nothing is audited or timed."""
+    global _laps
+    _laps = None
+    for line in lines:
+        try:
+            data = json.loads(line)
+        except ValueError:
+            result = Decision(
+                "noop", "could not parse stdin -> fail-open (silent)", 1)
+        else:
+            try:
+                result = decide(data)
+            except Exception as e:
+                result = Decision("error", "%s: %s" % (type(e).__name__, e),
+                                  None)
+        out.write(json.dumps(result._asdict()) + "\n")
 
 
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["--stats"]:
+        import _stats
+        sys.exit(_stats.main(sys.argv[2:]))
+    if sys.argv[1:] == ["--batch"]:
+        batch(sys.stdin.buffer, sys.stdout)
+        sys.exit(0)
     main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""orchestrator-mode PreToolUse client shim (what hooks.json invokes).
+
+Forwards the raw hook payload to gate-daemon.py over its Unix socket (see
+_gate.py) and replays the daemon's stdout/stderr/exit code verbatim. When no
+daemon is running -- the default, the daemon is optional -- or it fails to
+answer, the payload is evaluated IN-PROCESS by running enforce-orchestrator.py
+exactly as if hooks.json had invoked it directly. Same decisions, same
+fail-open semantics either way; the daemon only removes the per-call
+interpreter/import cost.
+
+Debug: set ORCHESTRATOR_DEBUG=true for stderr tracing (emitted by whichever
+side evaluates the call).
+"""
+import os
+import sys
+
+HOOKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HOOKS_DIR)
+import _gate  # noqa: E402
+
+
+def main():
+    try:
+        payload = sys.stdin.buffer.read()
+    except Exception:
+        payload = b""
+
+    reply = _gate.request(payload)
+    if reply is not None:
+        rc, out, err = reply
+        if err:
+            sys.stderr.buffer.write(err)
+            sys.stderr.flush()
+        if out:
+            sys.stdout.buffer.write(out)
+            sys.stdout.flush()
+        sys.exit(rc)
+
+    # No usable daemon -> evaluate in-process, byte-identical to invoking
+    # enforce-orchestrator.py directly with the same stdin.
+    # (importlib rather than runpy: runpy.run_path drags in pkgutil ->
+    # typing, which tests/test_startup.sh keeps off the hot path.)
+    import importlib.util
+    import io
+    sys.stdin = io.TextIOWrapper(io.BytesIO(payload))
+    spec = importlib.util.spec_from_file_location(
+        "__main__", os.path.join(HOOKS_DIR, "enforce-orchestrator.py"))
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+
+
+if __name__ == "__main__":
+    main()
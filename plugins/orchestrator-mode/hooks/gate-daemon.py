@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""orchestrator-mode decision daemon (OPTIONAL).
+
+A long-lived Unix-socket server that runs the SAME enforce-orchestrator.main()
+the hook would run, once per request, inside one warm interpreter -- so a
+PreToolUse decision costs a socket round-trip instead of a python3 cold start
+plus imports. gate-client.py (what hooks.json invokes) forwards each payload
+here and falls back to in-process evaluation whenever this daemon is not
+running, so nothing depends on it being up.
+
+Usage:
+    python3 gate-daemon.py start    # detach into the background
+    python3 gate-daemon.py run      # run in the foreground
+    python3 gate-daemon.py stop
+    python3 gate-daemon.py status
+
+Socket: see _gate.socket_path() (ORCHESTRATOR_GATE_SOCKET overrides). The
+pid is written next to it as <socket>.pid.
+
+Each request is evaluated under the CALLER's environment and cwd (both are
+shipped in the request), with stdin/stdout/stderr redirected into buffers, so
+the reply is byte-identical to what the hook would have printed itself --
+including _state.py's stderr warnings. Requests are served one at a time; a
+decision is far cheaper than the queueing this would ever cause.
+
+State: the first request from each CLAUDE_PROJECT_DIR registers a
+_state.StateWatcher for it. Every later request from that project gets its
+state from memory, and a mode toggle is seen by the very next request.
+
+Safety valves (all resolve to "client evaluates in-process"):
+  - the hook sources changed on disk since startup (plugin update) -> the
+    daemon drops the request unanswered and exits, so it never serves stale
+    policy;
+  - idle for ORCHESTRATOR_GATE_IDLE seconds (default 1800) -> exits;
+  - any protocol error -> the connection is closed without a reply.
+"""
+import glob
+import importlib.util
+import io
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import traceback
+
+HOOKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HOOKS_DIR)
+import _gate  # noqa: E402
+import _state  # noqa: E402
+
+DEFAULT_IDLE_SECONDS = 1800
+
+
+def log_debug(msg):
+    if os.environ.get("ORCHESTRATOR_DEBUG", "false") == "true":
+        sys.stderr.write("[orchestrator-mode] gate-daemon: %s\n" % msg)
+
+
+def _load_enforce():
+    spec = importlib.util.spec_from_file_location(
+        "enforce_orchestrator", os.path.join(HOOKS_DIR, "enforce-orchestrator.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _source_stamp():
+    stamp = {}
+    for path in glob.glob(os.path.join(HOOKS_DIR, "*.py")):
+        try:
+            stamp[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            stamp[path] = None
+    return stamp
+
+
+def evaluate(enforce, cwd, env, payload):
+    """Run enforce.main() for one request under the caller's env/cwd.
+    Returns (rc, stdout bytes, stderr bytes)."""
+    os.environb.clear()
+    os.environb.update(env)
+    try:
+        os.chdir(cwd)
+    except OSError:
+        os.chdir("/")
+    project = os.environ.get("CLAUDE_PROJECT_DIR")
+    if project and os.path.isabs(project) and os.path.isdir(project):
+        _state.watch(project)  # get_state() is answered from memory from now on
+    out, err = io.StringIO(), io.StringIO()
+    saved = sys.stdin, sys.stdout, sys.stderr
+    sys.stdin = io.TextIOWrapper(io.BytesIO(payload))
+    sys.stdout, sys.stderr = out, err
+    rc = 0
+    try:
+        enforce.main()
+    except SystemExit as e:
+        code = e.code
+        if code is None:
+            rc = 0
+        elif isinstance(code, int):
+            rc = code
+        else:
+            err.write("%s\n" % code)
+            rc = 1
+    except BaseException:
+        traceback.print_exc(file=err)
+        rc = 1
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = saved
+    return rc, out.getvalue().encode("utf-8"), err.getvalue().encode("utf-8")
+
+
+def _pid_path(path):
+    return path + ".pid"
+
+
+def _is_live(path):
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.settimeout(0.5)
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+def serve(path):
+    if os.path.exists(path):
+        if _is_live(path):
+            sys.stderr.write("gate-daemon: already running at %s\n" % path)
+            return 1
+        os.unlink(path)  # stale socket from a crashed daemon
+
+    enforce = _load_enforce()
+    stamp = _source_stamp()
+    idle = float(os.environ.get("ORCHESTRATOR_GATE_IDLE") or DEFAULT_IDLE_SECONDS)
+
+    old_umask = os.umask(0o077)
+    try:
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+    finally:
+        os.umask(old_umask)
+    server.listen(64)
+    server.settimeout(idle)
+    with open(_pid_path(path), "w") as f:
+        f.write("%d\n" % os.getpid())
+
+    def _terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _terminate)
+    home_env = dict(os.environb)
+    home_cwd = os.getcwd()
+    log_debug("listening on %s (pid %d)" % (path, os.getpid()))
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                log_debug("idle for %ss -> exiting" % idle)
+                break
+            with conn:
+                conn.settimeout(_gate.REPLY_TIMEOUT)
+                try:
+                    cwd, env, payload = _gate.decode_request(_gate.recv_all(conn))
+                except Exception:
+                    continue  # garbled request -> no reply -> client falls back
+                if _source_stamp() != stamp:
+                    # Plugin updated under us: never answer with stale policy.
+                    break
+                rc, out, err = evaluate(enforce, cwd, env, payload)
+                try:
+                    conn.sendall(_gate.encode_reply(rc, out, err))
+                except OSError:
+                    pass  # client gave up and fell back; nothing to do
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os.environb.clear()
+        os.environb.update(home_env)
+        os.chdir(home_cwd)
+        server.close()
+        for p in (path, _pid_path(path)):
+            try:
+                os.unlink(p)
+            except OSError:
+                pass
+    return 0
+
+
+def start(path):
+    if os.path.exists(path) and _is_live(path):
+        print("gate-daemon: already running at %s" % path)
+        return 0
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "run"],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL, start_new_session=True, close_fds=True)
+    deadline = time.monotonic() + 5.0
+    while time.monotonic() < deadline:
+        if os.path.exists(path) and _is_live(path):
+            print("gate-daemon: started at %s" % path)
+            return 0
+        time.sleep(0.02)
+    sys.stderr.write("gate-daemon: did not come up at %s\n" % path)
+    return 1
+
+
+def stop(path):
+    try:
+        with open(_pid_path(path)) as f:
+            pid = int(f.read().strip())
+    except (OSError, ValueError):
+        print("gate-daemon: not running")
+        return 0
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except OSError:
+        pass
+    deadline = time.monotonic() + 5.0
+    while time.monotonic() < deadline and os.path.exists(path):
+        time.sleep(0.02)
+    print("gate-daemon: stopped")
+    return 0
+
+
+def status(path):
+    if os.path.exists(path) and _is_live(path):
+        print("gate-daemon: running at %s" % path)
+        return 0
+    print("gate-daemon: not running")
+    return 3
+
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else "status"
+    path = _gate.socket_path()
+    if command == "run":
+        return serve(path)
+    if command == "start":
+        return start(path)
+    if command == "stop":
+        return stop(path)
+    if command == "status":
+        return status(path)
+    sys.stderr.write("usage: gate-daemon.py start|run|stop|status\n")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -18,18 +18,32 @@ Four-state, read from `.orchestrator-mode.state` at the project root via
 When the state carries an `allowed-models` option, one extra sentence naming
 the model allowlist is appended to whichever mode reminder is active.
 
+Reminder strategy (state option `reminder=`):
+- full (default): the full reminder on every prompt.
+- delta: the full reminder on a session's first prompt, again whenever the
+  full text changes (mode or allowlist toggled, plugin updated), and every
+  `reminder-every` prompts (default 10); a one-line REMINDER_*_SHORT tag on
+  the prompts in between. Per-session counters live in the cache dir (see
+  _cache.py), keyed by the payload's session_id. No session_id, caching
+  disabled, or an unreadable cache -> the full reminder (fail toward more
+  context, never less).
+
 On any parse error, inject nothing (fail open).
 
 The reminder MUST be wrapped in hookSpecificOutput.additionalContext -- a flat
-"additionalContext" key silently no-ops.
+"additionalContext" key silently no-ops. The envelope is pre-serialized by
+_output.reminder_line() and written in one call.
 
 Debug: set ORCHESTRATOR_DEBUG=true for stderr tracing.
 """
-import json
 import os
 import sys
+import zlib
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import _cache  # noqa: E402
+import _output  # noqa: E402
+import _payload  # noqa: E402
 from _state import get_state  # noqa: E402
 
 
@@ -87,10 +101,67 @@ REMINDER_WF = (
     "tool for this project -- use it to orchestrate work. "
     "(Run /orchestrator-mode:mode off to exit this mode.)")
 
+REMINDER_ON_SHORT = (
+    "ORCHESTRATION MODE is still ON: the main thread is READ-ONLY; delegate "
+    "all edits, commands, and MCP calls to Agent/Task or Workflow "
+    "subagents (full rules given earlier this session; "
+    "/orchestrator-mode:mode off to exit).")
+
+REMINDER_PI_SHORT = (
+    "ORCHESTRATION MODE is still PI: the main thread is READ-ONLY and may "
+    "not spawn subagents; code changes go through the pi-delegate MCP tools "
+    "under the DELEGATION CONTRACT (full rules given earlier this session; "
+    "/orchestrator-mode:mode off to exit).")
+
+REMINDER_WF_SHORT = (
+    "ORCHESTRATION MODE is still WF: the main thread is READ-ONLY; "
+    "orchestrate through the Workflow tool, Task/Agent only for the Explore "
+    "scout (full rules given earlier this session; /orchestrator-mode:mode "
+    "off to exit).")
+
+DEFAULT_REMINDER_EVERY = 10
+
+_SESSION_CACHE = "reminder-sessions.json"
+_SESSION_CACHE_MAX_ENTRIES = 256
+
+
+def _reminder_every(options):
+    try:
+        every = int(options.get("reminder-every", ""))
+    except ValueError:
+        return DEFAULT_REMINDER_EVERY
+    return every if every > 0 else DEFAULT_REMINDER_EVERY
+
+
+def wants_full(data, options, full_line):
+    """reminder=delta bookkeeping -> whether this prompt gets the full
+    reminder (`full_line` is its encoded output). Always True under the
+    default reminder=full.
+
+    The session cache maps session_id -> [crc32 of the last full line sent,
+    prompts since then, counting that one]. Concurrent sessions may race on
+    the file; a lost update only means an extra full reminder."""
+    if options.get("reminder") != "delta":
+        return True
+    session = data.get("session_id")
+    if not isinstance(session, str) or not session:
+        return True
+    fingerprint = zlib.crc32(full_line)
+    sessions = _cache.load(_SESSION_CACHE)
+    entry = sessions.pop(session, None)
+    full = not (isinstance(entry, list) and len(entry) == 2
+                and entry[0] == fingerprint and isinstance(entry[1], int)
+                and 0 < entry[1] < _reminder_every(options))
+    sessions[session] = [fingerprint, 1 if full else entry[1] + 1]
+    for stale in list(sessions)[:-_SESSION_CACHE_MAX_ENTRIES]:
+        del sessions[stale]  # oldest first: dicts keep insertion order
+    _cache.store(_SESSION_CACHE, sessions)
+    return full
+
 
 def main():
     try:
-        data = json.load(sys.stdin)
+        data = _payload.load(sys.stdin)
     except Exception:
         log_debug("could not parse stdin -> inject nothing")
         sys.exit(0)
@@ -102,11 +173,11 @@ def main():
         sys.exit(0)
 
     if mode == "on":
-        reminder = REMINDER_ON
+        reminder, short = REMINDER_ON, REMINDER_ON_SHORT
     elif mode == "wf":
-        reminder = REMINDER_WF
+        reminder, short = REMINDER_WF, REMINDER_WF_SHORT
     else:  # mode == "pi"
-        reminder = REMINDER_PI
+        reminder, short = REMINDER_PI, REMINDER_PI_SHORT
 
     allowed_models = options.get("allowed-models")
     if allowed_models:
@@ -116,12 +187,16 @@ def main():
             "omitting the model while this allowlist is active is NOT "
             "allowed and will be denied."
             % ", ".join(allowed_models))
-
-    out = {"hookSpecificOutput": {
-        "hookEventName": "UserPromptSubmit",
-        "additionalContext": reminder}}
-    print(json.dumps(out))
-    log_debug("mode=%s -> injected reminder" % mode)
+        short += (" Delegated agents MUST declare model: one of %s."
+                  % ", ".join(allowed_models))
+
+    line = _output.reminder_line(reminder)
+    if wants_full(data, options, line):
+        log_debug("mode=%s -> injected reminder" % mode)
+    else:
+        line = _output.reminder_line(short)
+        log_debug("mode=%s -> injected short reminder (reminder=delta)" % mode)
+    _output.write(line)
     sys.exit(0)
 
 
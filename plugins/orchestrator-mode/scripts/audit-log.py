@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Read the orchestrator-mode decision audit log (see hooks/_audit.py).
+
+Reads `<project>/.orchestrator-mode.audit` (plus the rotated `.audit.1`
+segment, oldest first) and either prints the most recent records or
+summarizes them:
+
+    python3 scripts/audit-log.py [PROJECT_DIR | AUDIT_FILE]      # last 20
+    python3 scripts/audit-log.py -n 100                          # last 100
+    python3 scripts/audit-log.py -f                              # follow
+    python3 scripts/audit-log.py --summary [--session ID]
+    python3 scripts/audit-log.py --json                          # raw JSONL
+
+PROJECT_DIR defaults to $CLAUDE_PROJECT_DIR, else the current directory.
+Corrupt or partial lines are skipped.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+AUDIT_FILE_NAME = ".orchestrator-mode.audit"
+
+
+def resolve(target):
+    target = target or os.environ.get("CLAUDE_PROJECT_DIR") or os.getcwd()
+    if os.path.isdir(target):
+        return os.path.join(target, AUDIT_FILE_NAME)
+    return target
+
+
+def read_records(path):
+    for segment in (path + ".1", path):
+        try:
+            with open(segment, "rb") as f:
+                for raw in f:
+                    try:
+                        record = json.loads(raw)
+                    except ValueError:
+                        continue
+                    if isinstance(record, dict):
+                        yield record
+        except OSError:
+            continue
+
+
+def format_record(r):
+    ts = r.get("ts")
+    when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)) if ts else "-"
+    who = ("agent:%s" % r["agent"]) if r.get("agent") else "main"
+    return "%s  %-4s  %-5s step %-2s  %-12s  %-28s %7sus  %s" % (
+        when, r.get("mode", "-"), r.get("decision", "-"), r.get("step", "-"),
+        who[:12], str(r.get("tool", "-"))[:28], r.get("us", "-"),
+        (r.get("session") or "-")[:12])
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1,
+                             int(round((len(sorted_values) - 1) * pct / 100.0)))]
+
+
+def summarize(records, out=sys.stdout):
+    records = list(records)
+    if not records:
+        out.write("no audit records\n")
+        return
+    first = min(r.get("ts") or 0 for r in records)
+    last = max(r.get("ts") or 0 for r in records)
+    out.write("%d decisions, %s .. %s\n" % (
+        len(records),
+        time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(first)),
+        time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last))))
+    for title, key in (("decision", lambda r: r.get("decision")),
+                       ("mode", lambda r: r.get("mode")),
+                       ("step", lambda r: r.get("step")),
+                       ("thread", lambda r: "subagent" if r.get("agent") else "main")):
+        counts = {}
+        for r in records:
+            k = key(r)
+            counts[k] = counts.get(k, 0) + 1
+        out.write("\nby %s:\n" % title)
+        for k, n in sorted(counts.items(), key=lambda kv: (-kv[1], str(kv[0]))):
+            out.write("  %-12s %8d\n" % (k, n))
+
+    tools = {}
+    for r in records:
+        t = tools.setdefault(r.get("tool"), {"deny": 0, "noop": 0, "us": []})
+        t["deny" if r.get("decision") == "deny" else "noop"] += 1
+        if isinstance(r.get("us"), int):
+            t["us"].append(r["us"])
+    out.write("\nby tool:\n  %-34s %8s %8s %9s %9s\n" % (
+        "tool", "deny", "noop", "p50 us", "p99 us"))
+    for name, t in sorted(tools.items(),
+                          key=lambda kv: (-(kv[1]["deny"] + kv[1]["noop"]), str(kv[0]))):
+        us = sorted(t["us"])
+        out.write("  %-34s %8d %8d %9d %9d\n" % (
+            str(name)[:34], t["deny"], t["noop"],
+            _percentile(us, 50), _percentile(us, 99)))
+
+    us = sorted(r["us"] for r in records if isinstance(r.get("us"), int))
+    out.write("\nlatency: p50 %dus  p95 %dus  p99 %dus  max %dus\n" % (
+        _percentile(us, 50), _percentile(us, 95), _percentile(us, 99),
+        us[-1] if us else 0))
+
+
+def follow(path, emit, poll=0.5):
+    """Print records appended to `path` from now on, across rotations."""
+    f, ino = None, None
+    while True:
+        try:
+            st = os.stat(path)
+            if f is None or st.st_ino != ino:
+                if f is not None:
+                    f.close()
+                f = open(path, "rb")
+                if ino is None:
+                    f.seek(0, os.SEEK_END)  # start at the current end
+                ino = st.st_ino
+        except OSError:
+            time.sleep(poll)
+            continue
+        line = f.readline()
+        if not line:
+            time.sleep(poll)
+            continue
+        try:
+            emit(json.loads(line))
+        except ValueError:
+            continue
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("target", nargs="?",
+                        help="project dir or audit file (default: "
+                             "$CLAUDE_PROJECT_DIR or cwd)")
+    parser.add_argument("-n", "--lines", type=int, default=20)
+    parser.add_argument("-f", "--follow", action="store_true")
+    parser.add_argument("--summary", action="store_true")
+    parser.add_argument("--session", help="only records for this session_id")
+    parser.add_argument("--json", action="store_true",
+                        help="print records as JSONL instead of columns")
+    args = parser.parse_args(argv)
+
+    path = resolve(args.target)
+    records = read_records(path)
+    if args.session:
+        records = (r for r in records if r.get("session") == args.session)
+
+    def emit(r):
+        if args.session and r.get("session") != args.session:
+            return
+        sys.stdout.write((json.dumps(r) if args.json else format_record(r)) + "\n")
+        sys.stdout.flush()
+
+    if args.summary:
+        summarize(records)
+        return 0
+    if not os.path.exists(path) and not os.path.exists(path + ".1"):
+        sys.stderr.write("no audit log at %s (enable with the audit=on "
+                         "state option)\n" % path)
+        if not args.follow:
+            return 1
+    tail = list(records)[-args.lines:] if args.lines > 0 else []
+    for r in tail:
+        emit(r)
+    if args.follow:
+        try:
+            follow(path, emit)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""Benchmark the orchestrator-mode hook hot paths.
+
+Replays payload corpora through enforce-orchestrator.py (PreToolUse) and
+inject-reminder.py (UserPromptSubmit) and reports per-scenario latency
+(p50/p99), throughput (calls/sec) and peak RSS, measured two ways:
+
+  in-process  each hook's main() called in a loop inside a child forked
+              from this interpreter once the hooks are loaded (stdin/stdout
+              redirected, SystemExit caught) -- the cost of the decision
+              logic itself, and what gate-daemon.py pays. Each scenario
+              gets its own child, so its peak RSS is its own and not the
+              high-water mark of every scenario run before it;
+  spawned     one fresh process per call, using the exact command lines
+              from hooks/hooks.json -- what a session pays per tool call
+              without the daemon.
+
+Corpora:
+  synthetic   generated here: every mode (incl. an allowed-models line) x
+              main thread / subagent x a spread of tools, plus large
+              Workflow scripts, a large MCP payload, and a deep cwd tree
+              resolved through the CLAUDE_PROJECT_DIR-unset walk-up;
+  recorded    JSONL files of {"hook", "state", "payload"} records (see
+              bench-corpus/recorded-session.jsonl); "${PROJECT}" inside any
+              payload string is replaced by the scratch project dir.
+
+Everything runs inside a mktemp scratch project with its own cache dir; the
+real .orchestrator-mode.state and ~/.cache are never touched.
+
+Results are comparable across commits: --json writes a machine-readable
+report (with the git commit it was taken at), and --compare BASE.json prints
+per-scenario deltas against an earlier report, flagging p50 regressions
+above --threshold percent.
+
+Usage:
+    python3 scripts/bench-hooks.py [--iterations N] [--spawn-iterations N]
+        [--corpus FILE ...] [--no-synthetic] [--no-spawn] [--quick]
+        [--filter SUBSTR] [--json OUT.json] [--compare BASE.json]
+        [--threshold PCT]
+"""
+import argparse
+import importlib.util
+import io
+import json
+import os
+import platform
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+PLUGIN_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOOKS_DIR = os.path.join(PLUGIN_ROOT, "hooks")
+DEFAULT_CORPUS = os.path.join(PLUGIN_ROOT, "scripts", "bench-corpus",
+                              "recorded-session.jsonl")
+HOOK_SCRIPTS = {
+    "PreToolUse": "enforce-orchestrator.py",
+    "UserPromptSubmit": "inject-reminder.py",
+}
+DEEP_TREE_DEPTH = 40
+
+
+# ---------------------------------------------------------------------------
+# Corpora
+# ---------------------------------------------------------------------------
+
+def _workflow_script(calls):
+    lines = []
+    for i in range(calls):
+        model = ("opus", "sonnet", "haiku")[i % 3]
+        lines.append(
+            "// step %d: fan out\nconst r%d = await agent(`Task %d: ${input}`, "
+            "{model: '%s', description: \"step %d\"});" % (i, i, i, model, i))
+    return "\n".join(lines) + "\n"
+
+
+def synthetic_scenarios():
+    """-> list of scenario dicts: name, hook, state, walk, payload."""
+    states = [
+        ("off", "off"), ("on", "on"), ("pi", "pi"), ("wf", "wf"),
+        ("wf+models", "wf allowed-models=opus,sonnet,haiku"),
+    ]
+    tools = [
+        ("Read", {"file_path": "${PROJECT}/src/app.py"}),
+        ("Bash", {"command": "python -m pytest -q"}),
+        ("Edit", {"file_path": "src/app.py", "old_string": "a", "new_string": "b"}),
+        ("Write-toggle", {"file_path": "${PROJECT}/.orchestrator-mode.state",
+                          "content": "off"}),
+        ("Write-reflection", {"file_path": "${PROJECT}/.remember/notes.md",
+                              "content": "x"}),
+        ("Task-Explore", {"subagent_type": "Explore", "model": "haiku",
+                          "prompt": "scout"}),
+        ("mcp", {"path": "/srv/data.json", "content": "y" * 256}),
+        ("mcp-pi", {"text": "do the thing"}),
+        ("Workflow-small", {"script": _workflow_script(3)}),
+    ]
+    tool_names = {"Write-toggle": "Write", "Write-reflection": "Write",
+                  "Task-Explore": "Task", "mcp": "mcp__files__write",
+                  "mcp-pi": "mcp__plugin_pi-delegate_pi-delegate__pi_task",
+                  "Workflow-small": "Workflow"}
+    scenarios = []
+    for label, state in states:
+        for thread in ("main", "subagent"):
+            for tool_label, tool_input in tools:
+                payload = {
+                    "session_id": "bench", "cwd": "${PROJECT}",
+                    "hook_event_name": "PreToolUse",
+                    "tool_name": tool_names.get(tool_label, tool_label),
+                    "tool_input": tool_input,
+                }
+                if thread == "subagent":
+                    payload["agent_id"] = "bench-sub"
+                scenarios.append({
+                    "name": "pre/%s/%s/%s" % (label, thread, tool_label),
+                    "hook": "PreToolUse", "state": state, "walk": False,
+                    "payload": payload})
+        scenarios.append({
+            "name": "prompt/%s" % label, "hook": "UserPromptSubmit",
+            "state": state, "walk": False,
+            "payload": {"session_id": "bench", "cwd": "${PROJECT}",
+                        "hook_event_name": "UserPromptSubmit",
+                        "prompt": "next step"}})
+    big = "wf allowed-models=opus,sonnet,haiku"
+    for calls in (200, 5000):
+        scenarios.append({
+            "name": "pre/wf+models/main/Workflow-%d-calls" % calls,
+            "hook": "PreToolUse", "state": big, "walk": False,
+            "payload": {"session_id": "bench", "cwd": "${PROJECT}",
+                        "tool_name": "Workflow",
+                        "tool_input": {"script": _workflow_script(calls)}}})
+    scenarios.append({
+        "name": "pre/on/subagent/mcp-1MB", "hook": "PreToolUse", "state": "on",
+        "walk": False,
+        "payload": {"session_id": "bench", "cwd": "${PROJECT}", "agent_id": "s",
+                    "tool_name": "mcp__files__write",
+                    "tool_input": {"path": "/srv/blob.b64",
+                                   "content": "QUJD" * (1 << 18)}}})
+    scenarios.append({
+        "name": "pre/on/main/Write-1MB", "hook": "PreToolUse", "state": "on",
+        "walk": False,
+        "payload": {"session_id": "bench", "cwd": "${PROJECT}",
+                    "tool_name": "Write",
+                    "tool_input": {"file_path": "src/generated.py",
+                                   "content": "x = 1\n" * (1 << 17)}}})
+    for label, state in (("off", None), ("on", "on")):
+        for hook, payload in (
+                ("PreToolUse", {"tool_name": "Read",
+                                "tool_input": {"file_path": "a.py"}}),
+                ("UserPromptSubmit", {"prompt": "hi"})):
+            payload = dict(payload, session_id="bench", cwd="${DEEP}")
+            scenarios.append({
+                "name": "%s/deep-cwd/%s" % (
+                    "pre" if hook == "PreToolUse" else "prompt", label),
+                "hook": hook, "state": state, "walk": True,
+                "payload": payload})
+    return scenarios
+
+
+def recorded_scenarios(path):
+    """One scenario per (hook, state, tool) group of a recorded corpus, each
+    replaying every matching record in order."""
+    groups = {}
+    base = os.path.splitext(os.path.basename(path))[0]
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            hook = record.get("hook") or record["payload"].get("hook_event_name")
+            state = record.get("state")
+            key = (hook, state, record["payload"].get("tool_name", ""))
+            groups.setdefault(key, []).append(record["payload"])
+    scenarios = []
+    for (hook, state, tool), payloads in groups.items():
+        scenarios.append({
+            "name": "recorded/%s/%s/%s/%s" % (
+                base, "pre" if hook == "PreToolUse" else "prompt",
+                (state or "absent").split()[0], tool or "-"),
+            "hook": hook, "state": state, "walk": False,
+            "payloads": payloads})
+    return scenarios
+
+
+# ---------------------------------------------------------------------------
+# Scratch project
+# ---------------------------------------------------------------------------
+
+class Scratch:
+    def __init__(self):
+        self.root = tempfile.mkdtemp(prefix="orchestrator-bench-")
+        self.project = os.path.join(self.root, "proj")
+        self.deep = os.path.join(self.project, *["d%02d" % i for i in range(DEEP_TREE_DEPTH)])
+        os.makedirs(self.deep)
+        os.makedirs(os.path.join(self.project, ".remember"))
+        self.state_path = os.path.join(self.project, ".orchestrator-mode.state")
+        self.env = dict(os.environ)
+        self.env.pop("ORCHESTRATOR_DEBUG", None)
+        self.env["ORCHESTRATOR_CACHE_DIR"] = os.path.join(self.root, "cache")
+        self.env["ORCHESTRATOR_GATE_SOCKET"] = os.path.join(self.root, "no-daemon.sock")
+        self.env["HOME"] = self.root
+
+    def set_state(self, state):
+        if state is None:
+            if os.path.exists(self.state_path):
+                os.unlink(self.state_path)
+        else:
+            with open(self.state_path, "w") as f:
+                f.write(state)
+
+    def env_for(self, walk):
+        env = dict(self.env)
+        if walk:
+            env.pop("CLAUDE_PROJECT_DIR", None)
+        else:
+            env["CLAUDE_PROJECT_DIR"] = self.project
+        return env
+
+    def render(self, payload):
+        raw = json.dumps(payload)
+        return raw.replace("${PROJECT}", self.project).replace("${DEEP}", self.deep)
+
+    def cleanup(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def _load_hook(script):
+    name = "bench_" + script.replace("-", "_").replace(".py", "")
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HOOKS_DIR, script))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _call_in_process(module, raw):
+    saved = sys.stdin, sys.stdout, sys.stderr
+    sys.stdin, sys.stdout, sys.stderr = io.StringIO(raw), io.StringIO(), io.StringIO()
+    try:
+        module.main()
+    except SystemExit:
+        pass
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = saved
+
+
+def _spawn_commands():
+    """hooks.json command lines, keyed by hook event, as argv lists."""
+    with open(os.path.join(HOOKS_DIR, "hooks.json"), "r") as f:
+        config = json.load(f)
+    commands = {}
+    for event, entries in config["hooks"].items():
+        command = entries[0]["hooks"][0]["command"]
+        command = command.replace("${CLAUDE_PLUGIN_ROOT}", PLUGIN_ROOT)
+        argv = shlex.split(command)
+        if argv and argv[0] == "python3":
+            argv[0] = sys.executable
+        commands[event] = argv
+    return commands
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _summarize(samples_ns, wall_ns, rss_kb):
+    samples = sorted(s / 1000.0 for s in samples_ns)
+    return {
+        "calls": len(samples),
+        "p50_us": round(_percentile(samples, 50), 1),
+        "p99_us": round(_percentile(samples, 99), 1),
+        "calls_per_sec": round(len(samples) / (wall_ns / 1e9), 1) if wall_ns else 0.0,
+        "peak_rss_kb": rss_kb,
+    }
+
+
+def run_in_process(scratch, scenario, modules, iterations):
+    module = modules[scenario["hook"]]
+    payloads = [scratch.render(p) for p in scenario.get("payloads") or [scenario["payload"]]]
+    scratch.set_state(scenario["state"])
+    env = scratch.env_for(scenario["walk"])
+    saved_env = dict(os.environ)
+    os.environ.clear()
+    os.environ.update(env)
+    try:
+        for raw in payloads:  # warm-up: imports, caches, bytecode
+            _call_in_process(module, raw)
+        samples = []
+        start = time.perf_counter_ns()
+        for i in range(iterations):
+            raw = payloads[i % len(payloads)]
+            t0 = time.perf_counter_ns()
+            _call_in_process(module, raw)
+            samples.append(time.perf_counter_ns() - t0)
+        wall = time.perf_counter_ns() - start
+    finally:
+        os.environ.clear()
+        os.environ.update(saved_env)
+    return samples, wall
+
+
+def run_forked(scratch, scenario, modules, iterations):
+    """run_in_process() in a fresh fork, so ru_maxrss is this scenario's peak
+    (the loaded hooks plus whatever the scenario allocates) rather than the
+    lifetime high-water mark of the benchmark process."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            os.close(read_fd)
+            samples, wall = run_in_process(scratch, scenario, modules, iterations)
+            with os.fdopen(write_fd, "w") as f:
+                json.dump([samples, wall], f)
+            status = 0
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+        finally:
+            os._exit(status)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "r") as f:
+        out = f.read()
+    _, status, usage = os.wait4(pid, 0)
+    if status != 0 or not out:
+        raise RuntimeError("in-process run of %s failed" % scenario["name"])
+    samples, wall = json.loads(out)
+    return _summarize(samples, wall, usage.ru_maxrss)
+
+
+def run_spawned(scratch, scenario, commands, iterations):
+    argv = commands[scenario["hook"]]
+    payloads = [scratch.render(p).encode() for p in scenario.get("payloads") or [scenario["payload"]]]
+    scratch.set_state(scenario["state"])
+    env = scratch.env_for(scenario["walk"])
+    samples = []
+    peak = 0
+    start = time.perf_counter_ns()
+    for i in range(iterations):
+        t0 = time.perf_counter_ns()
+        proc = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL, env=env,
+                                cwd=scratch.project)
+        proc.stdin.write(payloads[i % len(payloads)])
+        proc.stdin.close()
+        _, _, usage = os.wait4(proc.pid, 0)
+        proc.returncode = 0
+        samples.append(time.perf_counter_ns() - t0)
+        peak = max(peak, usage.ru_maxrss)
+    wall = time.perf_counter_ns() - start
+    return _summarize(samples, wall, peak)
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "-C", PLUGIN_ROOT, "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def print_table(results, title):
+    print("\n== %s ==" % title)
+    print("%-58s %8s %10s %10s %12s %10s" % (
+        "scenario", "calls", "p50 us", "p99 us", "calls/sec", "rss KB"))
+    for name in sorted(results):
+        r = results[name]
+        print("%-58s %8d %10.1f %10.1f %12.1f %10d" % (
+            name[:58], r["calls"], r["p50_us"], r["p99_us"],
+            r["calls_per_sec"], r["peak_rss_kb"]))
+
+
+def print_comparison(report, base, threshold):
+    regressions = 0
+    for kind in ("in_process", "spawned"):
+        cur, old = report.get(kind) or {}, base.get(kind) or {}
+        shared = sorted(set(cur) & set(old))
+        if not shared:
+            continue
+        print("\n== %s vs %s (%s) ==" % (
+            report.get("commit"), base.get("commit"), kind))
+        print("%-58s %10s %10s %8s" % ("scenario", "base p50", "p50", "delta"))
+        for name in shared:
+            a, b = old[name]["p50_us"], cur[name]["p50_us"]
+            delta = ((b - a) / a * 100.0) if a else 0.0
+            flag = ""
+            if delta > threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print("%-58s %10.1f %10.1f %+7.1f%%%s" % (name[:58], a, b, delta, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=300,
+                        help="in-process calls per scenario (default 300)")
+    parser.add_argument("--spawn-iterations", type=int, default=10,
+                        help="spawned processes per scenario (default 10)")
+    parser.add_argument("--corpus", action="append", default=None,
+                        help="recorded corpus JSONL (repeatable; default: "
+                             "bench-corpus/recorded-session.jsonl)")
+    parser.add_argument("--no-synthetic", action="store_true")
+    parser.add_argument("--no-spawn", action="store_true")
+    parser.add_argument("--quick", action="store_true",
+                        help="smoke run: 5 in-process / 1 spawned per scenario")
+    parser.add_argument("--filter", default="",
+                        help="only scenarios whose name contains this")
+    parser.add_argument("--json", dest="json_out")
+    parser.add_argument("--compare")
+    parser.add_argument("--threshold", type=float, default=20.0,
+                        help="p50 regression threshold in percent (default 20)")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.iterations, args.spawn_iterations = 5, 1
+
+    scenarios = [] if args.no_synthetic else synthetic_scenarios()
+    for path in args.corpus or [DEFAULT_CORPUS]:
+        scenarios.extend(recorded_scenarios(path))
+    scenarios = [s for s in scenarios if args.filter in s["name"]]
+
+    scratch = Scratch()
+    try:
+        modules = {hook: _load_hook(script) for hook, script in HOOK_SCRIPTS.items()}
+        in_process = {}
+        for scenario in scenarios:
+            in_process[scenario["name"]] = run_forked(
+                scratch, scenario, modules, args.iterations)
+        spawned = {}
+        if not args.no_spawn and args.spawn_iterations > 0:
+            commands = _spawn_commands()
+            for scenario in scenarios:
+                spawned[scenario["name"]] = run_spawned(
+                    scratch, scenario, commands, args.spawn_iterations)
+    finally:
+        scratch.cleanup()
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "iterations": args.iterations,
+        "spawn_iterations": 0 if args.no_spawn else args.spawn_iterations,
+        "in_process": in_process,
+        "spawned": spawned,
+    }
+    print_table(in_process, "in-process (decision logic only)")
+    if spawned:
+        print_table(spawned, "spawned (hooks.json command per call)")
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare, "r") as f:
+            base = json.load(f)
+        if print_comparison(report, base, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
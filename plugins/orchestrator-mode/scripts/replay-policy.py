@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""Replay recorded tool calls against candidate orchestrator-mode policies.
+
+Answers "how many of last month's tool calls would `wf allowed-models=...`
+have denied?" before the state file is changed. Every tool call found in the
+inputs is run through enforce-orchestrator.decide() once per candidate state
+line (parsed by _state._parse, exactly as the hook would parse the file).
+The project's real state file is never read. Results are counted per policy,
+per tool, and per decision step.
+
+Inputs are JSONL files, directories (searched recursively for *.jsonl), or
+"-" for stdin. Three record shapes are understood:
+
+  transcript   Claude Code session transcript lines: every "tool_use" item
+               of an assistant message becomes one call. sessionId and cwd
+               are carried over; a sidechain line (isSidechain) counts as a
+               subagent call (agent_id = its agentId).
+  payload      a raw PreToolUse hook payload (has "tool_name").
+  recorded     {"hook": "PreToolUse", "payload": {...}} records, as in
+               bench-corpus/ (other hooks are skipped).
+
+Memory stays bounded however long the history is. Inputs are streamed in
+chunks of --chunk-lines lines, and at most two chunks per worker are in
+flight. Workers (a multiprocessing pool, --workers, default one per CPU)
+return counters, not per-call results.
+
+Usage:
+    python3 scripts/replay-policy.py --policy on --policy "wf allowed-models=opus,sonnet" \\
+        ~/.claude/projects/-work-app/
+    python3 scripts/replay-policy.py --policy pi --json report.json -- - < payloads.jsonl
+
+Paths in the payloads resolve against their recorded cwd (or --project-dir).
+Workflow scriptPath files that no longer exist fail open, the same way the
+hook treats them.
+"""
+import argparse
+import collections
+import importlib.util
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+PLUGIN_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOOKS_DIR = os.path.join(PLUGIN_ROOT, "hooks")
+
+# Cheap byte-level prefilter: a line without either marker holds no call.
+_MARKERS = (b'"tool_use"', b'"tool_name"')
+
+_enforce = None
+_policies = None
+
+
+def _load_enforce():
+    sys.path.insert(0, HOOKS_DIR)
+    spec = importlib.util.spec_from_file_location(
+        "enforce_orchestrator", os.path.join(HOOKS_DIR, "enforce-orchestrator.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _init_worker(policies, project_dir):
+    global _enforce, _policies
+    if project_dir:
+        os.environ["CLAUDE_PROJECT_DIR"] = project_dir
+    else:
+        os.environ.pop("CLAUDE_PROJECT_DIR", None)
+    _enforce = _load_enforce()
+    _policies = policies
+
+
+def payloads(record):
+    """PreToolUse payload(s) carried by one parsed input record."""
+    if not isinstance(record, dict):
+        return
+    if "tool_name" in record:
+        yield record
+        return
+    if record.get("hook") == "PreToolUse" and isinstance(record.get("payload"), dict):
+        yield record["payload"]
+        return
+    message = record.get("message")
+    if record.get("type") != "assistant" or not isinstance(message, dict):
+        return
+    content = message.get("content")
+    if not isinstance(content, list):
+        return
+    for item in content:
+        if isinstance(item, dict) and item.get("type") == "tool_use":
+            data = {"tool_name": item.get("name", ""),
+                    "tool_input": item.get("input", {}),
+                    "session_id": record.get("sessionId"),
+                    "cwd": record.get("cwd")}
+            if record.get("isSidechain"):
+                data["agent_id"] = record.get("agentId") or "sidechain"
+            yield data
+
+
+def _new_counts():
+    return {"calls": 0, "deny": 0, "error": 0,
+            "tools": collections.Counter(), "tool_denies": collections.Counter(),
+            "steps": collections.Counter()}
+
+
+def evaluate_chunk(lines):
+    """Worker: decide every call in `lines` under every policy -> counters."""
+    counts = [_new_counts() for _ in _policies]
+    skipped = 0
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            skipped += 1
+            continue
+        for data in payloads(record):
+            tool = str(data.get("tool_name", ""))
+            for (_, state), c in zip(_policies, counts):
+                c["calls"] += 1
+                c["tools"][tool] += 1
+                try:
+                    result = _enforce.decide(data, state)
+                except Exception:
+                    c["error"] += 1
+                    continue
+                if result.decision == "deny":
+                    c["deny"] += 1
+                    c["tool_denies"][tool] += 1
+                    c["steps"][result.step] += 1
+    return counts, skipped
+
+
+def _merge(total, part):
+    for key in ("calls", "deny", "error"):
+        total[key] += part[key]
+    for key in ("tools", "tool_denies", "steps"):
+        total[key].update(part[key])
+
+
+def iter_files(inputs):
+    for target in inputs:
+        if target == "-" or not os.path.isdir(target):
+            yield target
+            continue
+        for root, dirs, files in os.walk(target):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(".jsonl"):
+                    yield os.path.join(root, name)
+
+
+def iter_chunks(inputs, chunk_lines):
+    chunk = []
+    for path in iter_files(inputs):
+        f = sys.stdin.buffer if path == "-" else open(path, "rb")
+        try:
+            for line in f:
+                if any(m in line for m in _MARKERS):
+                    chunk.append(line)
+                    if len(chunk) >= chunk_lines:
+                        yield chunk
+                        chunk = []
+        finally:
+            if f is not sys.stdin.buffer:
+                f.close()
+    if chunk:
+        yield chunk
+
+
+def replay(inputs, policies, workers, chunk_lines, project_dir=None):
+    """-> ({label: counts}, skipped_lines). Runs in-process when workers <= 1."""
+    totals = [_new_counts() for _ in policies]
+    skipped = 0
+
+    def absorb(result):
+        nonlocal skipped
+        counts, bad = result
+        skipped += bad
+        for total, part in zip(totals, counts):
+            _merge(total, part)
+
+    chunks = iter_chunks(inputs, chunk_lines)
+    if workers <= 1:
+        saved = os.environ.get("CLAUDE_PROJECT_DIR")
+        _init_worker(policies, project_dir)
+        try:
+            for chunk in chunks:
+                absorb(evaluate_chunk(chunk))
+        finally:
+            if saved is None:
+                os.environ.pop("CLAUDE_PROJECT_DIR", None)
+            else:
+                os.environ["CLAUDE_PROJECT_DIR"] = saved
+    else:
+        with multiprocessing.Pool(workers, _init_worker,
+                                  (policies, project_dir)) as pool:
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(pool.apply_async(evaluate_chunk, (chunk,)))
+                while len(pending) >= 2 * workers:
+                    absorb(pending.popleft().get())
+            while pending:
+                absorb(pending.popleft().get())
+    return {label: c for (label, _), c in zip(policies, totals)}, skipped
+
+
+def to_json(results, skipped, seconds):
+    out = {"skipped_lines": skipped, "seconds": round(seconds, 3),
+           "policies": {}}
+    for label, c in results.items():
+        out["policies"][label] = {
+            "calls": c["calls"], "deny": c["deny"], "error": c["error"],
+            "by_tool": {t: {"calls": n, "deny": c["tool_denies"][t]}
+                        for t, n in c["tools"].most_common()},
+            "deny_by_step": {str(s): n for s, n in sorted(c["steps"].items())},
+        }
+    return out
+
+
+def print_report(results, skipped, seconds, top, out=sys.stdout):
+    calls = next(iter(results.values()))["calls"] if results else 0
+    out.write("%d tool calls replayed in %.1fs (%d unparseable lines skipped)\n"
+              % (calls, seconds, skipped))
+    for label, c in results.items():
+        pct = 100.0 * c["deny"] / c["calls"] if c["calls"] else 0.0
+        out.write("\npolicy %r: %d denied (%.1f%%)%s\n" % (
+            label, c["deny"], pct,
+            ", %d errors" % c["error"] if c["error"] else ""))
+        if c["steps"]:
+            out.write("  by step: %s\n" % ", ".join(
+                "%s=%d" % kv for kv in sorted(c["steps"].items())))
+        denied = c["tool_denies"].most_common(top)
+        if denied:
+            out.write("  %-40s %9s %9s\n" % ("tool", "denied", "calls"))
+            for tool, n in denied:
+                out.write("  %-40s %9d %9d\n" % (tool[:40], n, c["tools"][tool]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("inputs", nargs="+",
+                        help="JSONL files, directories, or - for stdin")
+    parser.add_argument("--policy", action="append", required=True,
+                        metavar="STATE_LINE",
+                        help="candidate state-file line, e.g. 'wf "
+                             "allowed-models=opus' (repeatable)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-lines", type=int, default=2000)
+    parser.add_argument("--project-dir",
+                        help="resolve every call against this project dir "
+                             "instead of its recorded cwd")
+    parser.add_argument("--top", type=int, default=15,
+                        help="tools listed per policy (default 15)")
+    parser.add_argument("--json", metavar="OUT",
+                        help="also write the report as JSON (- for stdout)")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, HOOKS_DIR)
+    import _state
+    policies = [(line, _state._parse(line)) for line in args.policy]
+
+    t0 = time.perf_counter()
+    results, skipped = replay(args.inputs, policies, args.workers,
+                              max(1, args.chunk_lines), args.project_dir)
+    seconds = time.perf_counter() - t0
+
+    if args.json:
+        report = json.dumps(to_json(results, skipped, seconds), indent=2)
+        if args.json == "-":
+            sys.stdout.write(report + "\n")
+            return 0
+        with open(args.json, "w") as f:
+            f.write(report + "\n")
+    print_report(results, skipped, seconds, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Set a project's orchestrator-mode state atomically.
+
+The same state line /orchestrator-mode:mode writes, but replaced with
+_state.write_state(): temp file + rename, so hooks running in other sessions
+never read a half-written file, plus a generation counter and crc:
+
+    python3 scripts/set-mode.py on
+    python3 scripts/set-mode.py wf allowed-models=opus,sonnet audit=on
+    python3 scripts/set-mode.py --project-dir ~/work/app off
+
+Options are parsed exactly as the hooks parse the file (_state._parse), so
+what is printed back is what the gate will enforce. The project dir defaults
+to $CLAUDE_PROJECT_DIR, else the current directory. Use this from scripts and
+terminals; inside a locked session the slash command is still the way to
+toggle (the gate denies Bash commands that name the state file).
+"""
+import argparse
+import os
+import sys
+
+PLUGIN_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PLUGIN_ROOT, "hooks"))
+import _state  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("mode", type=str.lower, choices=("on", "off", "pi", "wf"))
+    parser.add_argument("options", nargs="*", metavar="KEY=VALUE")
+    parser.add_argument("--project-dir",
+                        default=os.environ.get("CLAUDE_PROJECT_DIR") or ".")
+    args = parser.parse_args(argv)
+
+    mode, options = _state._parse(" ".join([args.mode] + args.options))
+    try:
+        generation = _state.write_state(args.project_dir, mode, options)
+    except OSError as e:
+        sys.stderr.write("set-mode: %s\n" % e)
+        return 1
+    sys.stdout.write("orchestrator-mode: %s (generation %d)\n" % (
+        " ".join([mode] + _state._format_options(options)), generation))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
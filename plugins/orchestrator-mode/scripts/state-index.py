@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""List and resolve every orchestrator-mode state file under a tree.
+
+Builds (or incrementally refreshes, from the cached copy) a
+hooks/_state_index.StateIndex of ROOT and prints every
+.orchestrator-mode.state in it with its parsed mode and options. It can also
+show which state file governs given paths:
+
+    python3 scripts/state-index.py [ROOT]                 # all state files
+    python3 scripts/state-index.py --mode on              # only these modes
+    python3 scripts/state-index.py --resolve services/api/src web/
+    python3 scripts/state-index.py --json
+
+ROOT defaults to $CLAUDE_PROJECT_DIR, else the current directory. Relative
+--resolve paths are taken from the current directory. A path outside ROOT, or
+with no state file between it and ROOT, reports "off (no state file)".
+"""
+import argparse
+import json
+import os
+import sys
+
+PLUGIN_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PLUGIN_ROOT, "hooks"))
+from _state_index import StateIndex  # noqa: E402
+
+
+def _options_text(options):
+    return " ".join("%s=%s" % (k, ",".join(v) if isinstance(v, list) else v)
+                    for k, v in options.items())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("root", nargs="?",
+                        default=os.environ.get("CLAUDE_PROJECT_DIR") or ".")
+    parser.add_argument("--mode", action="append",
+                        help="only list state files in this mode (repeatable)")
+    parser.add_argument("--resolve", nargs="+", metavar="PATH",
+                        help="print the state file governing each PATH")
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="full scan instead of refreshing the cached index")
+    args = parser.parse_args(argv)
+
+    index = StateIndex(args.root).build() if args.rebuild else \
+        StateIndex.load(args.root)
+    index.save()
+    root = index.root
+
+    if args.resolve:
+        rows = []
+        for path in args.resolve:
+            hit = index.resolve(os.path.realpath(path))
+            rows.append({"path": path, "state_dir": hit and hit[0],
+                         "mode": hit[1] if hit else "off",
+                         "options": hit[2] if hit else {}})
+        if args.json:
+            sys.stdout.write(json.dumps(rows, indent=2) + "\n")
+            return 0
+        for r in rows:
+            where = (os.path.relpath(r["state_dir"], root)
+                     if r["state_dir"] else "(no state file)")
+            sys.stdout.write("%-40s %-4s %-24s %s\n" % (
+                r["path"], r["mode"], where, _options_text(r["options"])))
+        return 0
+
+    rows = [(d, e) for d, e in index.entries()
+            if not args.mode or e["mode"] in args.mode]
+    if args.json:
+        sys.stdout.write(json.dumps(
+            [{"dir": d, "mode": e["mode"], "options": e["options"],
+              "warnings": e["warnings"]} for d, e in rows], indent=2) + "\n")
+        return 0
+    sys.stdout.write("%s: %d state file(s)\n" % (root, len(rows)))
+    for d, e in rows:
+        sys.stdout.write("  %-4s %-40s %s%s\n" % (
+            e["mode"], os.path.relpath(d, root), _options_text(e["options"]),
+            "  [warning: %s]" % e["warnings"][0].strip() if e["warnings"] else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
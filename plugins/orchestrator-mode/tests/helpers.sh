@@ -68,4 +68,5 @@ new_proj() {
     printf '%s' "$content" > "$TMP/proj/.orchestrator-mode.state"
   fi
   export CLAUDE_PROJECT_DIR="$TMP/proj"
+  export ORCHESTRATOR_CACHE_DIR="$TMP/cache"
 }
@@ -19,8 +19,28 @@ _run() {
 }
 
 _run test_state.sh
+_run test_state_write.sh
+_run test_watch.sh
+_run test_state_index.sh
 _run test_enforce.sh
+_run test_decision_table.sh
+_run test_workflow_lint.sh
+_run test_d2_scan.sh
+_run test_audit.sh
+_run test_stats.sh
+_run test_denyloop.sh
+_run test_shadow.sh
+_run test_batch.sh
+_run test_replay.sh
+_run test_paths.sh
+_run test_globset.sh
+_run test_models.sh
+_run test_payload.sh
 _run test_reminder.sh
+_run test_output.sh
+_run test_daemon.sh
+_run test_startup.sh
+_run test_bench.sh
 
 if [ "$overall_fail" -eq 0 ]; then
   echo "ALL SUITES PASSED"
@@ -0,0 +1,101 @@
+#!/usr/bin/env bash
+# Decision audit log (audit=on state option, hooks/_audit.py) and its reader
+# (scripts/audit-log.py).
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+# gate payload -> runs the hook, discarding output
+gate() {
+  printf '%s' "$1" | python3 "$PLUGIN_ROOT/hooks/enforce-orchestrator.py" >/dev/null 2>&1
+}
+
+# check name python-code: asserts over the audit records of $TMP/proj
+check() {
+  local name="$1" code="$2"
+  total=$((total+1))
+  local out
+  if out=$(python3 -c "
+import json, os
+proj = '$TMP/proj'
+path = os.path.join(proj, '.orchestrator-mode.audit')
+def records(p=path):
+    with open(p) as f:
+        return [json.loads(line) for line in f]
+$code" 2>&1); then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: $out"
+    fail=$((fail+1))
+  fi
+}
+
+new_proj "on"
+gate "{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"ls\"},\"cwd\":\"$TMP/proj\"}"
+check "no audit option -> no audit file" "
+assert not os.path.exists(path)
+"
+
+new_proj "on audit=on"
+run_case "audit=on leaves the deny output unchanged" enforce-orchestrator.py \
+  "{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"ls\"},\"cwd\":\"$TMP/proj\",\"session_id\":\"s1\"}" \
+  0 "\"permissionDecision\": \"deny\"" "__EMPTY__"
+gate "{\"tool_name\":\"Read\",\"tool_input\":{},\"cwd\":\"$TMP/proj\",\"session_id\":\"s1\"}"
+gate "{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"cat .orchestrator-mode.state\"},\"cwd\":\"$TMP/proj\",\"agent_id\":\"a1\",\"session_id\":\"s1\"}"
+gate "{\"tool_name\":\"Edit\",\"tool_input\":{\"file_path\":\"x.py\"},\"cwd\":\"$TMP/proj\",\"agent_id\":\"a1\",\"session_id\":\"s2\"}"
+check "one record per decision, with step, decision and latency" "
+rs = records()
+got = [(r['tool'], r['agent'], r['step'], r['decision']) for r in rs]
+assert got == [('Bash', None, 8, 'deny'), ('Read', None, 8, 'noop'),
+               ('Bash', 'a1', 3, 'deny'), ('Edit', 'a1', 5, 'noop')], got
+for r in rs:
+    assert r['mode'] == 'on' and isinstance(r['us'], int) and r['us'] >= 0, r
+    assert r['ts'] > 1e9 and r['session'] in ('s1', 's2'), r
+    assert list(r)[0] == 'ts', list(r)
+assert oct(os.stat(path).st_mode & 0o777) == '0o600'
+"
+
+new_proj "wf allowed-models=sonnet audit=on"
+gate "{\"tool_name\":\"Workflow\",\"tool_input\":{\"script\":\"agent('a')\"},\"cwd\":\"$TMP/proj\"}"
+gate "{\"tool_name\":\"Write\",\"tool_input\":{\"file_path\":\".remember/n.md\"},\"cwd\":\"$TMP/proj\"}"
+check "lint denies record the mode's dispatch step; ADR-004 is step 7" "
+got = [(r['tool'], r['step'], r['decision']) for r in records()]
+assert got == [('Workflow', 9, 'deny'), ('Write', 7, 'noop')], got
+"
+
+new_proj "on audit=on audit-max-bytes=400"
+for i in 1 2 3 4 5 6 7 8 9 10; do
+  gate "{\"tool_name\":\"Read\",\"tool_input\":{},\"cwd\":\"$TMP/proj\",\"session_id\":\"s$i\"}"
+done
+check "audit-max-bytes rotates to .audit.1 and bounds both segments" "
+assert os.path.exists(path + '.1')
+for p in (path, path + '.1'):
+    assert 0 < os.path.getsize(p) <= 400, (p, os.path.getsize(p))
+sessions = [r['session'] for r in records(path + '.1') + records()]
+assert sessions == ['s%d' % i for i in range(11 - len(sessions), 11)], sessions
+"
+
+total=$((total+1))
+if out=$(python3 "$PLUGIN_ROOT/scripts/audit-log.py" "$TMP/proj" -n 2 2>&1) \
+    && [ "$(wc -l <<<"$out")" -eq 2 ] && grep -q "s10" <<<"$out"; then
+  echo "PASS: audit-log.py tails the newest records"
+  pass=$((pass+1))
+else
+  echo "FAIL audit-log.py tail: $out"
+  fail=$((fail+1))
+fi
+
+total=$((total+1))
+if out=$(python3 "$PLUGIN_ROOT/scripts/audit-log.py" "$TMP/proj" --summary 2>&1) \
+    && grep -q "^by tool:" <<<"$out" && grep -q "latency: p50" <<<"$out"; then
+  echo "PASS: audit-log.py --summary"
+  pass=$((pass+1))
+else
+  echo "FAIL audit-log.py --summary: $out"
+  fail=$((fail+1))
+fi
+
+echo
+echo "test_audit.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
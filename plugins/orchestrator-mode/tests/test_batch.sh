@@ -0,0 +1,100 @@
+#!/usr/bin/env bash
+# decide() / --batch: the in-process decision API must agree with the
+# single-shot hook call for call, and never exit the interpreter.
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+ENFORCE="$PLUGIN_ROOT/hooks/enforce-orchestrator.py"
+
+check() {
+  local name="$1" code="$2"
+  total=$((total+1))
+  local out
+  if out=$(PYTHONPATH="$PLUGIN_ROOT/hooks" python3 -c "
+import importlib.util, io, json, os, subprocess, sys
+spec = importlib.util.spec_from_file_location('enforce', '$ENFORCE')
+enforce = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(enforce)
+proj = os.environ['CLAUDE_PROJECT_DIR']
+def payload(tool, agent=None, **tool_input):
+    d = {'tool_name': tool, 'tool_input': tool_input, 'cwd': proj}
+    if agent:
+        d['agent_id'] = agent
+    return d
+$code" 2>&1); then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: $out"
+    fail=$((fail+1))
+  fi
+}
+
+new_proj "wf allowed-models=sonnet"
+check "decide() returns a Decision per step, in a loop, without exiting" "
+D = enforce.Decision
+cases = [
+    (payload('Read'), D('noop', 'allowlisted tool Read -> silent no-op (mode=wf)', 9)),
+    (payload('Bash', command='cat .orchestrator-mode.state'), 'deny', 3),
+    (payload('Edit', agent='a1', file_path='x.py'), 'noop', 5),
+    (payload('Write', file_path='.orchestrator-mode.state'), 'noop', 6),
+    (payload('Write', file_path='.remember/n.md'), 'noop', 7),
+    (payload('Task', subagent_type='Explore', model='opus'), 'deny', 9),
+    (payload('Bash', command='ls'), 'deny', 9),
+]
+for _ in range(500):
+    for data, *want in cases:
+        got = enforce.decide(data)
+        assert isinstance(got, D), got
+        if len(want) == 1:
+            assert got == want[0], got
+        else:
+            assert (got.decision, got.step) == tuple(want), (data, got)
+assert enforce.decide(payload('Read'), ('off', {})) == D('noop', 'mode OFF -> silent no-op', 2)
+"
+
+check "--batch agrees with the single-shot hook, line for line" "
+payloads = [payload(t, agent, **ti)
+            for t in ('Read', 'Bash', 'Write', 'Task', 'Workflow', 'mcp__x__y',
+                      'mcp__pi-delegate__pi_task', 'FutureTool')
+            for agent in (None, 'a1')
+            for ti in ({}, {'command': 'ls .orchestrator-mode.state'},
+                       {'file_path': '.orchestrator-mode.state'},
+                       {'subagent_type': 'Explore', 'model': 'claude-sonnet-5'},
+                       {'script': 'agent(\"x\", {model: \"opus\"})'})]
+lines = [json.dumps(p) for p in payloads] + ['not json', '[]']
+out = subprocess.run([sys.executable, '$ENFORCE', '--batch'],
+                     input='\n'.join(lines) + '\n', capture_output=True,
+                     text=True, check=True).stdout.splitlines()
+assert len(out) == len(lines), (len(out), len(lines))
+decisions = [json.loads(o) for o in out]
+for line, d in zip(lines[:-2], decisions):
+    hook = subprocess.run([sys.executable, '$ENFORCE'], input=line,
+                          capture_output=True, text=True)
+    if d['decision'] == 'deny':
+        assert hook.stdout == enforce.deny_output(d['reason']) + '\n', (line, d, hook.stdout)
+    else:
+        assert d['decision'] == 'noop' and hook.stdout == '', (line, d, hook.stdout)
+assert decisions[-2] == {'decision': 'noop', 'step': 1,
+                         'reason': 'could not parse stdin -> fail-open (silent)'}
+assert decisions[-1]['decision'] == 'error', decisions[-1]
+"
+
+check "main() still exits 0 and prints the deny envelope" "
+sys.stdin = io.StringIO(json.dumps(payload('Bash', command='ls')))
+buf = io.StringIO()
+sys.stdout, real = buf, sys.stdout
+try:
+    enforce.main()
+except SystemExit as e:
+    code = e.code
+finally:
+    sys.stdout = real
+assert code == 0, code
+assert json.loads(buf.getvalue())['hookSpecificOutput']['permissionDecision'] == 'deny'
+"
+
+echo
+echo "test_batch.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
@@ -0,0 +1,90 @@
+#!/usr/bin/env bash
+# Smoke test for scripts/bench-hooks.py: a --quick run over the synthetic and
+# recorded corpora must complete, cover every mode / thread / hook, and write
+# a well-formed --json report that --compare accepts. Timings themselves are
+# not asserted (machine-dependent).
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+TMP="$(mktemp -d)"
+trap 'rm -rf "$TMP"' EXIT
+
+check() {
+  local name="$1" code="$2"
+  total=$((total+1))
+  local out
+  if out=$(python3 -c "$code" "$TMP/report.json" 2>&1); then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: $out"
+    fail=$((fail+1))
+  fi
+}
+
+total=$((total+1))
+if out=$(python3 "$PLUGIN_ROOT/scripts/bench-hooks.py" --quick \
+    --json "$TMP/report.json" 2>&1); then
+  echo "PASS: bench --quick runs"
+  pass=$((pass+1))
+else
+  echo "FAIL bench --quick: $out"
+  fail=$((fail+1))
+fi
+
+check "report has both measurement kinds and metadata" '
+import json, sys
+r = json.load(open(sys.argv[1]))
+for key in ("commit", "python", "iterations", "in_process", "spawned"):
+    assert key in r, key
+assert set(r["in_process"]) == set(r["spawned"]), "kinds cover different scenarios"
+'
+
+check "every scenario reports p50/p99/calls-per-sec/peak-rss" '
+import json, sys
+r = json.load(open(sys.argv[1]))
+for kind in ("in_process", "spawned"):
+    for name, m in r[kind].items():
+        for key in ("calls", "p50_us", "p99_us", "calls_per_sec", "peak_rss_kb"):
+            assert key in m, (kind, name, key)
+        assert m["calls"] > 0 and m["p50_us"] > 0, (kind, name, m)
+        assert m["p99_us"] >= m["p50_us"], (kind, name, m)
+'
+
+check "in-process peak RSS is per scenario, not a running high-water mark" '
+import json, sys
+r = json.load(open(sys.argv[1]))["in_process"]
+# deep-cwd scenarios run after the 1 MB payloads; a lifetime ru_maxrss would
+# report the 1 MB peak for them too.
+big = r["pre/on/main/Write-1MB"]["peak_rss_kb"]
+small = r["pre/deep-cwd/on"]["peak_rss_kb"]
+assert small < big, (small, big)
+'
+
+check "corpora cover every mode, subagent vs main, Workflow, deep cwd, recorded" '
+import json, sys
+names = set(json.load(open(sys.argv[1]))["in_process"])
+for mode in ("off", "on", "pi", "wf", "wf+models"):
+    for thread in ("main", "subagent"):
+        assert any(n.startswith("pre/%s/%s/" % (mode, thread)) for n in names), (mode, thread)
+    assert "prompt/%s" % mode in names, mode
+assert "pre/wf+models/main/Workflow-5000-calls" in names
+assert any("/deep-cwd/" in n for n in names)
+assert any(n.startswith("recorded/recorded-session/") for n in names)
+'
+
+total=$((total+1))
+if out=$(python3 "$PLUGIN_ROOT/scripts/bench-hooks.py" --quick --no-spawn \
+    --filter "prompt/on" --compare "$TMP/report.json" --threshold 100000 2>&1) \
+    && grep -qF "base p50" <<<"$out"; then
+  echo "PASS: --compare prints deltas against a saved report"
+  pass=$((pass+1))
+else
+  echo "FAIL --compare: $out"
+  fail=$((fail+1))
+fi
+
+echo
+echo "test_bench.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
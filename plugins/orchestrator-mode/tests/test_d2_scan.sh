@@ -0,0 +1,93 @@
+#!/usr/bin/env bash
+# D2 state-file scan for mcp__* tool inputs: the in-place walker must decide
+# exactly like the json.dumps substring check it replaced, without
+# serializing the payload, and honor the scan-max-depth / scan-max-chars
+# state options (fail open past a cap, with floors so a cap never disables it).
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+check() {
+  local name="$1" code="$2"
+  total=$((total+1))
+  local out
+  if out=$(PYTHONPATH="$PLUGIN_ROOT/hooks" python3 -c "
+import importlib.util, json
+spec = importlib.util.spec_from_file_location('enforce', '$PLUGIN_ROOT/hooks/enforce-orchestrator.py')
+enforce = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(enforce)
+scan = enforce._tool_input_mentions_state_file
+TOKEN = enforce.STATE_FILE_TOKEN
+$code" 2>&1); then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: $out"
+    fail=$((fail+1))
+  fi
+}
+
+check "same decision as json.dumps substring search (randomized)" "
+import random
+pieces = [TOKEN, TOKEN[:9], TOKEN[9:], '\"', '\\\\', 'é', '\n', '\x00', ':', ', ', '{']
+def gen(depth):
+    r = random.random()
+    if depth > 4 or r < 0.4:
+        return ''.join(random.choice(pieces) for _ in range(random.randint(0, 3)))
+    if r < 0.55:
+        return random.choice([1, 2.5, None, True, False])
+    if r < 0.8:
+        return [gen(depth + 1) for _ in range(random.randint(0, 3))]
+    return {gen(9): gen(depth + 1) for _ in range(random.randint(0, 3))}
+random.seed(7)
+hits = 0
+for _ in range(20000):
+    value = json.loads(json.dumps(gen(0)))
+    want = TOKEN in json.dumps(value, default=str)
+    assert scan(value) == want, value
+    hits += want
+assert 1000 < hits < 19000, hits
+"
+
+check "keys are scanned, and nothing is serialized" "
+def boom(*a, **k):
+    raise AssertionError('serialized')
+json.dumps = enforce.json.dumps = boom
+assert scan({'x': [{'/p/' + TOKEN: 1}]})
+assert not scan({'x': ['a' * 1000000, {'b': 2}]})
+"
+
+check "scan-max-depth / scan-max-chars caps fail open" "
+deep = {'a': {'b': {'c': TOKEN}}}
+assert not scan(deep, max_depth=2) and scan(deep, max_depth=3)
+wide = {'a': 'x' * 100 + TOKEN}
+assert not scan(wide, max_chars=100) and scan(wide, max_chars=200)
+# a cap on one subtree doesn't hide a shallower mention elsewhere
+assert scan({'deep': [[[['x']]]], 'p': TOKEN}, max_depth=1)
+assert enforce._scan_limits({'scan-max-depth': '8', 'scan-max-chars': 'lots'}) == (8, None)
+"
+
+check "caps below the minimum are raised to it" "
+limits = enforce._scan_limits({'scan-max-depth': '0', 'scan-max-chars': '1'})
+assert limits == (enforce.MIN_SCAN_DEPTH, enforce.MIN_SCAN_CHARS), limits
+assert enforce._scan_limits({'scan-max-depth': '-1'}) == (None, None)
+assert scan({'args': {'path': '/x/' + TOKEN}}, *limits)
+"
+
+BIG="{\"tool_name\":\"mcp__files__write\",\"agent_id\":\"sub-1\",\"tool_input\":{\"path\":\"/srv/x\",\"nested\":{\"deeper\":{\"p\":\"/x/.orchestrator-mode.state\"}}},\"cwd\":\"\$TMP/proj\"}"
+new_proj "on"
+run_case "subagent mcp nested mention denied (no caps)" enforce-orchestrator.py \
+  "${BIG//\$TMP/$TMP}" 0 "state-file changes go through" ""
+
+new_proj "on scan-max-depth=2"
+run_case "subagent mcp mention past scan-max-depth fails open" enforce-orchestrator.py \
+  "${BIG//\$TMP/$TMP}" 0 "__EMPTY__" ""
+
+SHALLOW="{\"tool_name\":\"mcp__files__write\",\"agent_id\":\"sub-1\",\"tool_input\":{\"args\":{\"path\":\"/x/.orchestrator-mode.state\"}},\"cwd\":\"\$TMP/proj\"}"
+new_proj "on scan-max-depth=0 scan-max-chars=1"
+run_case "subagent mcp mention still denied under the minimum caps" enforce-orchestrator.py \
+  "${SHALLOW//\$TMP/$TMP}" 0 "state-file changes go through" ""
+
+echo
+echo "test_d2_scan.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
@@ -0,0 +1,114 @@
+#!/usr/bin/env bash
+# gate-client.py + gate-daemon.py: the client must produce the same output as
+# enforce-orchestrator.py both with the daemon running and without it
+# (in-process fallback). The daemon is confined to a mktemp socket path.
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+SOCK_DIR="$(mktemp -d)"
+export ORCHESTRATOR_GATE_SOCKET="$SOCK_DIR/gate.sock"
+cleanup() {
+  python3 "$PLUGIN_ROOT/hooks/gate-daemon.py" stop >/dev/null 2>&1
+  rm -rf "$SOCK_DIR"
+}
+trap cleanup EXIT
+
+# same_as_direct name payload: the client's stdout+stderr must equal a direct
+# enforce-orchestrator.py run on the same payload.
+same_as_direct() {
+  local name="$1" payload="$2" want got
+  total=$((total+1))
+  want=$(printf '%s' "$payload" | python3 "$PLUGIN_ROOT/hooks/enforce-orchestrator.py" 2>&1; echo "rc=$?")
+  got=$(printf '%s' "$payload" | python3 "$PLUGIN_ROOT/hooks/gate-client.py" 2>&1; echo "rc=$?")
+  if [ "$want" = "$got" ]; then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: direct=[$want] client=[$got]"
+    fail=$((fail+1))
+  fi
+}
+
+run_matrix() {
+  local label="$1"
+  new_proj "on"
+  run_case "$label/on Edit denied" gate-client.py \
+    "{\"tool_name\":\"Edit\",\"tool_input\":{\"file_path\":\"foo.py\"},\"cwd\":\"$TMP/proj\"}" \
+    0 "read-only" ""
+  same_as_direct "$label/on Read same as direct" \
+    "{\"tool_name\":\"Read\",\"tool_input\":{\"file_path\":\"x\"},\"cwd\":\"$TMP/proj\"}"
+  same_as_direct "$label/on Bash same as direct" \
+    "{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"ls\"},\"cwd\":\"$TMP/proj\"}"
+  same_as_direct "$label/subagent bypass same as direct" \
+    "{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"ls\"},\"agent_id\":\"s\",\"cwd\":\"$TMP/proj\"}"
+  same_as_direct "$label/garbage stdin same as direct" "not json"
+  new_proj "wf allowed-models=sonnet"
+  same_as_direct "$label/wf Workflow lint same as direct" \
+    "{\"tool_name\":\"Workflow\",\"tool_input\":{\"script\":\"agent('a')\"},\"cwd\":\"$TMP/proj\"}"
+  # toggles between calls are seen immediately (the daemon watches the state)
+  new_proj "on"
+  local bash_ls="{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"ls\"},\"cwd\":\"$TMP/proj\"}"
+  run_case "$label/toggle: on denies" gate-client.py "$bash_ls" 0 "read-only" ""
+  printf 'off' > "$TMP/proj/.orchestrator-mode.state"
+  run_case "$label/toggle: off is seen by the next call" gate-client.py "$bash_ls" 0 "__EMPTY__" "__EMPTY__"
+  printf 'pi allowed-models=opus' > "$TMP/proj/.orchestrator-mode.state.tmp"
+  mv "$TMP/proj/.orchestrator-mode.state.tmp" "$TMP/proj/.orchestrator-mode.state"
+  run_case "$label/toggle: atomic rename to pi is seen" gate-client.py "$bash_ls" 0 "set to PI" ""
+  rm "$TMP/proj/.orchestrator-mode.state"
+  run_case "$label/toggle: removed state file is OFF" gate-client.py "$bash_ls" 0 "__EMPTY__" "__EMPTY__"
+  new_proj "banana"
+  run_case "$label/garbage token warning forwarded" gate-client.py \
+    "{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"ls\"},\"cwd\":\"$TMP/proj\"}" \
+    0 "__EMPTY__" "unrecognized state-file mode token"
+  # CLAUDE_PROJECT_DIR unset: the daemon must use the caller's env, not its own.
+  new_proj "pi"
+  mkdir -p "$TMP/proj/nested"
+  unset CLAUDE_PROJECT_DIR
+  run_case "$label/walk-up uses caller env" gate-client.py \
+    "{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"ls\"},\"cwd\":\"$TMP/proj/nested\"}" \
+    0 "set to PI" ""
+}
+
+# 1. no daemon -> in-process fallback
+run_matrix "fallback"
+
+# 2. stale socket file with nobody listening -> still falls back
+python3 -c "import socket,sys; s=socket.socket(socket.AF_UNIX); s.bind(sys.argv[1])" "$ORCHESTRATOR_GATE_SOCKET"
+run_matrix "stale-socket"
+rm -f "$ORCHESTRATOR_GATE_SOCKET"
+
+# 3. daemon running
+total=$((total+1))
+if python3 "$PLUGIN_ROOT/hooks/gate-daemon.py" start >/dev/null && [ -S "$ORCHESTRATOR_GATE_SOCKET" ]; then
+  echo "PASS: daemon start"
+  pass=$((pass+1))
+else
+  echo "FAIL: daemon start"
+  fail=$((fail+1))
+fi
+run_matrix "daemon"
+
+# still up after serving the whole matrix (no request crashed it)
+total=$((total+1))
+if python3 "$PLUGIN_ROOT/hooks/gate-daemon.py" status >/dev/null; then
+  echo "PASS: daemon still running after matrix"
+  pass=$((pass+1))
+else
+  echo "FAIL: daemon died while serving"
+  fail=$((fail+1))
+fi
+
+python3 "$PLUGIN_ROOT/hooks/gate-daemon.py" stop >/dev/null
+total=$((total+1))
+if [ ! -e "$ORCHESTRATOR_GATE_SOCKET" ]; then
+  echo "PASS: daemon stop removes socket"
+  pass=$((pass+1))
+else
+  echo "FAIL: daemon stop left socket behind"
+  fail=$((fail+1))
+fi
+
+echo
+echo "test_daemon.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
@@ -0,0 +1,146 @@
+#!/usr/bin/env bash
+# Equivalence: the precompiled DECISION_TABLE in enforce-orchestrator.py must
+# decide exactly like the per-mode handlers it replaced (frozen in
+# tests/fixtures/enforce_orchestrator_legacy.py), over an exhaustive matrix of
+# state lines x tools x tool_input shapes x agent_id presence. Both gates run
+# in-process against the same mktemp project; stdout, stderr and exit code
+# must match byte for byte -- except the wording of Workflow model-lint deny
+# reasons, which gained per-call line numbers with the tokenizer lint (the
+# decision itself must still match; see test_workflow_lint.sh for the text).
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+PLUGIN_ROOT="$(cd "$DIR/.." && pwd)"
+
+PYTHONPATH="$PLUGIN_ROOT/hooks" python3 - "$PLUGIN_ROOT" <<'EOF'
+import importlib.util
+import io
+import json
+import os
+import sys
+import tempfile
+
+root = sys.argv[1]
+
+
+def load(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+current = load("enforce_current", os.path.join(root, "hooks", "enforce-orchestrator.py"))
+legacy = load("enforce_legacy", os.path.join(
+    root, "tests", "fixtures", "enforce_orchestrator_legacy.py"))
+
+
+def run(module, payload):
+    out, err = io.StringIO(), io.StringIO()
+    saved = sys.stdin, sys.stdout, sys.stderr
+    sys.stdin, sys.stdout, sys.stderr = io.StringIO(payload), out, err
+    rc = None
+    try:
+        module.main()
+    except SystemExit as e:
+        rc = e.code
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = saved
+    return rc, out.getvalue(), err.getvalue()
+
+
+proj = os.path.realpath(tempfile.mkdtemp())
+os.environ["CLAUDE_PROJECT_DIR"] = proj
+os.environ["ORCHESTRATOR_CACHE_DIR"] = os.path.join(proj, ".cache")
+os.environ.pop("ORCHESTRATOR_DEBUG", None)
+state_path = os.path.join(proj, ".orchestrator-mode.state")
+
+STATES = [
+    None, "off", "on", "pi", "wf", "banana",
+    "on allowed-models=sonnet", "pi allowed-models=sonnet",
+    "wf allowed-models=sonnet,haiku", "wf allowed-models=opus, haiku",
+]
+TOOLS = sorted(
+    legacy.MAIN_ALLOWLIST | legacy.PI_MODE_ALLOWLIST | legacy.WF_MODE_ALLOWLIST
+    | {"Write", "Edit", "MultiEdit", "NotebookEdit", "Bash",
+       "EnterWorktree", "ExitWorktree", "RemoteTrigger", "FutureTool", "",
+       "mcp__foo__bar", "mcp__pi-delegate__pi_task",
+       "mcp__plugin_pi-delegate_pi-delegate__pi_task",
+       "mcp__pi-delegate", "mcp_pi-delegate__x", "mcp__plugin_docs_docs__get"})
+INPUTS = [
+    {},
+    {"file_path": "src/app.py"},
+    {"file_path": state_path},
+    {"file_path": ".orchestrator-mode.state"},
+    {"notebook_path": state_path},
+    {"file_path": ".remember/notes.md"},
+    {"notebook_path": ".remember/n.ipynb"},
+    {"command": "ls"},
+    {"command": "echo off > .orchestrator-mode.state"},
+    {"path": "/x/.orchestrator-mode.state"},
+    {"nested": {"deep": [".orchestrator-mode.state"]}},
+    {"subagent_type": "Explore"},
+    {"subagent_type": "Explore", "model": "claude-sonnet-5"},
+    {"subagent_type": "Explore", "model": "opus"},
+    {"subagent_type": "general-purpose", "model": "sonnet"},
+    {"subagent_type": ""},
+    {"script": "agent('a', model: \"sonnet\")"},
+    {"script": "agent('a'); agent('b')"},
+    {"script": "agent('a', model: \"gpt-4\")"},
+    {"scriptPath": "missing.js"},
+]
+AGENTS = [None, "sub-1"]
+
+def lint_decision(result):
+    """Workflow lint denies compare on decision only (reason now has lines)."""
+    rc, out, err = result
+    if '"permissionDecision": "deny"' in out and "workflow script" in out.lower():
+        out = "<workflow lint deny>"
+    return rc, out, err
+
+
+checked = 0
+mismatches = []
+for state in STATES:
+    if state is None:
+        if os.path.exists(state_path):
+            os.unlink(state_path)
+    else:
+        with open(state_path, "w") as f:
+            f.write(state)
+    for tool in TOOLS:
+        for tool_input in INPUTS:
+            for agent_id in AGENTS:
+                data = {"tool_name": tool, "tool_input": tool_input, "cwd": proj}
+                if agent_id:
+                    data["agent_id"] = agent_id
+                payload = json.dumps(data)
+                want = run(legacy, payload)
+                got = run(current, payload)
+                if tool == "Workflow":
+                    want, got = lint_decision(want), lint_decision(got)
+                checked += 1
+                if want != got:
+                    mismatches.append((state, payload, want, got))
+
+for extra in ("not json", "{}", '{"tool_name": "Bash"}', '{"tool_input": {}}'):
+    with open(state_path, "w") as f:
+        f.write("on")
+    checked += 1
+    if run(legacy, extra) != run(current, extra):
+        mismatches.append(("on", extra, run(legacy, extra), run(current, extra)))
+
+for state, payload, want, got in mismatches[:10]:
+    print("MISMATCH state=%r payload=%s\n  legacy=%r\n  table =%r" % (state, payload, want, got))
+if mismatches:
+    print("FAIL: %d/%d decisions differ" % (len(mismatches), checked))
+    sys.exit(1)
+print("PASS: decision table == legacy handlers over %d cases" % checked)
+EOF
+rc=$?
+echo
+if [ "$rc" -eq 0 ]; then
+  echo "test_decision_table.sh: 1/1 passed"
+else
+  echo "test_decision_table.sh: 0/1 passed"
+fi
+[ "$rc" -eq 0 ]
@@ -0,0 +1,103 @@
+#!/usr/bin/env bash
+# Deny loops (hooks/_denyloop.py, deny-escalate=N): identical mode denies
+# repeated in one session escalate to a short reason after N; other sessions,
+# tools and deny kinds keep the full reason.
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+ENFORCE="$PLUGIN_ROOT/hooks/enforce-orchestrator.py"
+
+# payload tool session [command] -> a main-thread call payload
+payload() {
+  printf '{"tool_name":"%s","tool_input":{"command":"%s"},"cwd":"%s","session_id":"%s"}' \
+    "$1" "${3:-make}" "$TMP/proj" "$2"
+}
+
+new_proj "on deny-escalate=2"
+run_case "deny-escalate/1st deny keeps the full reason" enforce-orchestrator.py \
+  "$(payload Bash s1)" 0 "Delegate this work to a subagent" ""
+run_case "deny-escalate/2nd deny keeps the full reason" enforce-orchestrator.py \
+  "$(payload Bash s1)" 0 "Delegate this work to a subagent" ""
+run_case "deny-escalate/3rd identical deny escalates" enforce-orchestrator.py \
+  "$(payload Bash s1)" 0 "STOP retrying 'Bash': denied 3 times this session" ""
+run_case "deny-escalate/same command respaced escalates, guidance kept" enforce-orchestrator.py \
+  "$(payload Bash s1 ' make ')" 0 "via the Agent/Task tool now. If you are a delegated agent" ""
+run_case "deny-escalate/another command is another loop" enforce-orchestrator.py \
+  "$(payload Bash s1 'make test')" 0 "Delegate this work to a subagent" ""
+run_case "deny-escalate/other session counts separately" enforce-orchestrator.py \
+  "$(payload Bash s2)" 0 "Delegate this work to a subagent" ""
+run_case "deny-escalate/other tool counts separately" enforce-orchestrator.py \
+  "$(payload Write s1)" 0 "Delegate this work to a subagent" ""
+for i in 1 2 3; do
+  printf '{"tool_name":"Bash","tool_input":{"command":"ls"},"cwd":"%s"}' \
+    "$TMP/proj" | python3 "$ENFORCE" >/dev/null
+done
+run_case "deny-escalate/no session_id never escalates" enforce-orchestrator.py \
+  "{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"ls\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "Delegate this work to a subagent" ""
+
+new_proj "pi deny-escalate=1"
+run_case "deny-escalate/pi first deny is full" enforce-orchestrator.py \
+  "$(payload Edit s1)" 0 "pi-delegate MCP tools" ""
+run_case "deny-escalate/pi second deny escalates with the pi next step" enforce-orchestrator.py \
+  "$(payload Edit s1)" 0 "Send it to mcp__pi-delegate__pi_task" ""
+
+new_proj "on deny-escalate=1"
+bad_path="{\"tool_name\":\"Edit\",\"tool_input\":{\"file_path\":5},\"cwd\":\"$TMP/proj\",\"session_id\":\"s1\"}"
+run_case "deny-escalate/non-string file_path still denies" enforce-orchestrator.py \
+  "$bad_path" 0 "Delegate this work to a subagent" ""
+run_case "deny-escalate/non-string file_path escalates on repeat" enforce-orchestrator.py \
+  "$bad_path" 0 "STOP retrying 'Edit': denied 2 times this session" ""
+
+new_proj "on allowed-models=sonnet deny-escalate=1"
+model_payload="{\"tool_name\":\"Task\",\"tool_input\":{\"subagent_type\":\"x\",\"model\":\"opus\"},\"cwd\":\"$TMP/proj\",\"session_id\":\"s1\"}"
+printf '%s' "$model_payload" | python3 "$ENFORCE" >/dev/null
+run_case "deny-escalate/allowlist denies keep their fix-it reason" enforce-orchestrator.py \
+  "$model_payload" 0 "not in this project's model allowlist (sonnet)" ""
+
+new_proj "on"
+for i in 1 2 3 4; do
+  printf '%s' "$(payload Bash s1)" | python3 "$ENFORCE" >/dev/null
+done
+run_case "deny-escalate/off by default" enforce-orchestrator.py \
+  "$(payload Bash s1)" 0 "Delegate this work to a subagent" ""
+
+check() {
+  local name="$1" code="$2"
+  total=$((total+1))
+  local out
+  if out=$(PYTHONPATH="$PLUGIN_ROOT/hooks" python3 -c "
+import os
+import _denyloop
+path = os.path.join(os.environ['ORCHESTRATOR_CACHE_DIR'], 'loop-test.bin')
+$code" 2>&1); then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: $out"
+    fail=$((fail+1))
+  fi
+}
+
+check "counts restart after the idle window; the file stays fixed-size" "
+k = _denyloop.key('s', 'Bash', 'make', 'on', 'r')
+assert [_denyloop.bump(path, k, now=1000 + i) for i in range(3)] == [1, 2, 3]
+assert _denyloop.bump(path, k, now=1002 + _denyloop.WINDOW_S + 1) == 1
+assert os.path.getsize(path) == _denyloop.FILE_SIZE
+"
+
+check "a full probe window evicts the least recently used key" "
+_denyloop.SLOTS = _denyloop.PROBE  # every key shares one window
+keys = [_denyloop.key('s', 'T%d' % i, '', 'on', 'r') for i in range(_denyloop.PROBE + 1)]
+for i, k in enumerate(keys[:-1]):
+    assert _denyloop.bump(path, k, now=5000 + i) == 1
+assert _denyloop.bump(path, keys[1], now=5100) == 2
+assert _denyloop.bump(path, keys[-1], now=5101) == 1   # evicts keys[0]
+assert _denyloop.bump(path, keys[1], now=5102) == 3
+assert _denyloop.bump(path, keys[0], now=5103) == 1
+"
+
+echo
+echo "test_denyloop.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
@@ -214,6 +214,90 @@ run_case "pi/mcp other denied" enforce-orchestrator.py \
   "{\"tool_name\":\"mcp__foo__bar\",\"tool_input\":{},\"cwd\":\"$TMP/proj\"}" \
   0 "deny" ""
 
+# allow-mcp: per-project MCP globs open matching tools in every mode; the
+# rest stay denied, patterns are case-sensitive, and D2 still runs first.
+new_proj "on allow-mcp=mcp__docs__*,mcp__search__query"
+run_case "allow-mcp/on prefix match allowed" enforce-orchestrator.py \
+  "{\"tool_name\":\"mcp__docs__get_page\",\"tool_input\":{},\"cwd\":\"$TMP/proj\"}" \
+  0 "__EMPTY__" ""
+run_case "allow-mcp/on exact match allowed" enforce-orchestrator.py \
+  "{\"tool_name\":\"mcp__search__query\",\"tool_input\":{},\"cwd\":\"$TMP/proj\"}" \
+  0 "__EMPTY__" ""
+run_case "allow-mcp/on non-matching denied" enforce-orchestrator.py \
+  "{\"tool_name\":\"mcp__search__index\",\"tool_input\":{},\"cwd\":\"$TMP/proj\"}" \
+  0 "deny" ""
+run_case "allow-mcp/on D2 state-file scan still denies" enforce-orchestrator.py \
+  "{\"tool_name\":\"mcp__docs__write\",\"tool_input\":{\"path\":\"/x/.orchestrator-mode.state\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "state-file changes go through" ""
+run_case "allow-mcp/on never opens non-MCP tools" enforce-orchestrator.py \
+  "{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"ls\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "deny" ""
+new_proj "wf allow-mcp=mcp__Docs__*"
+run_case "allow-mcp/wf patterns are case-sensitive" enforce-orchestrator.py \
+  "{\"tool_name\":\"mcp__docs__get_page\",\"tool_input\":{},\"cwd\":\"$TMP/proj\"}" \
+  0 "deny" ""
+run_case "allow-mcp/wf matching case allowed" enforce-orchestrator.py \
+  "{\"tool_name\":\"mcp__Docs__get_page\",\"tool_input\":{},\"cwd\":\"$TMP/proj\"}" \
+  0 "__EMPTY__" ""
+new_proj "pi allow-mcp=mcp__*_lint__check?"
+run_case "allow-mcp/pi interior wildcard allowed" enforce-orchestrator.py \
+  "{\"tool_name\":\"mcp__ts_lint__check1\",\"tool_input\":{},\"cwd\":\"$TMP/proj\"}" \
+  0 "__EMPTY__" ""
+run_case "allow-mcp/pi interior wildcard mismatch denied" enforce-orchestrator.py \
+  "{\"tool_name\":\"mcp__ts_lint__check12\",\"tool_input\":{},\"cwd\":\"$TMP/proj\"}" \
+  0 "deny" ""
+
+# model-aliases: a model named exactly like an alias is matched as its target,
+# for Task calls and Workflow scripts; a model merely containing one is not.
+new_proj "wf allowed-models=haiku model-aliases=fast=haiku,big=opus"
+run_case "model-aliases/wf Explore alias of an allowed model allowed" enforce-orchestrator.py \
+  "{\"tool_name\":\"Task\",\"tool_input\":{\"subagent_type\":\"Explore\",\"model\":\"Fast\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "__EMPTY__" ""
+run_case "model-aliases/wf Explore alias of an off-list model denied" enforce-orchestrator.py \
+  "{\"tool_name\":\"Task\",\"tool_input\":{\"subagent_type\":\"Explore\",\"model\":\"big\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "'big' is not in" ""
+run_case "model-aliases/wf Workflow script using an alias allowed" enforce-orchestrator.py \
+  "{\"tool_name\":\"Workflow\",\"tool_input\":{\"script\":\"agent('a', {model: 'fast'})\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "__EMPTY__" ""
+run_case "model-aliases/wf alias inside a longer id is not resolved" enforce-orchestrator.py \
+  "{\"tool_name\":\"Workflow\",\"tool_input\":{\"script\":\"agent('a', {model: 'fast-2'})\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "'fast-2' (line 1)" ""
+new_proj "wf allowed-models=haiku"
+run_case "model-aliases/wf same script without the aliases denied" enforce-orchestrator.py \
+  "{\"tool_name\":\"Workflow\",\"tool_input\":{\"script\":\"agent('a', {model: 'fast'})\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "'fast' (line 1)" ""
+
+# safe-dirs: extra main-thread-writable dirs (ADR-004); component-wise match
+# on resolved paths, so prefixes and symlinks out of a safe dir don't count.
+new_proj "on safe-dirs=.scratch,build/Artifacts"
+mkdir -p "$TMP/proj/.scratch" "$TMP/proj/src"
+ln -s "$TMP/proj/src" "$TMP/proj/.scratch/src-link"
+run_case "safe-dirs/on Write under a safe dir allowed" enforce-orchestrator.py \
+  "{\"tool_name\":\"Write\",\"tool_input\":{\"file_path\":\".scratch/notes.md\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "__EMPTY__" ""
+run_case "safe-dirs/on Edit deep under a not-yet-existing safe dir allowed" enforce-orchestrator.py \
+  "{\"tool_name\":\"Edit\",\"tool_input\":{\"file_path\":\"$TMP/proj/build/Artifacts/x/y.json\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "__EMPTY__" ""
+run_case "safe-dirs/on entries keep their case" enforce-orchestrator.py \
+  "{\"tool_name\":\"Write\",\"tool_input\":{\"file_path\":\"build/artifacts/y.json\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "deny" ""
+run_case "safe-dirs/on a sibling sharing the name prefix denied" enforce-orchestrator.py \
+  "{\"tool_name\":\"Write\",\"tool_input\":{\"file_path\":\".scratchpad/a.md\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "deny" ""
+run_case "safe-dirs/on a symlink out of a safe dir denied" enforce-orchestrator.py \
+  "{\"tool_name\":\"Write\",\"tool_input\":{\"file_path\":\".scratch/src-link/app.py\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "deny" ""
+run_case "safe-dirs/on built-in .remember still allowed" enforce-orchestrator.py \
+  "{\"tool_name\":\"Write\",\"tool_input\":{\"file_path\":\".remember/n.md\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "__EMPTY__" ""
+new_proj "on safe-dirs=."
+run_case "safe-dirs/on the state file is never a safe-dir target" enforce-orchestrator.py \
+  "{\"tool_name\":\"Edit\",\"tool_input\":{\"file_path\":\"$TMP/proj/.orchestrator-mode.state\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "deny" ""
+run_case "safe-dirs/on Bash is never opened" enforce-orchestrator.py \
+  "{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"touch .scratch/x\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "deny" ""
+
 echo
 echo "test_enforce.sh: $pass/$total passed"
 [ "$fail" -eq 0 ]
@@ -0,0 +1,54 @@
+#!/usr/bin/env bash
+# hooks/_globset.py: GlobSet.match must agree with a linear fnmatchcase loop
+# for every mix of exact, prefix, and general patterns.
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+check() {
+  local name="$1" code="$2"
+  total=$((total+1))
+  local out
+  if out=$(PYTHONPATH="$PLUGIN_ROOT/hooks" python3 -c "
+import fnmatch, random
+import _globset
+def linear(name, patterns):
+    return any(fnmatch.fnmatchcase(name, p) for p in patterns)
+$code" 2>&1); then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: $out"
+    fail=$((fail+1))
+  fi
+}
+
+new_proj "" ""
+check "same answers as fnmatchcase (randomized)" "
+rng = random.Random(20)
+alphabet = 'ab_m*?[]!'
+def word(n):
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, n)))
+for trial in range(300):
+    patterns = [word(6) for _ in range(rng.randint(0, 8))]
+    patterns += ['mcp__' + word(4) + '*' for _ in range(rng.randint(0, 4))]
+    globs = _globset.GlobSet(patterns)
+    for _ in range(40):
+        name = rng.choice(['', 'mcp__']) + ''.join(
+            rng.choice('ab_m*?[]') for _ in range(rng.randint(0, 8)))
+        assert globs.match(name) == linear(name, patterns), (name, patterns)
+"
+
+check "prefix patterns never reach the regex; compiled() is shared" "
+patterns = ['mcp__srv%d__*' % i for i in range(500)] + ['mcp__x__exact']
+globs = _globset.compiled(patterns)
+assert globs._regex is None and len(globs) == 501
+assert _globset.compiled(list(patterns)) is globs
+assert globs.match('mcp__srv499__tool') and globs.match('mcp__srv7__')
+assert globs.match('mcp__x__exact') and not globs.match('mcp__x__exactly')
+assert not globs.match('mcp__srv500__tool') and not globs.match('mcp__srv')
+"
+
+echo
+echo "test_globset.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
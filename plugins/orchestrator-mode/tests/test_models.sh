@@ -0,0 +1,56 @@
+#!/usr/bin/env bash
+# hooks/_models.py: ModelMatcher.allowed must agree with the linear
+# any(entry in model) family match for every allowlist, and resolve
+# model-aliases only on an exact (case-insensitive) name.
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+check() {
+  local name="$1" code="$2"
+  total=$((total+1))
+  local out
+  if out=$(PYTHONPATH="$PLUGIN_ROOT/hooks" python3 -c "
+import random
+import _models, _state
+def linear(model, entries):
+    m = str(model).strip().lower()
+    return any(entry in m for entry in entries)
+$code" 2>&1); then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: $out"
+    fail=$((fail+1))
+  fi
+}
+
+new_proj "" ""
+check "same answers as the linear substring scan (randomized)" "
+rng = random.Random(22)
+def word(n):
+    return ''.join(rng.choice('aab-s') for _ in range(rng.randint(0, n)))
+for trial in range(400):
+    entries = [word(5) for _ in range(rng.randint(0, 8))]
+    matcher = _models.ModelMatcher(entries)
+    for _ in range(40):
+        model = rng.choice(['', ' ', 'A']) + word(12) + rng.choice(['', ' '])
+        assert matcher.allowed(model) == linear(model, entries), (model, entries)
+"
+
+check "aliases resolve exact names only; compiled() is shared" "
+mode, options = _state._parse('wf allowed-models=haiku,sonnet '
+                              'model-aliases=Fast=haiku,big=opus,bad=,=x')
+aliases = options['model-aliases']
+assert aliases == ['fast=haiku', 'big=opus'], aliases
+matcher = _models.compiled(options['allowed-models'], aliases)
+assert _models.compiled(['haiku', 'sonnet'], list(aliases)) is matcher
+assert matcher.allowed(' FAST ') and not matcher.allowed('big')
+assert not matcher.allowed('fast-2') and matcher.allowed('claude-sonnet-5')
+assert _models.compiled(['haiku', 'sonnet']) is not matcher
+assert not _models.compiled(['haiku', 'sonnet']).allowed('fast')
+"
+
+echo
+echo "test_models.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
@@ -0,0 +1,99 @@
+#!/usr/bin/env bash
+# hooks/_output.py: the pre-serialized envelopes must be byte-identical to
+# print(json.dumps(...)) of the nested dicts, for both hooks.
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+check() {
+  local name="$1" code="$2"
+  total=$((total+1))
+  local out
+  if out=$(PYTHONPATH="$PLUGIN_ROOT/hooks" python3 -c "
+import importlib.util, io, json, os, subprocess, sys
+import _output
+HOOKS = '$PLUGIN_ROOT/hooks'
+def load(name):
+    spec = importlib.util.spec_from_file_location(
+        name.replace('-', '_'), os.path.join(HOOKS, name + '.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+def reminder_dict(text):
+    return {'hookSpecificOutput': {'hookEventName': 'UserPromptSubmit',
+                                   'additionalContext': text}}
+def deny_dict(reason):
+    return {'hookSpecificOutput': {'hookEventName': 'PreToolUse',
+                                   'permissionDecision': 'deny',
+                                   'permissionDecisionReason': reason}}
+$code" 2>&1); then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: $out"
+    fail=$((fail+1))
+  fi
+}
+
+check "envelopes match json.dumps for awkward strings" "
+for s in ['', 'plain', 'quo\"te \\\\ back', 'tab\tnl\n', 'café — \U0001f600',
+          '\x00\x1f', '}}{{']:
+    assert _output.reminder_line(s) == (json.dumps(reminder_dict(s)) + '\n').encode(), s
+    assert _output.deny_line(s) == (json.dumps(deny_dict(s)) + '\n').encode(), s
+"
+
+check "lines are memoized and the memo is bounded" "
+a = _output.deny_line('x')
+assert _output.deny_line('x') is a
+for i in range(3 * _output.MAX_ENTRIES):
+    _output.deny_line('r%d' % i)
+assert len(_output._memo) <= _output.MAX_ENTRIES
+assert _output.deny_line('x') == a
+"
+
+check "write() under a text-only stdout (daemon redirection)" "
+saved, sys.stdout = sys.stdout, io.StringIO()
+try:
+    _output.write(_output.deny_line('why'))
+    got = sys.stdout.getvalue()
+finally:
+    sys.stdout = saved
+assert got == json.dumps(deny_dict('why')) + '\n', got
+enforce = load('enforce-orchestrator')
+assert enforce.deny_output('why') + '\n' == got
+"
+
+new_proj "on allowed-models=opus,sonnet"
+check "hook stdout is byte-identical to the dict serialization" "
+reminder = load('inject-reminder')
+env = dict(os.environ)
+payload = json.dumps({'cwd': '$TMP/proj'})
+for line in ['on', 'wf', 'pi', 'on allowed-models=opus,sonnet',
+             'pi allowed-models=haiku']:
+    with open('$TMP/proj/.orchestrator-mode.state', 'w') as f:
+        f.write(line + '\n')
+    mode = line.split()[0]
+    text = {'on': reminder.REMINDER_ON, 'wf': reminder.REMINDER_WF,
+            'pi': reminder.REMINDER_PI}[mode]
+    if 'allowed-models=' in line:
+        text += (' Model allowlist for delegated agents: %s. Every '
+                 'agent()/Task/Agent call MUST declare model: one of this '
+                 'list -- omitting the model while this allowlist is active '
+                 'is NOT allowed and will be denied.'
+                 % ', '.join(line.split('=')[1].split(',')))
+    got = subprocess.run([sys.executable, os.path.join(HOOKS, 'inject-reminder.py')],
+                         input=payload.encode(), capture_output=True, env=env).stdout
+    assert got == (json.dumps(reminder_dict(text)) + '\n').encode(), (line, got)
+with open('$TMP/proj/.orchestrator-mode.state', 'w') as f:
+    f.write('on\n')
+got = subprocess.run([sys.executable, os.path.join(HOOKS, 'enforce-orchestrator.py')],
+                     input=json.dumps({'tool_name': 'Bash', 'tool_input': {'command': 'ls'},
+                                       'cwd': '$TMP/proj'}).encode(),
+                     capture_output=True, env=env).stdout
+reason = json.loads(got)['hookSpecificOutput']['permissionDecisionReason']
+assert got == (json.dumps(deny_dict(reason)) + '\n').encode(), got
+"
+
+echo
+echo "test_output.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
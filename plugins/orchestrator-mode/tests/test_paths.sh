@@ -0,0 +1,157 @@
+#!/usr/bin/env bash
+# hooks/_paths.py: memoized realpath must agree with os.path.realpath, resolve
+# each path once per decision, and notice any change to a component.
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+check() {
+  local name="$1" code="$2"
+  total=$((total+1))
+  local out
+  if out=$(PYTHONPATH="$PLUGIN_ROOT/hooks" python3 -c "
+import os, random, shutil
+import _paths
+root = os.path.realpath('$TMP/tree')
+shutil.rmtree(root, ignore_errors=True)
+os.makedirs(root)
+class Count:
+    def __init__(self, name):
+        self.name, self.n, self.real = name, 0, getattr(os, name)
+    def __enter__(self):
+        def wrapped(*a, **k):
+            self.n += 1
+            return self.real(*a, **k)
+        setattr(os, self.name, wrapped)
+        return self
+    def __exit__(self, *exc):
+        setattr(os, self.name, self.real)
+$code" 2>&1); then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: $out"
+    fail=$((fail+1))
+  fi
+}
+
+new_proj "on"
+check "same answer as os.path.realpath (randomized trees with symlinks)" "
+rng = random.Random(7)
+names = ['a', 'b', 'c', '..', '.', 'l1', 'l2', 'missing']
+for trial in range(40):
+    shutil.rmtree(root)
+    os.makedirs(os.path.join(root, 'a', 'b', 'c'))
+    os.makedirs(os.path.join(root, 'b'))
+    for link in ('l1', 'a/l2', 'a/b/l1', 'b/l2'):
+        target = rng.choice(['a', '../b', 'a/b', '/nonexistent', 'l1', 'l2',
+                             root + '/a/b', '..', 'c/missing'])
+        os.symlink(target, os.path.join(root, link))
+    _paths.clear()
+    for _ in range(50):
+        _paths.begin_decision()
+        p = os.path.join(root, *rng.choices(names, k=rng.randint(1, 6)))
+        assert _paths.realpath(p) == os.path.realpath(p), (trial, p)
+assert _paths.realpath('a/../b') == os.path.realpath('a/../b')
+"
+
+check "cached within a decision; re-validated with stat only afterwards" "
+os.makedirs(os.path.join(root, 'x', 'y'))
+p = os.path.join(root, 'x', 'y', 'file.py')
+_paths.begin_decision()
+first = _paths.realpath(p)
+with Count('lstat') as l, Count('stat') as s:
+    assert _paths.realpath(p) == first
+assert (l.n, s.n) == (0, 0), (l.n, s.n)
+_paths.begin_decision()
+with Count('lstat') as l:
+    assert _paths.realpath(p) == first
+    assert _paths.realpath(p) == first
+assert l.n == 0, l.n
+"
+
+check "swapping a component for a symlink invalidates the answer" "
+os.makedirs(os.path.join(root, 'real', 'y'))
+os.makedirs(os.path.join(root, 'x', 'y'))
+p = os.path.join(root, 'x', 'y', 'f')
+_paths.begin_decision()
+assert _paths.realpath(p) == p
+shutil.rmtree(os.path.join(root, 'x', 'y'))
+os.symlink(os.path.join(root, 'real', 'y'), os.path.join(root, 'x', 'y'))
+_paths.begin_decision()
+assert _paths.realpath(p) == os.path.join(root, 'real', 'y', 'f')
+os.unlink(os.path.join(root, 'x', 'y'))
+os.symlink(os.path.join(root, 'x'), os.path.join(root, 'x', 'y'))
+_paths.begin_decision()
+assert _paths.realpath(p) == os.path.realpath(p) == os.path.join(root, 'x', 'f')
+os.rename(os.path.join(root, 'x'), os.path.join(root, 'x2'))
+os.makedirs(os.path.join(root, 'x'))
+_paths.begin_decision()
+assert _paths.realpath(p) == p
+"
+
+check "a Write decision resolves each path once; a repeat does no lstat" "
+import importlib.util
+spec = importlib.util.spec_from_file_location('enforce', '$PLUGIN_ROOT/hooks/enforce-orchestrator.py')
+enforce = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(enforce)
+data = {'tool_name': 'Write', 'tool_input': {'file_path': 'src/app.py'},
+        'cwd': '$TMP/proj'}
+real_resolve, misses = _paths._resolve, []
+def counting(path, rest, *a):
+    if path == '':
+        misses.append(rest)
+    return real_resolve(path, rest, *a)
+_paths._resolve = counting
+assert enforce.decide(data).decision == 'deny'
+# target, state file, and the two safe reflection dirs -- once each
+assert len(misses) == len(set(misses)) == 4, misses
+# later decisions re-validate those answers instead of resolving again
+assert enforce.decide(dict(data, agent_id='a1')).decision == 'noop'
+with Count('lstat') as l:
+    assert enforce.decide(data).decision == 'deny'
+assert l.n == 0 and len(misses) == 4, (l.n, misses)
+"
+
+check "DirSet.covers matches the realpath prefix loop (randomized trees)" "
+rng = random.Random(25)
+names = ['a', 'b', 'ab', '..', '.', 'l1', 'missing']
+for trial in range(40):
+    shutil.rmtree(root)
+    os.makedirs(os.path.join(root, 'a', 'b'))
+    os.makedirs(os.path.join(root, 'ab'))
+    for link in ('l1', 'a/l1'):
+        os.symlink(rng.choice(['a', '../ab', 'a/b', '/nonexistent', '..']),
+                   os.path.join(root, link))
+    dirs = [os.path.join(root, *rng.choices(names, k=rng.randint(1, 3)))
+            for _ in range(rng.randint(1, 12))]
+    resolved = [os.path.realpath(d) for d in dirs]
+    dir_set = _paths.DirSet(dirs)
+    for _ in range(60):
+        p = os.path.realpath(os.path.join(root, *rng.choices(names, k=rng.randint(1, 4))))
+        want = any(p == d or p.startswith(d + os.sep) or d == os.sep
+                   for d in resolved)
+        assert dir_set.covers(p) == want, (dirs, p)
+"
+
+check "DirSet re-validates once per decision; a swapped dir invalidates it" "
+os.makedirs(os.path.join(root, 'proj', 'scratch'))
+os.makedirs(os.path.join(root, 'proj', 'src'))
+_paths.begin_decision()
+dir_set = _paths.DirSet([os.path.join(root, 'proj', 'scratch')])
+with Count('stat') as s:
+    assert dir_set.valid() and dir_set.valid()
+assert s.n == 0, s.n
+_paths.begin_decision()
+assert dir_set.valid()
+shutil.rmtree(os.path.join(root, 'proj', 'scratch'))
+os.symlink(os.path.join(root, 'proj', 'src'), os.path.join(root, 'proj', 'scratch'))
+_paths.begin_decision()
+assert not dir_set.valid()
+assert _paths.DirSet([os.path.join(root, 'proj', 'scratch')]).covers(
+    os.path.join(root, 'proj', 'src', 'app.py'))
+"
+
+echo
+echo "test_paths.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
@@ -0,0 +1,176 @@
+#!/usr/bin/env bash
+# hooks/_payload.py: the selective stdin parse must return what json.loads
+# would (long non-kept strings as Skipped length/first placeholders), reject
+# exactly what json.loads rejects, and keep the D2 scan's answers unchanged.
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+check() {
+  local name="$1" code="$2"
+  total=$((total+1))
+  local out
+  if out=$(PYTHONPATH="$PLUGIN_ROOT/hooks" python3 -c "
+import importlib.util, io, json, random
+import _payload
+spec = importlib.util.spec_from_file_location('enforce', '$PLUGIN_ROOT/hooks/enforce-orchestrator.py')
+enforce = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(enforce)
+TOKEN = enforce.STATE_FILE_TOKEN
+def tiny(chunk, small, skip):
+    _payload.CHUNK, _payload.SMALL_PAYLOAD, _payload.SKIP_MIN = chunk, small, skip
+def same(orig, got):
+    if isinstance(got, _payload.Skipped):
+        assert isinstance(orig, str), (orig, got)
+        assert (got.length, got.first) == (len(orig), orig.find(TOKEN)), (orig, got)
+    elif isinstance(orig, dict):
+        assert list(orig) == list(got), (orig, got)
+        for k in orig:
+            same(orig[k], got[k])
+    elif isinstance(orig, list):
+        assert len(orig) == len(got), (orig, got)
+        for a, b in zip(orig, got):
+            same(a, b)
+    else:
+        assert type(orig) == type(got) and orig == got, (orig, got)
+$code" 2>&1); then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: $out"
+    fail=$((fail+1))
+  fi
+}
+
+new_proj "on" ""
+
+check "same values and errors as json.loads (randomized, tiny buffers)" "
+rng = random.Random(21)
+alphabet = ['a', '\\\\', '\"', 'é', '€', '\U0001f600', '\ud83d', '\n', TOKEN, ' ']
+def text(n):
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, n)))
+def gen(depth):
+    r = rng.random()
+    if depth > 3 or r < 0.35:
+        return text(rng.choice([3, 30, 300]))
+    if r < 0.45:
+        return rng.choice([0, -7, 2.5, 1e300, True, False, None])
+    if r < 0.7:
+        return [gen(depth + 1) for _ in range(rng.randint(0, 4))]
+    keys = ['file_path', 'content', 'command', 'edits', text(4)]
+    return {rng.choice(keys): gen(depth + 1) for _ in range(rng.randint(0, 4))}
+skipped = 0
+for _ in range(1500):
+    raw = json.dumps({'tool_input': gen(0)}, ensure_ascii=rng.random() < 0.5,
+                     indent=rng.choice([None, 1])).encode('utf-8', 'surrogatepass')
+    tiny(rng.choice([1, 2, 3, 7, 64]), rng.choice([0, 5]), rng.choice([0, 4, 30]))
+    got = _payload.load(io.BytesIO(raw), TOKEN)
+    same(json.loads(raw), got)
+    skipped += 'Skipped' in repr(got)
+    bad = raw[:rng.randint(0, len(raw))] + rng.choice([b'', b'x', b'\"', b'\\\\', b'}'])
+    try:
+        json.loads(bad)
+        want = True
+    except ValueError:
+        want = False
+    try:
+        _payload.load(io.BytesIO(bad), TOKEN)
+        ok = True
+    except (ValueError, RecursionError):
+        ok = False
+    assert ok == want, bad
+assert skipped > 300, skipped
+"
+
+check "kept keys stay strings; small payloads are plain json.loads" "
+tiny(16, 0, 8)
+doc = {'tool_name': 'Write', 'cwd': '/p/' + 'd' * 50,
+       'tool_input': {'file_path': 'f' * 40, 'content': 'x' * 40 + TOKEN,
+                      'command': 'c' * 40, 'nested': [{'model': 'm' * 40}]}}
+got = _payload.load(io.BytesIO(json.dumps(doc).encode()), TOKEN)
+assert got['cwd'] == doc['cwd'] and got['tool_input']['file_path'] == 'f' * 40
+assert got['tool_input']['command'] == 'c' * 40
+assert got['tool_input']['nested'][0]['model'] == 'm' * 40
+c = got['tool_input']['content']
+assert (c.length, c.first) == (40 + len(TOKEN), 40), c
+tiny(16, 1 << 20, 8)
+assert _payload.load(io.BytesIO(json.dumps(doc).encode()), TOKEN) == doc
+"
+
+check "D2 scan on Skipped leaves matches the decoded scan, caps included" "
+tiny(64, 0, 16)
+rng = random.Random(5)
+for _ in range(400):
+    leaves = [''.join(rng.choice(['ab', 'é', TOKEN, TOKEN[:7]])
+                      for _ in range(rng.randint(0, 40)))
+              for _ in range(rng.randint(1, 4))]
+    tool_input = {'k%d' % i: v for i, v in enumerate(leaves)}
+    lazy = _payload.load(io.BytesIO(json.dumps(tool_input).encode()), TOKEN)
+    for cap in (None, 0, 10, 50, 200, 10 ** 6):
+        assert (enforce._tool_input_mentions_state_file(lazy, None, cap)
+                == enforce._tool_input_mentions_state_file(tool_input, None, cap)), (
+            tool_input, cap)
+"
+
+# A 40 MB mcp__ payload: the hook must still find the token after 39 MB of
+# filler, and the filler must never be materialized as a str.
+payload_file="$TMP/big-mcp.json"
+python3 -c "
+import json, sys
+body = 'x' * (39 << 20) + ' .orchestrator-mode.state'
+json.dump({'tool_name': 'mcp__fs__write', 'cwd': '$TMP',
+           'tool_input': {'body': body}}, open(sys.argv[1], 'w'))
+" "$payload_file"
+total=$((total+1))
+out=$(python3 - "$payload_file" <<EOF 2>&1
+import resource, runpy, sys
+sys.argv = ["$PLUGIN_ROOT/hooks/enforce-orchestrator.py"]
+sys.stdin = open("$payload_file")
+try:
+    runpy.run_path(sys.argv[0], run_name="__main__")
+except SystemExit:
+    pass
+sys.stdout.flush()
+print("rss_mb=%d" % (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss >> 10))
+EOF
+)
+rss=$(sed -n 's/^rss_mb=//p' <<<"$out")
+if grep -qF '"permissionDecision": "deny"' <<<"$out" && grep -qF 'state-file changes' <<<"$out" \
+    && [ -n "$rss" ] && [ "$rss" -lt 80 ]; then
+  echo "PASS: 40 MB mcp__ payload: state-file token found, bounded memory (${rss} MB)"
+  pass=$((pass+1))
+else
+  echo "FAIL 40 MB mcp__ payload: $out"
+  fail=$((fail+1))
+fi
+
+# A structure-heavy payload (1.5M numbers, 300k small objects) with the token
+# in one short string: the subagent D2 deny must come well inside the
+# PreToolUse timeout (a hook that times out fails open).
+payload_file="$TMP/many-tokens.json"
+python3 -c "
+import json, sys
+json.dump({'tool_name': 'mcp__fs__write', 'agent_id': 'sub-1', 'cwd': '$TMP',
+           'tool_input': {'values': list(range(1500000)),
+                          'rows': [{'id': i, 'tag': 'r', 'ok': True} for i in range(300000)],
+                          'path': 'x/.orchestrator-mode.state'}}, open(sys.argv[1], 'w'))
+" "$payload_file"
+timeout_s=$(python3 -c "
+import json, sys
+print(json.load(open(sys.argv[1]))['hooks']['PreToolUse'][0]['hooks'][0]['timeout'])
+" "$PLUGIN_ROOT/hooks/hooks.json")
+total=$((total+1))
+start=$(date +%s%N)
+out=$(python3 "$PLUGIN_ROOT/hooks/enforce-orchestrator.py" < "$payload_file" 2>&1)
+ms=$(( ($(date +%s%N) - start) / 1000000 ))
+if grep -qF '"permissionDecision": "deny"' <<<"$out" && [ "$ms" -lt $((timeout_s * 500)) ]; then
+  echo "PASS: many-token payload: D2 deny in ${ms} ms (timeout ${timeout_s} s)"
+  pass=$((pass+1))
+else
+  echo "FAIL many-token payload: ${ms} ms (limit $((timeout_s * 500)) ms): $out"
+  fail=$((fail+1))
+fi
+
+echo
+echo "test_payload.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
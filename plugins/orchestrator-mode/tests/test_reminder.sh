@@ -42,6 +42,26 @@ new_proj "banana"
 run_case "reminder/corrupted state no injection" inject-reminder.py \
   "{\"cwd\":\"$TMP/proj\"}" 0 "__EMPTY__" "unrecognized state-file mode token"
 
+# reminder=delta: full on the first prompt, every Nth, and after a state
+# change; a one-line tag in between. Sessions are counted separately.
+new_proj "on reminder=delta reminder-every=3"
+S1="{\"cwd\":\"$TMP/proj\",\"session_id\":\"s1\"}"
+S2="{\"cwd\":\"$TMP/proj\",\"session_id\":\"s2\"}"
+run_case "reminder/delta first prompt full" inject-reminder.py "$S1" 0 "Use the main thread only" ""
+run_case "reminder/delta second prompt short" inject-reminder.py "$S1" 0 "still ON" ""
+run_case "reminder/delta other session starts full" inject-reminder.py "$S2" 0 "Use the main thread only" ""
+run_case "reminder/delta third prompt short" inject-reminder.py "$S1" 0 "still ON" ""
+run_case "reminder/delta every-3 resends full" inject-reminder.py "$S1" 0 "Use the main thread only" ""
+run_case "reminder/delta then short again" inject-reminder.py "$S1" 0 "still ON" ""
+echo "on reminder=delta reminder-every=3 allowed-models=opus" > "$TMP/proj/.orchestrator-mode.state"
+run_case "reminder/delta state change resends full" inject-reminder.py "$S1" 0 "Model allowlist for delegated agents: opus" ""
+run_case "reminder/delta short names allowlist" inject-reminder.py "$S1" 0 "MUST declare model: one of opus" ""
+run_case "reminder/delta without session_id is full" inject-reminder.py \
+  "{\"cwd\":\"$TMP/proj\"}" 0 "Use the main thread only" ""
+echo "pi" > "$TMP/proj/.orchestrator-mode.state"
+run_case "reminder/default full on every prompt (1)" inject-reminder.py "$S1" 0 "DELEGATION CONTRACT -- delegate" ""
+run_case "reminder/default full on every prompt (2)" inject-reminder.py "$S1" 0 "DELEGATION CONTRACT -- delegate" ""
+
 echo
 echo "test_reminder.sh: $pass/$total passed"
 [ "$fail" -eq 0 ]
@@ -0,0 +1,96 @@
+#!/usr/bin/env bash
+# scripts/replay-policy.py: replays transcripts / payloads through decide()
+# under candidate state lines; the process pool must count exactly what an
+# in-process run counts.
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+REPLAY="$PLUGIN_ROOT/scripts/replay-policy.py"
+
+new_proj "" ""
+unset CLAUDE_PROJECT_DIR
+mkdir -p "$TMP/history/sub"
+python3 - "$TMP" <<'PY'
+import json, os, sys
+tmp = sys.argv[1]
+proj = os.path.join(tmp, "proj")
+def use(name, **inp):
+    return {"type": "tool_use", "id": "t", "name": name, "input": inp}
+def assistant(*items, **extra):
+    rec = {"type": "assistant", "sessionId": "s1", "cwd": proj,
+           "message": {"role": "assistant", "content": list(items)}}
+    rec.update(extra)
+    return rec
+lines = [
+    {"type": "user", "message": {"role": "user", "content": "hi tool_use"}},
+    assistant({"type": "text", "text": "reading"}, use("Read", file_path="a.py"),
+              use("Bash", command="ls")),
+    assistant(use("Edit", file_path="a.py"), isSidechain=True, agentId="a1"),
+    assistant(use("Task", subagent_type="Explore", model="claude-sonnet-5")),
+]
+with open(os.path.join(tmp, "history", "session.jsonl"), "w") as f:
+    for rec in lines:
+        f.write(json.dumps(rec) + "\n")
+    f.write('{"type": "assistant", "tool_use" truncated\n')
+with open(os.path.join(tmp, "history", "sub", "payloads.jsonl"), "w") as f:
+    f.write(json.dumps({"tool_name": "Write", "tool_input": {"file_path": ".remember/x.md"},
+                        "cwd": proj}) + "\n")
+    f.write(json.dumps({"hook": "PreToolUse", "payload": {
+        "tool_name": "Bash", "tool_input": {"command": "cat .orchestrator-mode.state"},
+        "cwd": proj, "agent_id": "a2"}}) + "\n")
+    f.write(json.dumps({"hook": "UserPromptSubmit", "payload": {"prompt": "x"}}) + "\n")
+PY
+
+# check name python-code: `run(*args)` -> parsed --json report
+check() {
+  local name="$1" code="$2"
+  total=$((total+1))
+  local out
+  if out=$(python3 -c "
+import json, subprocess, sys
+def run(*args):
+    out = subprocess.run([sys.executable, '$REPLAY', '--json', '-', *args],
+                         capture_output=True, text=True, check=True).stdout
+    report = json.loads(out)
+    report.pop('seconds')
+    return report
+$code" 2>&1); then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: $out"
+    fail=$((fail+1))
+  fi
+}
+
+check "counts per policy, tool and step across transcript and payload records" "
+r = run('--policy', 'on', '--policy', 'wf allowed-models=opus', '--workers', '1',
+        '$TMP/history')
+assert r['skipped_lines'] == 1, r
+on = r['policies']['on']
+assert on['calls'] == 6 and on['deny'] == 2 and on['error'] == 0, on
+assert on['by_tool']['Bash'] == {'calls': 2, 'deny': 2}, on['by_tool']
+assert on['by_tool']['Edit'] == {'calls': 1, 'deny': 0}, on['by_tool']
+assert on['deny_by_step'] == {'3': 1, '8': 1}, on
+wf = r['policies']['wf allowed-models=opus']
+assert wf['deny'] == 3 and wf['by_tool']['Task'] == {'calls': 1, 'deny': 1}, wf
+assert wf['deny_by_step'] == {'3': 1, '9': 2}, wf
+"
+
+check "process pool with tiny chunks == in-process run" "
+args = ('--policy', 'on', '--policy', 'pi', '--policy', 'wf', '$TMP/history')
+assert run('--workers', '3', '--chunk-lines', '1', *args) == run('--workers', '1', *args)
+"
+
+check "the project's real state file is never consulted" "
+import os
+with open('$TMP/proj/.orchestrator-mode.state', 'w') as f:
+    f.write('pi')
+r = run('--policy', 'off', '--workers', '1', '$TMP/history')
+assert r['policies']['off'] == {'calls': 6, 'deny': 0, 'error': 0, 'by_tool': r['policies']['off']['by_tool'], 'deny_by_step': {}}, r
+"
+
+echo
+echo "test_replay.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
@@ -0,0 +1,140 @@
+#!/usr/bin/env bash
+# shadow=<mode>[,key=value,...]: the candidate policy runs next to the live
+# one; disagreements (only) go to .orchestrator-mode.shadow, and only the live
+# decision is emitted.
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+ENFORCE="$PLUGIN_ROOT/hooks/enforce-orchestrator.py"
+
+# check name python-code: `records` are the parsed shadow log lines
+check() {
+  local name="$1" code="$2"
+  total=$((total+1))
+  local out
+  if out=$(PYTHONPATH="$PLUGIN_ROOT/hooks" python3 -c "
+import json, os
+path = os.path.join(os.environ['CLAUDE_PROJECT_DIR'], '.orchestrator-mode.shadow')
+records = ([json.loads(l) for l in open(path)] if os.path.exists(path) else [])
+$code" 2>&1); then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: $out"
+    fail=$((fail+1))
+  fi
+}
+
+task() {
+  printf '{"tool_name":"Task","tool_input":{"subagent_type":"%s","model":"%s"},"cwd":"%s","session_id":"s1"}' \
+    "$1" "$2" "$TMP/proj"
+}
+
+new_proj "on shadow=wf shadow-sample=1"
+run_case "shadow/live decision is emitted (on allows Task)" enforce-orchestrator.py \
+  "$(task general opus)" 0 "__EMPTY__" ""
+run_case "shadow/agreeing calls are emitted as usual" enforce-orchestrator.py \
+  "{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"ls\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "is blocked on the main thread" ""
+run_case "shadow/agreeing no-op" enforce-orchestrator.py \
+  "{\"tool_name\":\"Read\",\"tool_input\":{},\"cwd\":\"$TMP/proj\"}" 0 "__EMPTY__" ""
+check "only the disagreement is logged, with live and shadow sides" "
+assert len(records) == 1, records
+r = records[0]
+assert (r['tool'], r['session'], r['mode'], r['decision'], r['step']) == \\
+    ('Task', 's1', 'on', 'noop', 8), r
+assert (r['shadow_mode'], r['shadow_decision'], r['shadow_step']) == \\
+    ('wf', 'deny', 9), r
+assert len(r['digest']) == 16 and isinstance(r['us'], int), r
+"
+
+new_proj "on shadow=on,allowed-models=sonnet,haiku,allow-mcp=mcp__Docs__* shadow-sample=0"
+printf '%s' "$(task general claude-haiku-4)" | python3 "$ENFORCE" >/dev/null
+printf '%s' "$(task general opus)" | python3 "$ENFORCE" >/dev/null
+printf '%s' "{\"tool_name\":\"mcp__Docs__get\",\"tool_input\":{},\"cwd\":\"$TMP/proj\"}" \
+  | python3 "$ENFORCE" >/dev/null
+check "shadow options: comma lists, kept case, no digest at shadow-sample=0" "
+got = [(r['tool'], r['decision'], r['shadow_decision']) for r in records]
+assert got == [('Task', 'noop', 'deny'), ('mcp__Docs__get', 'deny', 'noop')], got
+assert not any('digest' in r for r in records), records
+"
+
+new_proj "on allow-mcp=mcp__docs__* shadow=wf"
+check "the candidate inherits live options it does not override" "
+import importlib.util
+spec = importlib.util.spec_from_file_location('enforce', '$ENFORCE')
+enforce = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(enforce)
+live = enforce.get_state({})
+mode, options = enforce._shadow_state(live[1]['shadow'], live[1])
+assert mode == 'wf' and options == {'allow-mcp': ['mcp__docs__*']}, options
+assert enforce._shadow_state('pi,scan-max-chars=9', {'shadow': 'x'}) == \\
+    ('pi', {'scan-max-chars': '9'})
+"
+
+check "shadow reuses the live decision's resolved paths" "
+import importlib.util, io, sys
+spec = importlib.util.spec_from_file_location('enforce', '$ENFORCE')
+enforce = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(enforce)
+calls = []
+resolve = enforce._paths._resolve
+enforce._paths._resolve = lambda *a: calls.append(a) or resolve(*a)
+dir_sig = enforce._paths._dir_sig
+enforce._paths._dir_sig = lambda d: calls.append(d) or dir_sig(d)
+def run(state_line):
+    open(os.path.join(os.environ['CLAUDE_PROJECT_DIR'], '.orchestrator-mode.state'), 'w').write(state_line)
+    del calls[:]
+    enforce._paths.clear()
+    enforce._safe_dir_memo.clear()
+    sys.stdin = io.TextIOWrapper(io.BytesIO(json.dumps(
+        {'tool_name': 'Write', 'cwd': os.environ['CLAUDE_PROJECT_DIR'],
+         'tool_input': {'file_path': 'src/app.py'}}).encode()))
+    try:
+        enforce.main()
+    except SystemExit:
+        pass
+    return len(calls)
+sys.stdout = io.StringIO()
+plain = run('on')
+assert plain and run('on shadow=wf') == plain, (plain, len(calls))
+"
+
+# The main use case: shadow a rollout from off before turning it on.
+new_proj "off shadow=on shadow-sample=0"
+run_case "shadow/off stays a silent no-op" enforce-orchestrator.py \
+  "{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"ls\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "__EMPTY__" ""
+printf '%s' "{\"tool_name\":\"Read\",\"tool_input\":{},\"cwd\":\"$TMP/proj\"}" \
+  | python3 "$ENFORCE" >/dev/null
+check "off shadow=on logs what on would have denied" "
+got = [(r['tool'], r['mode'], r['decision'], r['step'], r['shadow_decision'])
+       for r in records]
+assert got == [('Bash', 'off', 'noop', 2, 'deny')], got
+"
+
+new_proj "on shadow=wf audit=on"
+check "the audited latency is the live decision's, not the shadow run's" "
+import importlib.util, io, sys, time
+spec = importlib.util.spec_from_file_location('enforce', '$ENFORCE')
+enforce = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(enforce)
+run_shadow = enforce._run_shadow
+enforce._run_shadow = lambda *a: time.sleep(0.3) or run_shadow(*a)
+sys.stdin = io.TextIOWrapper(io.BytesIO(json.dumps(
+    {'tool_name': 'Read', 'cwd': os.environ['CLAUDE_PROJECT_DIR'],
+     'tool_input': {}}).encode()))
+try:
+    enforce.main()
+except SystemExit:
+    pass
+import _audit
+log = _audit.audit_path(os.environ['CLAUDE_PROJECT_DIR'])
+us = [json.loads(l)['us'] for l in open(log)]
+assert len(us) == 1 and us[0] < 300000, us
+"
+
+echo
+echo "test_shadow.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
@@ -0,0 +1,115 @@
+#!/usr/bin/env bash
+# Startup budget for the hook scripts. Every tool call / prompt pays the
+# hooks' import cost, so this suite fails on import-time regressions:
+#   - a total `-X importtime` budget per hook, run exactly as hooks.json runs
+#     it (`python3 -I -S`); override with ORCHESTRATOR_IMPORT_BUDGET_US;
+#   - modules that must never be imported on the hot path (typing), and
+#     modules the client shim must not pull in (json, re);
+#   - the Workflow-lint tokenizer stays unimported unless the lint runs.
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+BUDGET_US="${ORCHESTRATOR_IMPORT_BUDGET_US:-100000}"
+
+# budget_case name script payload forbidden_modules...
+budget_case() {
+  local name="$1" script="$2" payload="$3"
+  shift 3
+  total=$((total+1))
+  local report
+  report=$(printf '%s' "$payload" \
+    | python3 -I -S -X importtime "$PLUGIN_ROOT/hooks/$script" 2>&1 >/dev/null \
+    | python3 -c '
+import sys
+budget = int(sys.argv[1])
+forbidden = set(sys.argv[2:])
+total = 0
+seen = set()
+for line in sys.stdin:
+    if not line.startswith("import time:") or "self [us]" in line:
+        continue
+    self_us, _, name = line[len("import time:"):].split("|")
+    total += int(self_us)
+    seen.add(name.strip())
+bad = sorted(forbidden & seen)
+if bad:
+    print("imported forbidden module(s): %s" % ", ".join(bad))
+elif total > budget:
+    print("import time %dus > budget %dus" % (total, budget))
+' "$BUDGET_US" "$@")
+  if [ -z "$report" ]; then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: $report"
+    fail=$((fail+1))
+  fi
+}
+
+new_proj "on"
+budget_case "enforce/on Read within budget, no typing" enforce-orchestrator.py \
+  "{\"tool_name\":\"Read\",\"tool_input\":{},\"cwd\":\"$TMP/proj\"}" typing
+budget_case "enforce/on Bash deny within budget, no typing" enforce-orchestrator.py \
+  "{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"ls\"},\"cwd\":\"$TMP/proj\"}" typing
+budget_case "reminder/on within budget, no typing" inject-reminder.py \
+  "{\"cwd\":\"$TMP/proj\"}" typing
+export ORCHESTRATOR_GATE_SOCKET="$TMP/no-daemon.sock"
+budget_case "gate-client fallback within budget, no typing" gate-client.py \
+  "{\"tool_name\":\"Read\",\"tool_input\":{},\"cwd\":\"$TMP/proj\"}" typing
+
+# The shim's own import set (what every call pays when a daemon answers).
+total=$((total+1))
+if out=$(python3 -I -S -c "
+import sys
+sys.path.insert(0, '$PLUGIN_ROOT/hooks')
+import _gate
+bad = sorted({'json', 're', 'typing', 'socket'} & set(sys.modules))
+assert not bad, bad
+assert _gate.request(b'{}') is None  # no daemon: no socket module at all
+assert not {'socket', '_socket'} & set(sys.modules)
+" 2>&1); then
+  echo "PASS: _gate imports no json/re/typing/socket; _socket only for a live daemon"
+  pass=$((pass+1))
+else
+  echo "FAIL: _gate import set: $out"
+  fail=$((fail+1))
+fi
+
+# The Workflow-lint tokenizer is imported (and compiled) lazily.
+total=$((total+1))
+if out=$(PYTHONPATH="$PLUGIN_ROOT/hooks" python3 -c "
+import importlib.util, io, json, os, sys
+spec = importlib.util.spec_from_file_location('enforce', '$PLUGIN_ROOT/hooks/enforce-orchestrator.py')
+enforce = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(enforce)
+
+def run(payload):
+    sys.stdin, sys.stdout = io.StringIO(json.dumps(payload)), io.StringIO()
+    try:
+        enforce.main()
+    except SystemExit:
+        pass
+    finally:
+        sys.stdout = sys.__stdout__
+
+for tool in ('Read', 'Bash', 'Task', 'Workflow'):
+    run({'tool_name': tool, 'tool_input': {'script': 'agent(1)'}, 'cwd': '$TMP/proj'})
+assert '_workflow_lint' not in sys.modules, 'imported without an allowlist'
+with open('$TMP/proj/.orchestrator-mode.state', 'w') as f:
+    f.write('wf allowed-models=sonnet')
+run({'tool_name': 'Read', 'tool_input': {}, 'cwd': '$TMP/proj'})
+assert '_workflow_lint' not in sys.modules, 'imported for a non-Workflow call'
+run({'tool_name': 'Workflow', 'tool_input': {'script': 'agent(1)'}, 'cwd': '$TMP/proj'})
+assert sys.modules['_workflow_lint']._RES is not None, 'lint ran without compiling'
+" 2>&1); then
+  echo "PASS: Workflow lint tokenizer loaded only when the lint runs"
+  pass=$((pass+1))
+else
+  echo "FAIL: lazy Workflow lint: $out"
+  fail=$((fail+1))
+fi
+
+echo
+echo "test_startup.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
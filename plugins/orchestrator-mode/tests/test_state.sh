@@ -7,6 +7,9 @@ pass=0
 fail=0
 total=0
 
+# Keep the discovery cache out of the real ~/.cache.
+export ORCHESTRATOR_CACHE_DIR="$(mktemp -d)"
+
 check() {
   local name="$1" code="$2"
   total=$((total+1))
@@ -34,6 +37,12 @@ assert r == ('off', {}), r
 assert buf.getvalue() == '', repr(buf.getvalue())
 "
 
+check "_parse('off shadow=on ...') keeps the options under off" "
+import _state
+r = _state._parse('off shadow=on allow-mcp=mcp__Docs__*')
+assert r == ('off', {'shadow': 'on', 'allow-mcp': ['mcp__Docs__*']}), r
+"
+
 check "_parse('') -> (off, {}) no stderr" "
 import sys, io, _state
 buf = io.StringIO()
@@ -106,6 +115,134 @@ assert p == os.path.join(proj, '.orchestrator-mode.state'), p
 os.environ.pop('CLAUDE_PROJECT_DIR', None)
 "
 
+check "cache: walk-up result served from cache, file written" "
+import os, tempfile, _state, _cache
+tmp = tempfile.mkdtemp()
+proj = os.path.join(tmp, 'proj')
+nested = os.path.join(proj, 'a', 'b')
+os.makedirs(nested)
+with open(os.path.join(proj, '.orchestrator-mode.state'), 'w') as f:
+    f.write('wf allowed-models=opus')
+os.environ.pop('CLAUDE_PROJECT_DIR', None)
+assert _state.get_state({'cwd': nested}) == ('wf', {'allowed-models': ['opus']})
+entry = _cache.load('state-discovery.json')[nested]
+assert entry['found'] == os.path.realpath(proj), entry
+_state._discovery_memo.clear()
+# poison the walker: a valid cache entry must not walk again
+real_walk = _state._walk_state_dir
+_state._walk_state_dir = lambda start: (_ for _ in ()).throw(AssertionError('walked'))
+assert _state.get_state({'cwd': nested}) == ('wf', {'allowed-models': ['opus']})
+_state._walk_state_dir = real_walk
+"
+
+check "cache: OFF (no state file anywhere) is cached and answered without a walk" "
+import os, tempfile, _state
+nested = os.path.join(tempfile.mkdtemp(), 'x', 'y')
+os.makedirs(nested)
+os.environ.pop('CLAUDE_PROJECT_DIR', None)
+assert _state.get_state({'cwd': nested}) == ('off', {})
+_state._discovery_memo.clear()
+_state._walk_state_dir = lambda start: (_ for _ in ()).throw(AssertionError('walked'))
+assert _state.get_state({'cwd': nested}) == ('off', {})
+assert _state.state_file_path({'cwd': nested}) == os.path.join(nested, '.orchestrator-mode.state')
+"
+
+check "cache: new state file in an intermediate dir invalidates" "
+import os, tempfile, _state
+tmp = tempfile.mkdtemp()
+nested = os.path.join(tmp, 'a', 'b', 'c')
+os.makedirs(nested)
+os.environ.pop('CLAUDE_PROJECT_DIR', None)
+assert _state.get_state({'cwd': nested}) == ('off', {})
+with open(os.path.join(tmp, 'a', '.orchestrator-mode.state'), 'w') as f:
+    f.write('pi')
+assert _state.get_state({'cwd': nested}) == ('pi', {})
+os.unlink(os.path.join(tmp, 'a', '.orchestrator-mode.state'))
+assert _state.get_state({'cwd': nested}) == ('off', {})
+"
+
+check "cache: rewritten state file content is re-parsed" "
+import os, tempfile, time, _state
+tmp = tempfile.mkdtemp()
+nested = os.path.join(tmp, 'n')
+os.makedirs(nested)
+path = os.path.join(tmp, '.orchestrator-mode.state')
+with open(path, 'w') as f:
+    f.write('on')
+os.environ.pop('CLAUDE_PROJECT_DIR', None)
+assert _state.get_state({'cwd': nested}) == ('on', {})
+with open(path, 'w') as f:
+    f.write('wf')
+os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+assert _state.get_state({'cwd': nested}) == ('wf', {})
+"
+
+check "cache: parse warnings are replayed on a cache hit" "
+import os, sys, io, tempfile, _state
+tmp = tempfile.mkdtemp()
+with open(os.path.join(tmp, '.orchestrator-mode.state'), 'w') as f:
+    f.write('banana')
+os.environ.pop('CLAUDE_PROJECT_DIR', None)
+for _ in range(2):
+    buf = io.StringIO()
+    sys.stderr = buf
+    assert _state.get_state({'cwd': tmp}) == ('off', {})
+    sys.stderr = sys.__stderr__
+    assert 'unrecognized state-file mode token' in buf.getvalue(), buf.getvalue()
+"
+
+check "cache: a forged discovery entry cannot change the answer" "
+import os, tempfile, _state, _cache
+tmp = os.path.realpath(tempfile.mkdtemp())
+proj = os.path.join(tmp, 'proj')
+nested = os.path.join(proj, 'a')
+elsewhere = os.path.join(tmp, 'elsewhere')
+os.makedirs(nested)
+os.makedirs(elsewhere)
+with open(os.path.join(proj, '.orchestrator-mode.state'), 'w') as f:
+    f.write('on')
+with open(os.path.join(elsewhere, '.orchestrator-mode.state'), 'w') as f:
+    f.write('off')
+os.symlink(nested, os.path.join(tmp, 'link'))
+os.environ.pop('CLAUDE_PROJECT_DIR', None)
+assert _state.get_state({'cwd': nested}) == ('on', {})
+real = _cache.load('state-discovery.json')[nested]
+def chain(*dirs):
+    return [[d] + _state._sig(os.stat(d)) for d in dirs]
+ancestors = []
+d = nested
+while True:
+    ancestors.append(d)
+    if os.path.dirname(d) == d:
+        break
+    d = os.path.dirname(d)
+forged = [
+    dict(real, mode='off', options={}),                    # parsed state
+    {'dirs': chain(*ancestors), 'found': None},            # no state file
+    {'dirs': chain(nested, proj), 'found': None},          # truncated chain
+    {'dirs': chain(nested, elsewhere), 'found': elsewhere},
+    {'dirs': chain(os.path.join(tmp, 'link'), tmp), 'found': None},
+]
+for entry in forged:
+    _state._discovery_memo.clear()
+    _cache.store('state-discovery.json', {nested: entry})
+    assert _state.get_state({'cwd': nested}) == ('on', {}), entry
+    assert _state.state_file_path({'cwd': nested}) == os.path.join(
+        proj, '.orchestrator-mode.state'), entry
+"
+
+check "cache: ORCHESTRATOR_CACHE_DIR=off disables the cache" "
+import os, tempfile, _state
+os.environ['ORCHESTRATOR_CACHE_DIR'] = 'off'
+tmp = tempfile.mkdtemp()
+with open(os.path.join(tmp, '.orchestrator-mode.state'), 'w') as f:
+    f.write('on')
+os.environ.pop('CLAUDE_PROJECT_DIR', None)
+assert _state.get_state({'cwd': tmp}) == ('on', {})
+import _cache
+assert _cache.load('state-discovery.json') == {}
+"
+
 echo
 echo "test_state.sh: $pass/$total passed"
 [ "$fail" -eq 0 ]
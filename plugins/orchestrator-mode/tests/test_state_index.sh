@@ -0,0 +1,138 @@
+#!/usr/bin/env bash
+# hooks/_state_index.py + scripts/state-index.py: the index must resolve like
+# the walk-up, stay equal to a fresh scan across incremental refreshes, and
+# answer resolve() without touching the filesystem.
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+check() {
+  local name="$1" code="$2"
+  total=$((total+1))
+  local out
+  if out=$(PYTHONPATH="$PLUGIN_ROOT/hooks" python3 -c "
+import json, os, random, shutil, subprocess, sys
+import _state
+from _state_index import StateIndex
+root = os.path.realpath('$TMP/mono')
+def put(rel, text):
+    path = os.path.join(root, rel, '.orchestrator-mode.state')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+def all_dirs():
+    out = []
+    for d, subdirs, _ in os.walk(root):
+        subdirs[:] = [s for s in subdirs if s not in ('.git', 'node_modules')]
+        out.append(d)
+    return out
+def snapshot(index):
+    return [(d, e['mode'], json.dumps(e['options'])) for d, e in index.entries()]
+$code" 2>&1); then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: $out"
+    fail=$((fail+1))
+  fi
+}
+
+new_proj "" ""
+unset CLAUDE_PROJECT_DIR
+mkdir -p "$TMP/mono"
+printf 'on' > "$TMP/mono/.orchestrator-mode.state"
+for p in services/api services/api/legacy services/web tools/cli; do
+  mkdir -p "$TMP/mono/$p/src/deep"
+done
+printf 'wf allowed-models=opus,sonnet' > "$TMP/mono/services/api/.orchestrator-mode.state"
+printf 'pi' > "$TMP/mono/services/api/legacy/.orchestrator-mode.state"
+printf 'banana' > "$TMP/mono/tools/cli/.orchestrator-mode.state"
+mkdir -p "$TMP/mono/node_modules/pkg" "$TMP/mono/.git"
+printf 'pi' > "$TMP/mono/node_modules/pkg/.orchestrator-mode.state"
+mkdir -p "$TMP/elsewhere"
+printf 'pi' > "$TMP/elsewhere/.orchestrator-mode.state"
+ln -s "$TMP/elsewhere" "$TMP/mono/services/link"
+
+check "resolves every dir like the walk-up, without filesystem access" "
+index = StateIndex(root).build()
+assert [d for d, _ in index.entries()] == sorted(
+    os.path.join(root, p) if p else root for p in ('', 'services/api', 'services/api/legacy', 'tools/cli')), index.entries()
+assert index.entries()[-1][1]['warnings'], 'garbage mode keeps its warning'
+dirs = all_dirs()
+want = {d: _state._walk_state_dir(d)[0] for d in dirs}
+real_stat, real_scandir = os.stat, os.scandir
+def boom(*a, **k):
+    raise AssertionError('filesystem access in resolve()')
+os.stat = os.lstat = os.scandir = boom
+try:
+    got = {d: index.resolve(d) for d in dirs}
+finally:
+    os.stat, os.scandir = real_stat, real_scandir
+for d in dirs:
+    assert got[d][0] == want[d], (d, got[d], want[d])
+assert got[os.path.join(root, 'services/api/src/deep')][1:] == ('wf', {'allowed-models': ['opus', 'sonnet']})
+assert index.resolve('/') is None
+"
+
+check "incremental refresh == fresh build across random tree edits" "
+rng = random.Random(11)
+index = StateIndex(root).build()
+modes = ['on', 'pi', 'wf', 'off', 'wf allowed-models=haiku', '']
+for step in range(60):
+    dirs = [d for d in all_dirs() if d != root]
+    op = rng.choice(['put', 'put', 'rm', 'mkdir', 'rename', 'rmtree'])
+    d = rng.choice(dirs)
+    if op == 'put':
+        put(d, rng.choice(modes))
+    elif op == 'rm':
+        try:
+            os.unlink(os.path.join(d, '.orchestrator-mode.state'))
+        except FileNotFoundError:
+            pass
+    elif op == 'mkdir':
+        os.makedirs(os.path.join(d, 'n%d' % step, 'x'))
+        if rng.random() < 0.5:
+            put(os.path.join(d, 'n%d' % step, 'x'), 'pi')
+    elif op == 'rename' and not os.path.islink(d):
+        os.rename(d, d + '_r%d' % step)
+    elif op == 'rmtree' and not os.path.islink(d) and len(dirs) > 8:
+        shutil.rmtree(d)
+    before = snapshot(index)
+    changed = index.refresh()
+    fresh = StateIndex(root).build()
+    assert snapshot(index) == snapshot(fresh), (step, op, d)
+    assert changed == sorted({x for x, *_ in set(before) ^ set(snapshot(fresh))}), (step, changed)
+    for x in all_dirs():
+        assert index.resolve(x) == fresh.resolve(x), x
+"
+
+check "under() lists a subtree from the sorted table" "
+index = StateIndex(root).build()
+put('services/api-v2', 'pi')
+put('services/api/x', 'on')
+index.refresh()
+api = os.path.join(root, 'services', 'api')
+got = [d for d, _ in index.under(api)]
+assert got == sorted(d for d, _ in index.entries() if d == api or d.startswith(api + os.sep)), got
+assert os.path.join(root, 'services/api-v2') not in got and os.path.join(root, 'services/api/x') in got
+"
+
+check "saved index is reused and refreshed by the next process; CLI" "
+StateIndex(root).build().save()
+put('tools/cli', 'wf')
+script = '$PLUGIN_ROOT/scripts/state-index.py'
+rows = json.loads(subprocess.check_output([sys.executable, script, root, '--json']))
+cli = [r for r in rows if r['dir'] == os.path.join(root, 'tools/cli')]
+assert cli and cli[0]['mode'] == 'wf' and cli[0]['warnings'] == [], rows
+only_pi = json.loads(subprocess.check_output([sys.executable, script, root, '--json', '--mode', 'pi']))
+assert only_pi and all(r['mode'] == 'pi' for r in only_pi), only_pi
+res = json.loads(subprocess.check_output([sys.executable, script, root, '--json', '--resolve',
+                                          os.path.join(root, 'tools/cli/src'), '/']))
+assert res[0]['mode'] == 'wf' and res[1] == {'path': '/', 'state_dir': None, 'mode': 'off', 'options': {}}, res
+text = subprocess.check_output([sys.executable, script, root], text=True)
+assert 'state file(s)' in text and 'tools/cli' in text, text
+"
+
+echo
+echo "test_state_index.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
@@ -0,0 +1,126 @@
+#!/usr/bin/env bash
+# _state.write_state() / read_state_file() + scripts/set-mode.py: atomic,
+# versioned writes, and readers that never see a transient OFF while the
+# file is being rewritten (atomically or in place, like the Write tool).
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+check() {
+  local name="$1" code="$2"
+  total=$((total+1))
+  local out
+  if out=$(PYTHONPATH="$PLUGIN_ROOT/hooks" python3 -c "
+import multiprocessing, os, subprocess, sys, time
+import _state
+proj = os.environ['CLAUDE_PROJECT_DIR']
+path = os.path.join(proj, '.orchestrator-mode.state')
+def put(text, age=0):
+    with open(path, 'w') as f:
+        f.write(text)
+    if age:
+        t = time.time() - age
+        os.utime(path, (t, t))
+$code" 2>&1); then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: $out"
+    fail=$((fail+1))
+  fi
+}
+
+new_proj "on"
+check "versioned round trip, generations increase, header is not an option" "
+assert _state.write_state(proj, 'wf', {'allowed-models': ['opus', 'sonnet'], 'audit': 'on'}) == 1
+assert _state.get_state({}) == ('wf', {'allowed-models': ['opus', 'sonnet'], 'audit': 'on'})
+assert _state.write_state(proj, 'ON') == 2
+line = open(path).read()
+assert line.startswith('on gen=2 crc=') and line.endswith('\n'), line
+assert _state.get_state({}) == ('on', {})
+assert [n for n in os.listdir(proj) if n.endswith('.tmp')] == []
+try:
+    _state.write_state(proj, 'banana')
+    raise AssertionError('accepted an unknown mode')
+except ValueError:
+    pass
+"
+
+new_proj "on"
+check "torn-looking reads are retried only while the file is fresh" "
+put('')
+t0 = time.monotonic(); assert _state.get_state({}) == ('off', {})
+assert time.monotonic() - t0 >= 0.012  # retried, then fail open
+put('', age=60)
+t0 = time.monotonic(); assert _state.get_state({}) == ('off', {})
+assert time.monotonic() - t0 < 0.012   # old empty file: plain OFF, no wait
+_state.write_state(proj, 'pi', {'allowed-models': ['haiku']})
+put(open(path).read().replace('pi ', 'wf ', 1))  # hand edit, stale crc
+assert _state.get_state({}) == ('wf', {'allowed-models': ['haiku']})
+put('on', age=0)
+t0 = time.monotonic(); assert _state.get_state({}) == ('on', {})
+assert time.monotonic() - t0 < 0.012
+"
+
+new_proj "" ""
+check "set-mode.py writes the parsed line" "
+out = subprocess.run([sys.executable, '$PLUGIN_ROOT/scripts/set-mode.py', 'WF',
+                      'allowed-models=Opus,,sonnet', 'audit=on'],
+                     capture_output=True, text=True, check=True).stdout
+assert out == 'orchestrator-mode: wf allowed-models=opus,sonnet audit=on (generation 1)\n', out
+assert _state.get_state({}) == ('wf', {'allowed-models': ['opus', 'sonnet'], 'audit': 'on'})
+bad = subprocess.run([sys.executable, '$PLUGIN_ROOT/scripts/set-mode.py', 'banana'],
+                     capture_output=True, text=True)
+assert bad.returncode == 2 and _state.get_state({})[0] == 'wf'
+"
+
+new_proj "on allowed-models=opus"
+check "stress: concurrent readers never observe a transient OFF" "
+LINES = ['on allowed-models=opus,sonnet', 'wf', 'pi allowed-models=haiku', 'on']
+def in_place_writer(seed, stop):
+    i = seed
+    while not stop.is_set():
+        with open(path, 'w') as f:   # truncate, then write: the Write tool
+            f.write(LINES[i % len(LINES)] + '\n')
+        i += 1
+        time.sleep(0.001)
+def atomic_writer(stop):
+    i = 0
+    while not stop.is_set():
+        mode, options = _state._parse(LINES[i % len(LINES)])
+        _state.write_state(proj, mode, options)
+        i += 1
+        time.sleep(0.001)
+def reader(kind, stop, bad, reads):
+    if kind == 'walk-up':
+        os.environ.pop('CLAUDE_PROJECT_DIR')
+    elif kind == 'watcher':
+        _state.watch(proj)
+    data = {'cwd': proj}
+    n = 0
+    while not stop.is_set():
+        if _state.get_state(data)[0] == 'off':
+            bad.value += 1
+        n += 1
+        time.sleep(0.0002)  # hook-like pacing; a pure spin starves writers
+    reads.value += n
+ctx = multiprocessing.get_context('fork')
+stop = ctx.Event()
+bad, reads = ctx.Value('i', 0), ctx.Value('i', 0)
+procs = [ctx.Process(target=in_place_writer, args=(0, stop)),
+         ctx.Process(target=atomic_writer, args=(stop,))]
+for kind in ('project-dir', 'project-dir', 'walk-up', 'walk-up', 'watcher', 'watcher'):
+    procs.append(ctx.Process(target=reader, args=(kind, stop, bad, reads)))
+for p in procs:
+    p.start()
+time.sleep(2)
+stop.set()
+for p in procs:
+    p.join()
+assert reads.value > 1000, reads.value
+assert bad.value == 0, '%d of %d reads saw OFF' % (bad.value, reads.value)
+"
+
+echo
+echo "test_state_write.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
@@ -0,0 +1,127 @@
+#!/usr/bin/env bash
+# Per-step latency histograms (ORCHESTRATOR_STATS=1, hooks/_stats.py) and the
+# `enforce-orchestrator.py --stats` report.
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+ENFORCE="$PLUGIN_ROOT/hooks/enforce-orchestrator.py"
+
+# gate payload -> runs the hook with stats on, discarding output
+gate() {
+  printf '%s' "$1" | ORCHESTRATOR_STATS=1 python3 "$ENFORCE" >/dev/null 2>&1
+}
+
+# check name python-code: `snap` is the decoded stats file
+check() {
+  local name="$1" code="$2"
+  total=$((total+1))
+  local out
+  if out=$(PYTHONPATH="$PLUGIN_ROOT/hooks" python3 -c "
+import json, os, subprocess, sys
+import _stats
+path = os.path.join(os.environ['ORCHESTRATOR_CACHE_DIR'], _stats.STATS_FILE_NAME)
+snap = _stats.snapshot(path)
+$code" 2>&1); then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: $out"
+    fail=$((fail+1))
+  fi
+}
+
+new_proj "on"
+printf '%s' "{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"ls\"},\"cwd\":\"$TMP/proj\"}" \
+  | python3 "$ENFORCE" >/dev/null 2>&1
+check "off by default: no stats file" "
+assert snap is None
+"
+
+gate "{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"ls\"},\"cwd\":\"$TMP/proj\"}"
+gate "{\"tool_name\":\"Read\",\"tool_input\":{},\"cwd\":\"$TMP/proj\"}"
+gate "{\"tool_name\":\"Edit\",\"tool_input\":{\"file_path\":\"x.py\"},\"cwd\":\"$TMP/proj\",\"agent_id\":\"a1\"}"
+gate "{\"tool_name\":\"Write\",\"tool_input\":{\"file_path\":\"x.py\"},\"cwd\":\"$TMP/proj\"}"
+gate "not json"
+check "each call charges the steps it ran" "
+steps = {k: v['count'] for k, v in snap['steps'].items()}
+# parse: 5, state: 4 (bad stdin stops at 1), scan: Bash, path checks: Edit
+# (subagent, step 4) and Write (6, 7), decided at 5 (Edit), 8 (the rest).
+assert steps == {'1': 5, '2': 4, '3': 1, '4': 1, '5': 1, '6': 1, '7': 1,
+                 '8': 3, 'total': 5}, steps
+tools = {k: (v['calls'], v['denies']) for k, v in snap['tools'].items()}
+assert tools == {'Bash': (1, 1), 'Read': (1, 0), 'Edit': (1, 0),
+                 'Write': (1, 1), '(none)': (1, 0)}, tools
+for s in snap['steps'].values():
+    assert s['p50_us'] <= s['p95_us'] <= s['p99_us'] <= s['max_us'], s
+"
+
+new_proj "off"
+for i in $(seq 1 12); do
+  gate "{\"tool_name\":\"Read\",\"tool_input\":{},\"cwd\":\"$TMP/proj\"}" &
+done
+wait
+check "concurrent hooks never lose a count; OFF path recorded" "
+assert snap['steps']['total']['count'] == 12, snap['steps']
+assert snap['steps']['2']['count'] == 12 and '8' not in snap['steps']
+assert snap['tools']['Read']['calls'] == 12
+assert os.path.getsize(path) == _stats.FILE_SIZE
+"
+
+new_proj "pi"
+for i in 1 2 3; do
+  gate "{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"make\"},\"cwd\":\"$TMP/proj\",\"session_id\":\"s1\"}"
+done
+gate "{\"tool_name\":\"Bash\",\"tool_input\":{\"command\":\"make\"},\"cwd\":\"$TMP/proj\",\"session_id\":\"s2\"}"
+check "repeated identical denies per session are counted, not escalated" "
+bash = snap['tools']['Bash']
+assert (bash['calls'], bash['denies'], bash['repeat_denies'], bash['escalated']) \
+    == (4, 4, 2, 0), bash
+"
+
+check "buckets: exact below 32us, within 1/16 above, clamped at the top" "
+for us in list(range(0, 4096)) + [10**6, 123456789, 2**32 - 1]:
+    low, high = _stats.bucket_range(_stats.bucket_index(us))
+    assert low <= us <= high, (us, low, high)
+    assert us < 32 and low == high or (high - low + 1) * 16 <= low, (us, low, high)
+assert _stats.bucket_index(2**40) == _stats.HISTOGRAM_BUCKETS - 1
+buckets = [0] * _stats.HISTOGRAM_BUCKETS
+for us in range(1, 101):
+    buckets[_stats.bucket_index(us)] += 1
+p50, p99 = _stats._percentiles(buckets, 100, (50, 99))
+assert 50 <= p50 <= 53 and 99 <= p99 <= 101, (p50, p99)
+"
+
+check "a file with a foreign layout is reset, not misread" "
+with open(path, 'r+b') as f:
+    f.write(b'JUNK')
+assert _stats.snapshot(path) == {'steps': {}, 'tools': {}}
+with open(path, 'ab') as f:
+    f.write(b'x')
+_stats.record(path, {1: 5}, 5, 'Read', False)
+snap = _stats.snapshot(path)
+assert snap['steps']['total']['count'] == 1 and os.path.getsize(path) == _stats.FILE_SIZE
+"
+
+check "--stats prints per-step percentiles and per-tool counts; --reset" "
+out = subprocess.run([sys.executable, '$ENFORCE', '--stats'],
+                     capture_output=True, text=True)
+assert out.returncode == 0, out.stderr
+lines = out.stdout.splitlines()
+assert lines[2].split() == ['step', 'calls', 'mean', 'us', 'p50', 'us', 'p95',
+                            'us', 'p99', 'us', 'max', 'us'], lines[2]
+assert any(l.split()[:2] == ['total', '1'] for l in lines), out.stdout
+assert any(l.split()[:2] == ['Read', '1'] for l in lines), out.stdout
+js = json.loads(subprocess.run([sys.executable, '$ENFORCE', '--stats', '--json'],
+                               capture_output=True, text=True).stdout)
+assert js['steps']['total']['count'] == 1
+assert subprocess.run([sys.executable, '$ENFORCE', '--stats', '--reset']).returncode == 0
+assert not os.path.exists(path)
+out = subprocess.run([sys.executable, '$ENFORCE', '--stats'],
+                     capture_output=True, text=True)
+assert out.returncode == 1 and 'ORCHESTRATOR_STATS=1' in out.stderr, out
+"
+
+echo
+echo "test_stats.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
@@ -0,0 +1,124 @@
+#!/usr/bin/env bash
+# _state.StateWatcher / watch(): the in-memory state must track every way the
+# state file changes, push changes to subscribers, and never be stale for a
+# caller of current()/get_state() -- on both the inotify and poll backends.
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+# check name initial-state python-code: runs once per backend (`inotify` bool
+# in scope), each in a fresh project
+check() {
+  local name="$1" initial="$2" code="$3" backend
+  for backend in inotify poll; do
+    new_proj "$initial"
+    total=$((total+1))
+    local out
+    if out=$(PYTHONPATH="$PLUGIN_ROOT/hooks" python3 -c "
+import builtins, os, sys, threading, time
+import _state
+proj = '$TMP/proj'
+state = os.path.join(proj, '.orchestrator-mode.state')
+inotify = '$backend' == 'inotify'
+def write(text):
+    with open(state, 'w') as f:
+        f.write(text)
+def wait_for(pred, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not pred():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+$code" 2>&1); then
+      echo "PASS: $name ($backend)"
+      pass=$((pass+1))
+    else
+      echo "FAIL $name ($backend): $out"
+      fail=$((fail+1))
+    fi
+  done
+}
+
+check "current() is never stale: write, rename-over, delete, recreate" "on" "
+w = _state.StateWatcher(proj, poll_interval=0.05, use_inotify=inotify)
+assert w.backend == ('inotify' if inotify else 'poll'), w.backend
+assert w.state == ('on', {}), w.state
+write('wf allowed-models=opus,sonnet')
+assert w.current() == ('wf', {'allowed-models': ['opus', 'sonnet']}), w.state
+with open(state + '.tmp', 'w') as f:
+    f.write('pi')
+os.replace(state + '.tmp', state)
+assert w.current() == ('pi', {})
+os.unlink(state)
+assert w.current() == ('off', {})
+write('on')
+assert w.current() == ('on', {})
+if inotify:  # same size, same timestamp tick: only the event tells
+    for text in ('pi', 'wf', 'on') * 20:
+        write(text)
+        assert w.current() == (text, {}), (text, w.state)
+w.close()
+"
+
+check "subscribers are pushed each change from the watcher thread" "off" "
+w = _state.StateWatcher(proj, poll_interval=0.05, use_inotify=inotify)
+got = []
+w.subscribe(lambda mode, options: got.append((mode, threading.current_thread().name)))
+for text, mode in (('on', 'on'), ('wf', 'wf'), ('off', 'off')):
+    t0 = time.monotonic()
+    with open(state + '.tmp', 'w') as f:  # atomic: no truncated-file event
+        f.write(text)
+    os.replace(state + '.tmp', state)
+    wait_for(lambda: got and got[-1][0] == mode)
+    if inotify:
+        assert time.monotonic() - t0 < 0.5, time.monotonic() - t0
+assert [m for m, _ in got] == ['on', 'wf', 'off'], got
+assert all(t == 'orchestrator-state-watcher' for _, t in got), got
+w.close()
+"
+
+check "get_state() is answered by a registered watcher without opening the file" "on" "
+os.environ['CLAUDE_PROJECT_DIR'] = proj
+w = _state.watch(proj)
+if not inotify:
+    w._fd = None  # exercise the stat() fallback path
+assert _state.watch(proj) is w
+opened, real_open = [], builtins.open
+def counting_open(path, *a, **k):
+    opened.append(path)
+    return real_open(path, *a, **k)
+builtins.open = counting_open
+try:
+    for _ in range(100):
+        assert _state.get_state({}) == ('on', {})
+    assert opened == [], opened
+    write('banana')
+    import io
+    sys.stderr, err = io.StringIO(), sys.stderr
+    try:
+        assert _state.get_state({}) == ('off', {})
+        assert _state.get_state({}) == ('off', {})
+        warned = sys.stderr.getvalue()
+    finally:
+        sys.stderr = err
+    assert warned.count('unrecognized state-file mode token') == 2, warned
+finally:
+    builtins.open = real_open
+_state.unwatch(proj)
+assert proj not in _state._watchers and w._fd is None
+"
+
+check "removing the project dir falls back to polling, still OFF-safe" "on" "
+w = _state.StateWatcher(proj, poll_interval=0.05, use_inotify=inotify)
+import shutil
+shutil.rmtree(proj)
+assert w.current() == ('off', {})
+assert w.backend == 'poll'
+os.makedirs(proj)
+write('pi')
+assert w.current() == ('pi', {})
+w.close()
+"
+
+echo
+echo "test_watch.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]
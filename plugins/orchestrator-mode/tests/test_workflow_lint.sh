@@ -0,0 +1,286 @@
+#!/usr/bin/env bash
+# Workflow model-allowlist lint (D4b): hooks/_workflow_lint.py tokenizer
+# units, plus end-to-end deny/no-op cases through enforce-orchestrator.py.
+set -u
+DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$DIR/helpers.sh"
+
+check() {
+  local name="$1" code="$2"
+  total=$((total+1))
+  local out
+  if out=$(PYTHONPATH="$PLUGIN_ROOT/hooks" python3 -c "
+import _workflow_lint as w
+def calls(script):
+    return [(c.line, c.declares_model) for c in w.lint(script).calls]
+def values(script):
+    return w.lint(script).values
+$code" 2>&1); then
+    echo "PASS: $name"
+    pass=$((pass+1))
+  else
+    echo "FAIL $name: $out"
+    fail=$((fail+1))
+  fi
+}
+
+check "shorthand and object-literal model keys pair with their call" "
+assert calls('agent(\'a\', model: \"sonnet\")') == [(1, True)]
+assert calls('agent(\'a\', {desc: 1, model: \'opus\'})\nagent(\'b\')') == [(1, True), (2, False)]
+"
+
+check "comments, strings and regex literals are skipped" "
+s = '''// model: 'x' agent('y')
+/* agent('z', {model: 'gpt-4'}) */
+const s = \"agent('q')\", r = /agent\\(model:/g, d = a / b / c;
+agent('a', {model: 'opus'})  // model: 'gpt-4'
+agent('b') /* model: 'haiku' */'''
+assert calls(s) == [(4, True), (5, False)], calls(s)
+assert values(s) == [(4, 'opus')], values(s)
+"
+
+check "template literals: plain is a value, substitutions are code" "
+assert values('agent(\`p\`, {model: \`Haiku\`})') == [(1, 'haiku')]
+s = 'agent(\`\${agent(\"inner\", {model: \"opus\"})} \${ {a: 1}.a }\`)'
+assert calls(s) == [(1, False), (1, True)], calls(s)
+"
+
+check "opaque options and dynamic models fail open, empty model is missing" "
+assert calls('agent(\'a\', opts)') == [(1, True)]
+assert calls('agent(\'a\', {...defaults})') == [(1, True)]
+assert calls('agent(\'a\', {model})') == [(1, True)]
+assert calls('agent(\'a\', {model: pick(\'x\')})') == [(1, True)]
+assert values('agent(\'a\', {model: cond ? \'x\' : \'y\'})') == []
+assert calls('agent(\'a\', {model: \"\"})') == [(1, False)]
+assert calls('agent(prompt)') == [(1, False)]
+"
+
+check "model values anywhere in code; declarations and ternaries are not keys" "
+s = 'const o = {nested: {\"model\": \"o3\"}};\nfunction agent(p) {}\nx = c ? model : y'
+assert values(s) == [(1, 'o3')], values(s)
+assert calls(s) == [], calls(s)
+"
+
+check "multi-megabyte generated script lints well within the hook timeout" "
+import time
+line = 'const r = await agent(\`Task: \${input}\`, {model: \'sonnet\', description: \"step\"}); // done\n'
+s = line * 40000
+t = time.monotonic()
+r = w.lint(s)
+elapsed = time.monotonic() - t
+assert len(s) > 3000000 and len(r.calls) == 40000, len(r.calls)
+assert not r.missing_model_lines()
+assert elapsed < 4.0, elapsed
+"
+
+check "unterminated regex/string literals are not rescanned per opener" "
+import time
+tail = \"agent('a', {model: 'gpt-4'})\"
+esc = chr(92)
+for s in ('a=b=/[x/;' * 20000 + tail, 'a=(/[x;' * 20000 + tail,
+          '\"' + (esc + '\"') * 90000, \"'\" + (esc + \"'\") * 90000):
+    t = time.monotonic()
+    r = w.lint(s)
+    elapsed = time.monotonic() - t
+    assert elapsed < 2.0, (s[:12], elapsed)
+    if s.endswith(tail):
+        assert [v for _, v in r.values] == ['gpt-4'], (s[:12], r.values)
+"
+
+# Verdict memo (content hash x normalized allowlist x LINTER_VERSION).
+export ORCHESTRATOR_CACHE_DIR="$(mktemp -d)"
+MEMO_PRELUDE="
+import json, os
+def allowed(value, models):
+    return any(m in value for m in models)
+def fresh_process():
+    w._verdict_memo.clear()
+    w._path_memo.clear()
+def no_rescan(*a):
+    raise AssertionError('rescanned')
+"
+
+check "same script + equivalent allowlist is served from the memo, no rescan" "$MEMO_PRELUDE
+s = 'agent(\'a\', {model: \'gpt-4\'})\nagent(\'b\')'
+first = w.verdict(s, ['sonnet', 'haiku'], allowed)
+assert first['missing'] == 1 and first['missing_lines'] == [2], first
+assert first['offending'] == [['gpt-4', 1]], first
+w.lint = no_rescan
+assert w.verdict(s, ['haiku', 'sonnet', 'haiku'], allowed) == first
+"
+
+check "verdicts are never read from disk: a forged clean entry is ignored" "$MEMO_PRELUDE
+import hashlib, tempfile
+s = 'agent(\\'a\\', {model: \\'gpt-4\\'})'
+path = os.path.join(tempfile.mkdtemp(), 'flow.js')
+with open(path, 'w') as f:
+    f.write(s)
+st = os.stat(path)
+digest = hashlib.sha256(s.encode()).hexdigest()
+clean = {'calls': 1, 'missing': 0, 'missing_lines': [], 'offending': []}
+forged = {w._verdict_key(digest, ['sonnet']): clean,
+          'p:' + os.path.realpath(path): [st.st_ino, st.st_mtime_ns, st.st_size, digest]}
+with open(os.path.join(os.environ['ORCHESTRATOR_CACHE_DIR'], 'workflow-lint.json'), 'w') as f:
+    json.dump(forged, f)
+assert w.verdict(s, ['sonnet'], allowed)['offending'] == [['gpt-4', 1]]
+fresh_process()
+assert w.verdict_for_path(path, ['sonnet'], allowed)['offending'] == [['gpt-4', 1]]
+"
+
+check "different allowlist or linter version misses the memo" "$MEMO_PRELUDE
+s = 'agent(\'a\', {model: \'gpt-4\'})'
+assert w.verdict(s, ['sonnet'], allowed)['offending']
+fresh_process()
+assert not w.verdict(s, ['gpt'], allowed)['offending']
+fresh_process()
+w.LINTER_VERSION += 1
+lint = w.lint
+calls = []
+w.lint = lambda script, deadline=None: calls.append(1) or lint(script, deadline)
+w.verdict(s, ['sonnet'], allowed)
+assert calls == [1], 'stale-version verdict served'
+"
+
+check "model-aliases are part of the memo key" "$MEMO_PRELUDE
+def aliased(value, models, aliases=()):
+    value = dict(a.split('=') for a in aliases).get(value, value)
+    return allowed(value, models)
+s = 'agent(\'a\', {model: \'fast\'})'
+assert w.verdict(s, ['haiku'], aliased)['offending']
+fresh_process()
+assert not w.verdict(s, ['haiku'], aliased, aliases=['fast=haiku'])['offending']
+fresh_process()
+assert w.verdict(s, ['haiku'], aliased, aliases=['fast=opus'])['offending']
+"
+
+check "unchanged scriptPath file is neither re-read nor rescanned; edits are" "$MEMO_PRELUDE
+import builtins, tempfile
+path = os.path.join(tempfile.mkdtemp(), 'flow.js')
+with open(path, 'w') as f:
+    f.write('agent(\'a\')')
+assert w.verdict_for_path(path, ['sonnet'], allowed)['missing'] == 1
+real_open, real_lint = builtins.open, w.lint
+def guarded_open(p, *a, **k):
+    assert p != path, 're-read unchanged script'
+    return real_open(p, *a, **k)
+builtins.open, w.lint = guarded_open, no_rescan
+assert w.verdict_for_path(path, ['sonnet'], allowed)['missing'] == 1
+builtins.open, w.lint = real_open, real_lint
+with open(path, 'w') as f:
+    f.write('agent(\'a\', {model: \'sonnet\'})  ')
+assert w.verdict_for_path(path, ['sonnet'], allowed)['missing'] == 0
+"
+
+check "memo is LRU-bounded" "$MEMO_PRELUDE
+w._LINT_CACHE_MAX_ENTRIES = 5
+keep = 'agent(0)'
+w.verdict(keep, ['sonnet'], allowed)
+for i in range(1, 12):
+    w.verdict('agent(%d)' % i, ['sonnet'], allowed)
+    w.verdict(keep, ['sonnet'], allowed)  # recently used -> survives
+assert len(w._verdict_memo) == 5, len(w._verdict_memo)
+assert w._verdict_key(w.hashlib.sha256(keep.encode()).hexdigest(), ['sonnet']) in w._verdict_memo
+"
+
+check "scriptPath is linted out of an mmap, never copied into memory" "$MEMO_PRELUDE
+import tempfile, tracemalloc
+path = os.path.join(tempfile.mkdtemp(), 'big.js')
+line = 'await agent(\'step\', {model: \'sonnet\'}); // ' + 'x' * 2000 + '\n'
+with open(path, 'w') as f:
+    f.write(line * 2000 + 'agent(\'last\')\n')
+size = os.path.getsize(path)
+tracemalloc.start()
+v = w.verdict_for_path(path, ['sonnet'], allowed)
+peak = tracemalloc.get_traced_memory()[1]
+assert v['missing'] == 1 and v['missing_lines'] == [2001], v
+assert peak < size // 4, (peak, size)
+"
+
+check "max-script-bytes is enforced before reading" "$MEMO_PRELUDE
+import tempfile
+path = os.path.join(tempfile.mkdtemp(), 'flow.js')
+with open(path, 'w') as f:
+    f.write('agent(\'a\', {model: \'sonnet\'})')
+for call in (lambda: w.verdict_for_path(path, ['sonnet'], allowed, max_bytes=10),
+             lambda: w.verdict('agent(\'a\')' * 3, ['sonnet'], allowed, max_bytes=10)):
+    try:
+        call()
+    except w.ScriptTooLarge as e:
+        assert e.limit == 10 and e.size > 10, (e.size, e.limit)
+    else:
+        raise AssertionError('limit not enforced')
+assert w.verdict_for_path(path, ['sonnet'], allowed, max_bytes=1 << 20)['missing'] == 0
+"
+
+check "a lint past its time budget raises ScriptTooLarge and is not memoized" "$MEMO_PRELUDE
+s = 'x=y+z;w=q/2;' * 20000 + 'agent(\\'a\\')'
+try:
+    w.verdict(s, ['sonnet'], allowed, max_seconds=0)
+except w.ScriptTooLarge as e:
+    assert e.seconds == 0 and e.size == len(s) and e.limit is None, (e.seconds, e.size)
+else:
+    raise AssertionError('budget not enforced')
+assert w.verdict(s, ['sonnet'], allowed, max_seconds=60)['missing'] == 1
+"
+
+check "hook default size cap and lint budget stay inside the timeout" "
+import importlib.util, io, sys, time
+spec = importlib.util.spec_from_file_location('enforce', '$PLUGIN_ROOT/hooks/enforce-orchestrator.py')
+enforce = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(enforce)
+assert enforce.DEFAULT_MAX_SCRIPT_BYTES <= 1 << 20
+assert enforce.LINT_BUDGET_SECONDS <= 2.5
+# a token-dense script just under the default cap lints within the budget
+s = 'x=y+z;w=q/2;' * (enforce.DEFAULT_MAX_SCRIPT_BYTES // 12)
+t = time.monotonic()
+w.lint(s)
+assert time.monotonic() - t < enforce.LINT_BUDGET_SECONDS * 2
+enforce.LINT_BUDGET_SECONDS = 0
+try:
+    enforce.check_workflow_models({'script': s[:len(s) // 2] + 'agent(\\'a\\')'},
+                                  ['sonnet'], {},
+                                  {'oversize-script': 'closed'})
+except enforce._Decided as d:
+    assert d.decision.decision == 'deny', d.decision
+    assert 'could not be linted within 0s' in d.decision.reason, d.decision.reason
+else:
+    raise AssertionError('overrun not denied under oversize-script=closed')
+"
+
+new_proj "wf allowed-models=sonnet max-script-bytes=16"
+run_case "wf/oversize script fails open by default" enforce-orchestrator.py \
+  "{\"tool_name\":\"Workflow\",\"tool_input\":{\"script\":\"agent('a'); agent('b'); agent('c')\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "__EMPTY__" ""
+
+new_proj "wf allowed-models=sonnet max-script-bytes=1k oversize-script=closed"
+head -c 2048 /dev/zero | tr '\0' ' ' >"$TMP/proj/flow.js"
+run_case "wf/oversize scriptPath denied under oversize-script=closed" enforce-orchestrator.py \
+  "{\"tool_name\":\"Workflow\",\"tool_input\":{\"scriptPath\":\"flow.js\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "is 2048 bytes, over this project's max-script-bytes limit (1024)" ""
+
+new_proj "wf allowed-models=sonnet max-script-bytes=0 oversize-script=closed"
+run_case "wf/max-script-bytes=0 disables the limit" enforce-orchestrator.py \
+  "{\"tool_name\":\"Workflow\",\"tool_input\":{\"script\":\"agent('a', {model: 'sonnet'})\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "__EMPTY__" ""
+
+new_proj "wf allowed-models=sonnet"
+run_case "wf/commented-out model: no longer hides a missing model" enforce-orchestrator.py \
+  "{\"tool_name\":\"Workflow\",\"tool_input\":{\"script\":\"agent('a', {prompt: 'x'}) // model: 'sonnet'\\nagent('b', {model: 'sonnet'})\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "1 of which declare no model: option (line 1)" ""
+
+run_case "wf/off-list model names value and line" enforce-orchestrator.py \
+  "{\"tool_name\":\"Workflow\",\"tool_input\":{\"script\":\"agent('a', {model: 'sonnet'})\\nagent('b', {model: 'gpt-4'})\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "'gpt-4' (line 2)" ""
+
+run_case "wf/model only inside a comment is not linted" enforce-orchestrator.py \
+  "{\"tool_name\":\"Workflow\",\"tool_input\":{\"script\":\"/* model: 'gpt-4' */ agent('a', {model: 'sonnet'})\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "__EMPTY__" ""
+
+printf "agent('a', opts)\n" >"$TMP/proj/flow.js"
+run_case "wf/scriptPath with opaque options fails open" enforce-orchestrator.py \
+  "{\"tool_name\":\"Workflow\",\"tool_input\":{\"scriptPath\":\"flow.js\"},\"cwd\":\"$TMP/proj\"}" \
+  0 "__EMPTY__" ""
+
+echo
+echo "test_workflow_lint.sh: $pass/$total passed"
+[ "$fail" -eq 0 ]